@@ -1,10 +1,43 @@
 
+import ipaddress  # To check a loopback address and mask together
+import threading  # To keep debounced saves off a session that is in use
+import time  # To measure handshake and command round trips
 import pexpect  # To handle SSH session
 
+from async_session import AsyncSSHSession  # To drive the fleet from one event loop
+from commit_scheduler import CommitScheduler  # To coalesce write memory
+from compliance import compliance_menu  # To check stored configs against golden rules
+from config_cache import SNAPSHOTS, cached_config, config_marker, section_headers, tracks_changes  # Config snapshots
+from config_transaction import ConfigTransactionError, run_config  # To send a block of config lines in one write
+from config_tree import parsed_config  # To answer config questions from the parsed snapshot
+from drift import drift_menu  # To audit unsaved changes across an inventory
+from fleet import device_address, fleet_menu  # To bootstrap many devices in parallel
+from latency import load_profiles, profile_for, save_profiles  # Per-device latency profiles and timeouts
+from prompts import LEARN_PROMPT, SEARCH_WINDOW, PromptMatcher  # Anchored, precompiled prompt patterns
+from session_pool import SessionPool  # To reuse authenticated sessions
+from ssh_mux import ControlMaster  # To share one SSH connection per device between spawns
+from streaming import iter_command_lines  # To process show output line by line as it arrives
+from tracing import NOOP_SPAN, TRACE_FILE, TRACER, traced  # Spans for every step of the session
+
+
+# True if `address` and `mask` form an IPv4 interface address such as 1.1.1.1 255.255.255.255
+def valid_address_and_mask(address, mask):
+    try:
+        interface = ipaddress.IPv4Interface(f'{str(address).strip()}/{str(mask).strip()}')
+    except ValueError:
+        return False
+    # IPv4Interface also takes a wildcard mask, which IOS rejects in 'ip address'
+    return str(interface.netmask) == str(mask).strip()
+
 
 # A CLASS TO MANAGE THE SSH NETWORK SESSION
 class SSHTONetworkSession:
-    def __init__(self, ip_address, username, password, hostname, enable_password=''):
+    # ControlMaster shared by every session when SSH multiplexing is switched on from the menu
+    mux = None
+    # Running-config snapshots the session refreshes and tracks its changes against
+    snapshots = SNAPSHOTS
+
+    def __init__(self, ip_address, username, password, hostname, enable_password='', port=None):
         # SSH session is initialized with user input for ip address,username, password and hostname 
         # The privileged access mode is then accessed using the eneble password 
         self.ip_address = ip_address
@@ -12,94 +45,312 @@ class SSHTONetworkSession:
         self.password = password
         self.hostname = hostname
         self.enable_password = enable_password
+        self.port = port  # SSH port when the device does not listen on 22
+        self.address = device_address(ip_address, port)  # Key of the device in caches and profiles
         self.session = None  # Placeholder for the SSH session object
+        self.error = ''  # Reason the last bootstrap failed, used in fleet summaries
+        self.privileged = False  # True once the session is at the enable '#' prompt
+        self.prompts = None  # PromptMatcher learnt from the device after login
+        self.latency = profile_for(self.address)  # Round-trip history used to derive timeouts
+        self.last_command = None  # Command whose prompt is awaited, with the time it was sent
+        self.sent_at = None
+        self.paging_disabled = False  # Set once 'terminal length 0' has been sent
+        self.trace = NOOP_SPAN  # Root span of the session while tracing is on, ended by close()
+        self.command_span = None  # Span of the command whose prompt is awaited
+        self.changed_sections = set()  # Sections configured since the last config snapshot refresh
+        self.config_changes = []  # (marker before, marker after) of each configure() since then
+
+        # Configuration changes only mark the session dirty; 'write memory' runs once per batch,
+        # on close, or some seconds after the last change once a debounce is set (commits.set_debounce)
+        self.lock = threading.RLock()
+        self.commits = CommitScheduler(self.write_memory, lock=self.lock)
 
     # Initiate SSH session
     def ssh_session(self):
+        # Run the login, enable and hostname sequence, then hand over to the menu.
+        if self.bootstrap():
+            # Call the configuration menu for further actions.
+            self.compare_configs_menu()
+
+    # Record why the session could not be prepared so fleet runs can report it
+    def _fail(self, message):
+        self.error = message
+        self.trace.fail(message)
+        print(message)
+        return False
+
+    # Login, enable and hostname sequence shared by the interactive and fleet modes.
+    # Returns True when the device is ready for further commands.
+    def bootstrap(self):
+        self.error = ''
+        return self.login() and self.enter_enable() and self.set_hostname()
+
+    # Root span of this session, started by its first traced step
+    def trace_root(self):
+        if self.trace is NOOP_SPAN and TRACER.enabled:
+            self.trace = TRACER.root('session', device=self.address, username=self.username)
+        return self.trace
+
+    # Spawn the SSH client and authenticate with the device
+    @traced('login')
+    def login(self):
         # Spawn an SSH session to the network device using the provided credentials.
-        # 'encoding' ensures the output is in UTF-8 format, 'timeout' specifies the session timeout.
-        self.session = pexpect.spawn(f'ssh {self.username}@{self.ip_address}', encoding='utf-8', timeout=20)
-        result = self.session.expect(['Password:', pexpect.TIMEOUT, pexpect.EOF])
+        # 'encoding' ensures the output is in UTF-8 format, 'timeout' comes from the device's
+        # handshake history, so a dead device fails quickly once its normal latency is known.
+        port = f' -p {self.port}' if self.port else ''
+        command = f'ssh{port} {self.username}@{self.ip_address}'
+        if self.mux is not None:
+            # Create the device's control master, or attach to the one already running
+            command = self.mux.ssh_command(self.username, self.ip_address, self.port, self.password)
+        start = time.monotonic()
+        self.session = pexpect.spawn(command, encoding='utf-8', timeout=self.latency.connect_timeout())
 
         # Expect to match one of the expected responses: password prompt, timeout, or EOF.
-        if result != 0:
+        # A session attached to a running master is already authenticated and shows the prompt directly;
+        # the mux only attaches sessions whose password the device accepted before (see ssh_mux.py).
+        result = self._wait(['Password:', LEARN_PROMPT, pexpect.TIMEOUT, pexpect.EOF], 'password or prompt',
+                            searchwindowsize=SEARCH_WINDOW)
+        if result > 1:
 
             # If the session fails to establish, print an error and exit.
-            print('Session failed to establish.')
-            return
-        
-        # Send the password to authenticate the session.
-        self.session.sendline(self.password)
-        result = self.session.expect(['>', '#', pexpect.TIMEOUT, pexpect.EOF])
-        if result != 0:
-
-            # If authentication fails, print an error and exit.
-            print('Authentication failed.')
-            return
+            return self._fail('Session failed to establish.')
+        # An attach takes no handshake, so its time would shrink the connect timeout of real ones
+        if not (result == 1 and self.mux is not None):
+            self.latency.record_handshake(time.monotonic() - start)
 
-        # Attempt to enter enable mode for privileged commands.
-        self.session.sendline('enable')
-        result = self.session.expect(['Password:', pexpect.TIMEOUT, pexpect.EOF])
+        if result == 0:
+            # Send the password to authenticate the session.
+            self.session.sendline(self.password)
+            result = self._wait([LEARN_PROMPT, pexpect.TIMEOUT, pexpect.EOF], 'prompt', searchwindowsize=SEARCH_WINDOW)
+            if result != 0:
+
+                # If authentication fails, print an error and exit.
+                return self._fail('Authentication failed.')
+            if self.mux is not None:
+                self.mux.accept(self.username, self.ip_address, self.port, self.password)
+
+        # Learn the device's exact prompt once; every later wait uses its precompiled patterns.
+        # Users with privilege 15 land straight on the '#' prompt.
+        prompt_hostname, prompt_char = self.session.match.group(1), self.session.match.group(2)
+        self.prompts = PromptMatcher(prompt_hostname)
+        self.privileged = prompt_char == '#'
+        return True
+
+    # Attempt to enter enable mode for privileged commands.
+    @traced('enable')
+    def enter_enable(self):
+        if self.privileged:
+            return True
+        self._send('enable')
+        result = self._wait(['Password:', pexpect.TIMEOUT, pexpect.EOF], 'enable password')
         if result == 0:
             # If prompted for an enable password, send it.
             self.session.sendline(self.enable_password)
-            result = self.session.expect('#')
+            result = self._expect('enable')
              # If entering enable mode fails, print an error and exit.
         if result != 0:
-            print('Enable mode failed.')
-            return
+            return self._fail('Enable mode failed.')
+        self.privileged = True
+        return True
 
+    # Set the device hostname from configuration mode and return to enable mode
+    @traced('set_hostname')
+    def set_hostname(self):
         # # Enter configuration mode to begin making changes.
-        self.session.sendline('configure terminal')
-        result = self.session.expect(r'\(config\)#')
+        with TRACER.span('config_mode'):
+            self._send('configure terminal')
+            result = self._expect('config')
         if result != 0:
             # If entering configuration mode fails, print an error and exit.
-            print('Config mode failed.')
-            return
+            return self._fail('Config mode failed.')
 
         # # Set the hostname of the device.
-        self.session.sendline(f'hostname {self.hostname}')
-        result = self.session.expect(rf'{self.hostname}\(config\)#')
+        # The prompt changes with the hostname, so switch to that hostname's patterns
+        self._send(f'hostname {self.hostname}')
+        self.prompts = PromptMatcher(self.hostname)
+        result = self._expect('config')
         if result == 0:
             # If the hostname is set successfully, print a confirmation message.
             print('Hostname set successfully.')
         else:
             # If setting the hostname fails, print an error and exit.
-            print('Failed to set hostname.')
-            return
+            return self._fail('Failed to set hostname.')
 
         # # Exit configuration mode and print a readiness message.
-        self.session.sendline('exit')
+        self._send('exit')
+        self._expect('enable')
         print('Session ready for further commands.')
-        # Call the configuration menu for further actions.
-        self.compare_configs_menu()
+        return True
+
+    # Wait for the anchored prompt of a mode ('exec', 'enable', 'config', 'config-if',
+    # 'config-router' or 'any'), searching only the end of the buffer.
+    # Without an explicit timeout, the device's latency profile sets it.
+    def _expect(self, mode, timeout=-1):
+        if timeout == -1:
+            timeout = self.latency.command_timeout(self.last_command)
+        result = self._wait(self.prompts.pattern(mode), mode, timeout=timeout, searchwindowsize=SEARCH_WINDOW)
+
+        # Record the round trip of the command that brought this prompt back
+        if self.sent_at is not None:
+            self.latency.record_command(self.last_command, time.monotonic() - self.sent_at, len(self.session.before))
+            self.sent_at = None
+        return result
+
+    # pexpect wait, traced as an 'expect' span with the bytes read and the outcome.
+    # The span of the command being answered ends with it.
+    def _wait(self, patterns, waiting_for, **kwargs):
+        if not TRACER.enabled:
+            return self.session.expect(patterns, **kwargs)
+
+        command_span, self.command_span = self.command_span, None
+        outcome = 'error'
+        with TRACER.span('expect', parent=command_span, root=self.trace_root(), waiting_for=waiting_for) as span:
+            try:
+                result = self.session.expect(patterns, **kwargs)
+                outcome = 'match'
+                # TIMEOUT and EOF given in the pattern list come back as an index, not an exception
+                if isinstance(patterns, list) and patterns[result] in (pexpect.TIMEOUT, pexpect.EOF):
+                    outcome = 'timeout' if patterns[result] is pexpect.TIMEOUT else 'eof'
+                    span.fail(outcome)
+            except pexpect.TIMEOUT:
+                outcome = 'timeout'
+                raise
+            except pexpect.EOF:
+                outcome = 'eof'
+                raise
+            finally:
+                span.set('outcome', outcome)
+                span.set('bytes', len(self.session.before) if isinstance(self.session.before, str) else 0)
+                if command_span is not None:
+                    command_span.set('outcome', outcome)
+                    if outcome != 'match':
+                        command_span.fail(outcome)
+                    command_span.end()
+        return result
+
+    # Send a command line and note when it went out, for the round-trip measurement
+    def _send(self, command):
+        self.last_command = command
+        self.sent_at = time.monotonic()
+        if TRACER.enabled:
+            if self.command_span is not None:
+                self.command_span.end()
+            self.command_span = TRACER.span('command', root=self.trace_root(), command=command)
+        self.session.sendline(command)
+
+    # Apply configuration lines as one pipelined transaction (see config_transaction.py).
+    # Raises ConfigTransactionError if the device rejected any of them.
+    @traced('configure')
+    def configure(self, lines):
+        # Even a rejected block may have changed these sections, so they are noted first
+        self.changed_sections.update(section_headers(lines))
+        # The markers around the block show the snapshot cache that no one else changed the
+        # configuration meanwhile; a failed or untracked block leaves None, which forces a full download
+        tracked = tracks_changes(self, self.snapshots)
+        before, after = config_marker(self, 'running') if tracked else None, None
+        try:
+            start = time.monotonic()
+            output = run_config(self.session, lines, self.prompts.pattern('enable'),
+                                self.latency.command_timeout('configure'))
+            self.latency.record_command('configure', time.monotonic() - start, len(output))
+            if tracked:
+                after = config_marker(self, 'running')
+        finally:
+            self.config_changes.append((before, after))
+        return output
+
+    # Yield the output lines of an exec command as they arrive (see streaming.py).
+    # Paging is switched off once per session so long outputs are never held at --More--.
+    def iter_lines(self, command):
+        if not self.paging_disabled:
+            self._send('terminal length 0')
+            self._expect('enable')
+            self.paging_disabled = True
+
+        start = time.monotonic()
+        nbytes = 0
+        timeout = self.latency.command_timeout(command)
+        span = TRACER.span('command', root=self.trace_root(), command=command, streamed=True)
+        try:
+            for line in iter_command_lines(self.session, command, self.prompts.pattern('enable'), timeout):
+                nbytes += len(line) + 1
+                yield line
+        except (pexpect.TIMEOUT, pexpect.EOF) as e:
+            span.fail(type(e).__name__.lower())
+            raise
+        finally:
+            span.set('bytes', nbytes)
+            span.end()
+        self.latency.record_command(command, time.monotonic() - start, nbytes)
+
+    # Cheap health check used by the session pool: an empty line must bring back a prompt
+    def probe(self, timeout=-1):
+        if self.session is None or not self.session.isalive():
+            return False
+        try:
+            self._send('')
+            return self._expect('any', timeout=timeout) == 0
+        except Exception:
+            return False
+
+    # Terminate the SSH child process, saving any unsaved configuration first
+    def close(self):
+        if self.session is not None:
+            try:
+                self.commits.close()
+            except Exception as e:
+                print(f"Error saving configuration: {e}")
+            self.session.close()
+            self.session = None
+
+            # The session's trace is complete once its connection is gone
+            if self.command_span is not None:
+                self.command_span.end()
+                self.command_span = None
+            self.trace.end()
+            self.trace = NOOP_SPAN
+
+    # Parsed running configuration (see config_tree.py). Only the change marker is read
+    # from the device while the snapshot is current, and the tree is reused until the text changes.
+    def config_tree(self):
+        return parsed_config(self.address, cached_config(self, 'running', self.snapshots))
+
+    # Save the running config to startup config
+    def write_memory(self):
+        self._send('write memory')
+        self._expect('enable')
+        print('Configuration saved to startup.')
 
     
     # Creating a loopback interface and saving it to startup configuration
-    def creating_loopback(self):
+    def creating_loopback(self, loopback_address=None, subnet=None):
         try:
-            # Ask for IP address and subnet dynamically
-            loopback_address = input("Enter loopback IP address: ")
-            subnet = input("Enter subnet mask: ")
+            # Ask for IP address and subnet dynamically, unless a script passed them in
+            if loopback_address is None:
+                loopback_address = input("Enter loopback IP address: ")
+                subnet = input("Enter subnet mask: ")
+
+            # The address and mask only make sense together, e.g. no 'ip address 1.1.1.1 None'
+            if not valid_address_and_mask(loopback_address, subnet):
+                print(f"Invalid loopback address and subnet mask: {loopback_address} {subnet}")
+                return
     
-            # Enter configuration mode and create the loopback interface
-            self.session.sendline('configure terminal')
-            self.session.expect(r'\(config\)#')
-            self.session.sendline('interface loopback 0')
-            self.session.expect(r'\(config-if\)#')
-
-            # Configure the loopback interface with the provided IP address and subnet mask.
-            self.session.sendline(f'ip address {loopback_address} {subnet}')
-            self.session.expect(r'\(config-if\)#')
-            
-            # Save the configuration to startup to make it persistent
-            self.session.sendline('end')  # Exit interface configuration mode
-            self.session.expect(r'#')
-            self.session.sendline('write memory')  # Save the running config to startup config
-            self.session.expect(r'#')
+            # Create the loopback interface and configure it with the provided IP address and
+            # subnet mask, all in one pipelined transaction
+            self.configure([
+                'interface loopback 0',
+                f'ip address {loopback_address} {subnet}',
+            ])
             
-            print('Loopback interface created and configuration saved successfully.')
+            # Mark the change for saving to startup; 'write memory' is coalesced by the commit scheduler
+            self.commits.mark_dirty(f'interface loopback 0: {loopback_address} {subnet}')
             
+            print('Loopback interface created. The configuration will be saved with the next write memory.')
+
+        # IOS kept the lines it accepted, so they still have to be saved with the next write memory
+        except ConfigTransactionError as e:
+            self.commits.mark_dirty(f'interface loopback 0 (partly rejected): {loopback_address} {subnet}')
+            print(f"Error creating loopback interface: {e}")
             
       # Print an error message if an exception occurs during loopback creation.
         except Exception as e:
@@ -108,35 +359,34 @@ class SSHTONetworkSession:
 
     
     # Creating and saving OSPF configuration
-    def creating_ospf(self):
+    def creating_ospf(self, process_id=None, net_id=None, wildcard=None, area=None):
         try:
-            # Get the process ID, network ID, wildcard, and area from the user
-            process_id = input("Enter the process ID: ")
-            net_id = input("Enter the network address: ")
-            wildcard = input("Enter the wildcard mask: ")
-            area = input("Enter the area: ")
-    
-            # Enter configuration mode
-            self.session.sendline('configure terminal')
-            self.session.expect(r'\(config\)#')
-    
-            # Create the OSPF router process
-            self.session.sendline(f'router ospf {process_id}')
-            self.session.expect(r'\(config-router\)#')
+            # Get the process ID, network ID, wildcard, and area from the user, unless a script passed them in
+            if process_id is None:
+                process_id = input("Enter the process ID: ")
+                net_id = input("Enter the network address: ")
+                wildcard = input("Enter the wildcard mask: ")
+                area = input("Enter the area: ")
+
+            if None in (net_id, wildcard, area):
+                print("The network address, wildcard mask and area are all needed.")
+                return
     
-            # Configure the network for OSPF
-            self.session.sendline(f'network {net_id} {wildcard} area {area}')
-            self.session.expect(r'\(config-router\)#')
+            # Create the OSPF router process and configure its network in one transaction
+            self.configure([
+                f'router ospf {process_id}',
+                f'network {net_id} {wildcard} area {area}',
+            ])
     
-            # Exit configuration mode
-            self.session.sendline('end')
-            self.session.expect(r'#')
+            # Mark the change for saving to startup
+            self.commits.mark_dirty(f'router ospf {process_id}: network {net_id} {wildcard} area {area}')
     
-            # Save the configuration to startup
-            self.session.sendline('write memory')
-            self.session.expect(r'#')
-    
-            print('OSPF configuration created and saved successfully.')
+            print('OSPF configuration created. The configuration will be saved with the next write memory.')
+
+        # IOS kept the lines it accepted, so they still have to be saved with the next write memory
+        except ConfigTransactionError as e:
+            self.commits.mark_dirty(f'router ospf {process_id} (partly rejected): network {net_id} {wildcard} area {area}')
+            print(f"Error creating OSPF: {e}")
         
           # Print an error message if an exception occurs during OSPF configuration.
         except Exception as e:
@@ -150,24 +400,17 @@ class SSHTONetworkSession:
             # Print a message indicating that OSPF configuration retrieval is in progress.
             print("Retrieving OSPF configuration...")
 
-            # Send the command to show the OSPF section of the running configuration
-            self.session.sendline('show running-config | section ospf')
-            self.session.expect('#', timeout=10) 
-    
-            # Capture and print the OSPF configuration details
-            raw_output = self.session.before
-            output_lines = raw_output.splitlines()
-            filtered_lines = [line.strip() for line in output_lines if line.strip()]
-            
-            # If no OSPF configuration lines were found, print a message indicating so.
-            if not filtered_lines:
+            # OSPF processes from the parsed running configuration snapshot
+            processes = self.config_tree().section('router ospf')
+            if not processes:
                 print("No OSPF configuration found.")
-            else:
-                # Print a header for the OSPF configuration output.
-                print("\n--- OSPF Configuration ---")
-                # Print each line of the filtered OSPF configuration.
-                for line in filtered_lines:
-                    print(line)  # Print each line of the OSPF section
+                return
+
+            # Print a header for the OSPF configuration output.
+            print("\n--- OSPF Configuration ---")
+            for process in processes:
+                for line in process.lines():
+                    print(line.strip())  # Print each line of the OSPF section
     
         except pexpect.exceptions.TIMEOUT:
             # Handle the timeout exception if the OSPF configuration retrieval takes too long.
@@ -177,34 +420,33 @@ class SSHTONetworkSession:
             print(f"Error: {e}")
 
     
-    def creating_eigrp(self):
+    def creating_eigrp(self, autonomous_system_number=None, net_id=None, wildcard=None):
         try:
-            # Get the autonomous system(AS) number, network ID, and wildcard
-            autonomous_system_number = input("Enter the autonomous system number: ")
-            net_id = input("Enter the network address: ")
-            wildcard = input("Enter the wildcard mask: ")
-
-            # Enter configuration mode
-            self.session.sendline('configure terminal')
-            self.session.expect(r'\(config\)#')
-    
-            # Create the OSPF router process
-            self.session.sendline(f'router eigrp {autonomous_system_number}')
-            self.session.expect(r'\(config-router\)#')
-    
-            # Configure the network for OSPF
-            self.session.sendline(f'network {net_id} {wildcard}')
-            self.session.expect(r'\(config-router\)#')
+            # Get the autonomous system(AS) number, network ID, and wildcard, unless a script passed them in
+            if autonomous_system_number is None:
+                autonomous_system_number = input("Enter the autonomous system number: ")
+                net_id = input("Enter the network address: ")
+                wildcard = input("Enter the wildcard mask: ")
+
+            if None in (net_id, wildcard):
+                print("The network address and wildcard mask are both needed.")
+                return
+
+            # Create the EIGRP router process and configure its network in one transaction
+            self.configure([
+                f'router eigrp {autonomous_system_number}',
+                f'network {net_id} {wildcard}',
+            ])
     
-            # Exit configuration mode
-            self.session.sendline('end')
-            self.session.expect(r'#')
+            # Mark the change for saving to startup
+            self.commits.mark_dirty(f'router eigrp {autonomous_system_number}: network {net_id} {wildcard}')
     
-            # Save the configuration to startup
-            self.session.sendline('write memory')
-            self.session.expect(r'#')
-    
-            print('EIGRP configuration created and saved successfully.')
+            print('EIGRP configuration created. The configuration will be saved with the next write memory.')
+
+        # IOS kept the lines it accepted, so they still have to be saved with the next write memory
+        except ConfigTransactionError as e:
+            self.commits.mark_dirty(f'router eigrp {autonomous_system_number} (partly rejected): network {net_id} {wildcard}')
+            print(f"Error creating EIGRP: {e}")
         
         # Handle any exceptions that occur and print an error message
         except Exception as e:
@@ -212,22 +454,16 @@ class SSHTONetworkSession:
 
     def advertise_eigrp(self):
         try:
-            # Send the command to show the eigrp section of the running configuration
-            self.session.sendline('show running-config | section eigrp')
-            self.session.expect('#', timeout=10)  
-    
-            # Capture and print the OSPF configuration details
-            raw_output = self.session.before
-            output_lines = raw_output.splitlines()
-            filtered_lines = [line.strip() for line in output_lines if line.strip()]
-            
-            # Check if any filtered lines exist; if not, print a message indicating no EIGRP configuration was found
-            if not filtered_lines:
+            # EIGRP processes from the parsed running configuration snapshot
+            processes = self.config_tree().section('router eigrp')
+            if not processes:
                 print("No eigrp configuration found.")
-            else:
-                print("\n--- EIGRP Configuration ---")
-                for line in filtered_lines:
-                    print(line)  # Print each line of the EIGRP section
+                return
+
+            print("\n--- EIGRP Configuration ---")
+            for process in processes:
+                for line in process.lines():
+                    print(line.strip())  # Print each line of the EIGRP section
     
         except pexpect.exceptions.TIMEOUT:
             # Handle timeout exception if the device does not respond in time
@@ -242,17 +478,10 @@ class SSHTONetworkSession:
     # Show IP interface brief
     def show_ip_interface_brief(self):
         try:
-            # Send the command to display interface brief status
-            self.session.sendline('show ip interface brief')
-            self.session.expect('#', timeout=10)  # Wait for the prompt to reappear
-
-            # Capture and print the output
-            raw_output = self.session.before
-            output_lines = raw_output.splitlines()
-            filtered_lines = [line.strip() for line in output_lines if line.strip()]  # Remove empty/whitespace lines
-
+            # Stream the interface brief status and print each line as it arrives
             print("\n--- IP Interface Brief ---")
-            for line in filtered_lines:
+            for line in self.iter_lines('show ip interface brief'):
+                line = line.strip()
                 # Only print lines that contain "Interface", "up", or "down" to display the relevant interface status
                 if "Interface" in line or "up" in line or "down" in line:
                     print(line)  # Print header and relevant lines
@@ -273,58 +502,168 @@ class SSHTONetworkSession:
             print("4. Advertise OSPF")
             print("5. Create an EIGRP")
             print("6. Advertise EIGRP")
-            print("7. Exit")
+            print(f"7. Save configuration ({len(self.commits.unsaved())} unsaved changes)")
+            print("8. Show unsaved changes")
+            print("9. Create a loopback, an OSPF and an EIGRP, saved once")
+            print("10. Exit")
             
             # Prompt the user to choose an option
             option = input('Choose an option: ') 
 
-            # Call the appropriate method based on the user's selection
-            if option == '1':
-                self.show_ip_interface_brief()  # Show the IP interface brief
-            elif option == '2':
-                self.creating_loopback() # Create a loopback interface (method assumed to be defined elsewhere)
-            elif option == '3':
-                self.creating_ospf() # Create an OSPF configuration (method assumed to be defined elsewhere)
-            elif option == '4':
-                self.advertise_ospf() # Advertise OSPF configuration (method assumed to be defined elsewhere)
-            
-            elif option == '5':
-                self.creating_eigrp() # Create an EIGRP configuration
-            
-            elif option == '6':
-                self.advertise_eigrp() # Advertise EIGRP configuration
-             # Exit the loop and end the menu
-            elif option == '7':
-                print("Exiting comparison menu.")
+            # The lock keeps a debounced save from interleaving with the selected operation
+            with self.lock:
+                self.run_menu_option(option)
+            if option == '10':
                 break
-            else:
-                print("Invalid option.")
+
+    # Run the three config helpers as one batch: a single write memory once the last one is done
+    def configure_batch(self):
+        try:
+            with self.commits.batch():
+                self.creating_loopback()
+                self.creating_ospf()
+                self.creating_eigrp()
+        except Exception as e:
+            print(f"Error saving configuration: {e}")
+
+    # Call the appropriate method based on the user's selection
+    def run_menu_option(self, option):
+        if option == '1':
+            self.show_ip_interface_brief()  # Show the IP interface brief
+        elif option == '2':
+            self.creating_loopback() # Create a loopback interface (method assumed to be defined elsewhere)
+        elif option == '3':
+            self.creating_ospf() # Create an OSPF configuration (method assumed to be defined elsewhere)
+        elif option == '4':
+            self.advertise_ospf() # Advertise OSPF configuration (method assumed to be defined elsewhere)
+        
+        elif option == '5':
+            self.creating_eigrp() # Create an EIGRP configuration
+        
+        elif option == '6':
+            self.advertise_eigrp() # Advertise EIGRP configuration
+
+        elif option == '7':
+            # Save every pending change with a single write memory
+            if not self.commits.flush():
+                print("No unsaved changes.")
+
+        elif option == '8':
+            unsaved = self.commits.unsaved()
+            print("\n--- Unsaved Changes ---")
+            for description in unsaved:
+                print(description)
+            if not unsaved:
+                print("None.")
+        elif option == '9':
+            self.configure_batch()
+         # Save what is pending and end the menu
+        elif option == '10':
+            self.commits.flush()
+            print("Exiting comparison menu.")
+        else:
+            print("Invalid option.")
 
    
     
 
+# Sessions kept open between menu selections, reused per (ip, username, privilege level)
+SESSION_POOL = SessionPool(SSHTONetworkSession)
+
+
 # Menu to start SSH session
 def menu():
+    # Start from the latencies measured in earlier runs
+    load_profiles()
     while True:
         print('--------- MENU ---------')
         print('a. SSH Session')
-        print('b. Exit')
+        print('b. Fleet bootstrap from inventory')
+        print('c. Fleet bootstrap from inventory (asyncio engine)')
+        print('d. Toggle SSH multiplexing (currently %s)' % ('on' if SSHTONetworkSession.mux else 'off'))
+        print('e. Toggle tracing to %s (currently %s)' % (TRACE_FILE, 'on' if TRACER.enabled else 'off'))
+        print('f. Fleet drift report (running vs startup config)')
+        print('g. Compliance check against golden rules')
+        print('h. Exit')
 
         option = input('Choose an option: ')
 
         if option == 'a':
             print("SSH SESSION SELECTED")
             host_ip = input('Enter IP address: ')
+            port = input('Enter SSH port (blank for 22): ').strip()
             username = input('Enter username: ')
             password = input('Enter password: ')
             hostname = input('Enter new hostname: ')
             enable_password = input('Enter enable password (if any): ')
+            save_delay = input('Save automatically after how many idle seconds (blank to save on request or exit): ')
+            try:
+                save_debounce = float(save_delay) if save_delay.strip() else None
+            except ValueError:
+                print("Invalid delay, changes will be saved on request or exit.")
+                save_debounce = None
             
-            # Create an instance of the SSH session class and start the session
-            ssh = SSHTONetworkSession(host_ip, username, password, hostname, enable_password)
-            ssh.ssh_session()
+            # Take an already authenticated and enabled session for this device from the pool,
+            # so returning to the same router skips the SSH handshake, password and enable steps
+            ssh = SESSION_POOL.acquire(host_ip, username, password, enable_password,
+                                       port=int(port) if port.isdigit() else None)
+            if ssh is None:
+                continue
+
+            ssh.hostname = hostname
+            ssh.commits.set_debounce(save_debounce)
+            if ssh.set_hostname():
+                ssh.compare_configs_menu()
+                SESSION_POOL.release(ssh)
+            else:
+                # The session may still be in config mode, so it is not handed to the next caller
+                SESSION_POOL.discard(ssh)
 
         elif option == 'b':
+            print("FLEET BOOTSTRAP SELECTED")
+            # Run the login/enable/hostname sequence across every device in an inventory file
+            fleet_menu(SSHTONetworkSession)
+
+        elif option == 'c':
+            print("ASYNCIO FLEET BOOTSTRAP SELECTED")
+            # Same sequence, but every device shares one event loop instead of a child process each
+            fleet_menu(AsyncSSHSession)
+
+        elif option == 'd':
+            # Later logins to a device attach to one authenticated connection instead of a new handshake
+            if SSHTONetworkSession.mux is None:
+                SSHTONetworkSession.mux = ControlMaster()
+                print('SSH multiplexing enabled.')
+            else:
+                SSHTONetworkSession.mux.cleanup()
+                SSHTONetworkSession.mux = None
+                print('SSH multiplexing disabled.')
+
+        elif option == 'e':
+            # Every session step is written as a span, for timelines of slow runs
+            if TRACER.enabled:
+                TRACER.disable()
+                print('Tracing disabled.')
+            else:
+                TRACER.enable()
+                print(f'Tracing enabled, spans are appended to {TRACE_FILE}.')
+
+        elif option == 'f':
+            print("FLEET DRIFT REPORT SELECTED")
+            # Unsaved changes (running vs startup) on every device of an inventory, in one JSON report
+            drift_menu(SSHTONetworkSession)
+
+        elif option == 'g':
+            print("COMPLIANCE CHECK SELECTED")
+            # Golden rules over the latest running config of every device in the history store
+            compliance_menu()
+
+        elif option == 'h':
+            SESSION_POOL.close_all()
+            # Stop the background masters so no SSH connection outlives the program
+            if SSHTONetworkSession.mux is not None:
+                SSHTONetworkSession.mux.cleanup()
+            save_profiles()
             print('Session cancelled. Goodbye.')
             break
 
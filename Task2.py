@@ -1,17 +1,26 @@
-import difflib  # to handle the comparisons
 import pexpect  # to handle ssh session
 
+from config_cache import cached_config  # to skip downloading configs that have not changed
+from config_diff import print_diff  # to compare configurations block by block
+from diff_cache import DIFFS  # to reuse the result of comparisons already made
+from file_compare import is_large  # to compare large files without loading them
+from prompts import compile_prompts  # anchored prompt patterns for the device hostname
+from snapshot_store import STORE  # to keep every fetched configuration in the history store
+from streaming import iter_command_lines  # to read long outputs line by line as they arrive
+
 # An SSH class is defined
 class SSHTONetworkSession:
 
     # Constructor method to initialize the SSH session with parameters
     def __init__(self, ip_address, username, password, hostname, enable_password=''):
         self.ip_address = ip_address
+        self.address = ip_address  # Key of the device in the config snapshots
         self.username = username
         self.password = password
         self.enable_password = enable_password
         self.hostname = hostname
         self.session = None  # Will hold the SSH session once connected
+        self.paging_disabled = False  # Set once 'terminal length 0' has been sent
 
     # Function to initiate the SSH session
     def ssh_session(self):
@@ -87,7 +96,8 @@ class SSHTONetworkSession:
         print("\n--- Compare Configurations ---")
         print("1. Compare running config with local version")
         print("2. Compare running config with startup config on device")
-        print("3. Exit")
+        print("3. Compare running config with an archived snapshot")
+        print("4. Exit")
 
         option = input('Choose an option: ')
 
@@ -100,6 +110,10 @@ class SSHTONetworkSession:
             self.compare_with_startup_config_ssh()
 
         elif option == '3':
+            # Compare running config with an earlier snapshot from the history store
+            self.compare_with_snapshot()
+
+        elif option == '4':
             print("Exiting comparison. Goodbye!")
 
         else:
@@ -107,6 +121,17 @@ class SSHTONetworkSession:
 
     def compare_configs(self, saved_config_path, compare_config_path):
         try:
+            # Archived dumps of tens of MB are memory-mapped and their differences printed as they are found
+            if is_large(saved_config_path, compare_config_path):
+                print("\n--- Configuration Differences ---")
+                found = False
+                for line in DIFFS.stream_diff(saved_config_path, compare_config_path):
+                    print(line)
+                    found = True
+                if not found:
+                    print("No differences found.")
+                return
+
             # Compare the file after reading the configurations
             with open(saved_config_path, "r") as f:
                 saved_config = f.readlines()
@@ -114,11 +139,11 @@ class SSHTONetworkSession:
             with open(compare_config_path, "r") as f:
                 compare_config = f.readlines()
 
-            # Compare both configurations using difflib
-            differences = difflib.unified_diff(saved_config, compare_config, fromfile=saved_config_path, tofile=compare_config_path, lineterm='')
+            # Compare both configurations block by block (interface, router, ...);
+            # a pair compared before is answered from the diff cache
             print("\n--- Configuration Differences ---")
-            for line in differences:
-                print(line)
+            print_diff(saved_config, compare_config, fromfile=saved_config_path, tofile=compare_config_path,
+                       differ=DIFFS.diff_configs)
 
         except FileNotFoundError:
             print(f"File {saved_config_path} or {compare_config_path} not found for comparison.")
@@ -127,18 +152,19 @@ class SSHTONetworkSession:
         print("\n--- Running Config vs Startup Config ---")
 
         try:
-            # Get startup configuration
-            self.session.sendline('show startup-config')
-            self.session.expect('#', timeout=30)  # Wait for the prompt after the command
-            startup_config = self.session.before.splitlines()  # Split into lines
+            # Get startup configuration, downloaded again only if it changed since the last snapshot
+            startup_config = cached_config(self, 'startup')
 
             # Get running configuration
             running_config = self.get_running_config().splitlines()  # Split into lines
 
+            # Record both in the history store; unchanged configurations cost nothing there
+            STORE.save(self.ip_address, startup_config, 'startup')
+            STORE.save(self.ip_address, running_config, 'running')
+
             # Compare running configurations with the startup configuration
-            differences = difflib.unified_diff(startup_config, running_config, fromfile='Startup Config', tofile='Running Config', lineterm='')
-            for line in differences:
-                print(line)
+            print_diff(startup_config, running_config, fromfile='Startup Config', tofile='Running Config',
+                       differ=DIFFS.diff_configs)
 
         except pexpect.exceptions.TIMEOUT:
             print("Timeout. Session may be disconnected or timed out.")
@@ -147,12 +173,43 @@ class SSHTONetworkSession:
         except Exception as e:
             print(f"Error during comparison: {e}")
 
+    def compare_with_snapshot(self):
+        # List the archived configurations of this device, oldest first
+        snapshots = STORE.history(self.ip_address)
+        if not snapshots:
+            print(f"No archived configurations for {self.ip_address}.")
+            return
+        print("\n--- Archived Configurations ---")
+        for number, manifest in enumerate(snapshots, 1):
+            print(f"{number}. {manifest['timestamp']} ({manifest['kind']})")
+
+        choice = input('Choose a snapshot: ')
+        if not choice.isdigit() or not 1 <= int(choice) <= len(snapshots):
+            print("Invalid option")
+            return
+        manifest = snapshots[int(choice) - 1]
+
+        running_config = self.get_running_config().splitlines()
+        if running_config:
+            STORE.save(self.ip_address, running_config, 'running')
+            print_diff(STORE.load(manifest), running_config,
+                       fromfile=f"{manifest['kind']} {manifest['timestamp']}", tofile='Running Config',
+                       differ=DIFFS.diff_configs)
+
+    def iter_lines(self, command, timeout=30):
+        # Yield the output lines of a command as they arrive, with paging switched off once per session
+        enable_prompt = compile_prompts(self.hostname)['enable']
+        if not self.paging_disabled:
+            self.session.sendline('terminal length 0')
+            self.session.expect(enable_prompt, timeout=timeout)
+            self.paging_disabled = True
+        yield from iter_command_lines(self.session, command, enable_prompt, timeout)
+
     def get_running_config(self):
-        # Retrieve current running configurations from the device
+        # Retrieve current running configurations from the device,
+        # or from the snapshot cache while its 'Last configuration change' marker is unchanged
         try:
-            self.session.sendline('show running-config')
-            self.session.expect('#', timeout=30)
-            return self.session.before
+            return '\n'.join(cached_config(self, 'running'))
         except pexpect.exceptions.TIMEOUT:
             print("Timeout while waiting for running config.")
         except pexpect.exceptions.EOF:
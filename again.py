@@ -1,12 +1,71 @@
 import pexpect
+import re
+import socket
 import time
 import paramiko
 
+from async_telnet import AsyncTelnetSession  # In-process telnet driver for many devices at once
+from fleet import fleet_menu  # To sweep an inventory of devices
+from transport import AutoTransportSession, choose_transport, load_cache, save_cache  # SSH/Telnet selection
+
 # A time-capsuled function is created to expect a specific pattern
 # The arguments session, prompt(str), and timeout(s) are passed 
 def wait_for_pattern(session, prompt, timeout=20):
     session.expect(prompt, timeout)
 
+# Prompt at the end of the shell output, e.g. 'R1>', 'R1#' or 'R1(config-if)#'
+SHELL_PROMPT = re.compile(r'[\w.\-]+(\([\w\-]+\))?[>#]\s*$')
+PASSWORD_PROMPT = re.compile(r'[Pp]assword:\s*$')
+
+# Only the tail of the output is searched for the prompt, so long outputs are not rescanned
+PROMPT_WINDOW = 256
+
+# A persistent interactive shell on one paramiko channel.
+# Every command runs in the same CLI context, so enable and configuration mode
+# carry over between commands and the channel is only opened once.
+class ShellChannel:
+    def __init__(self, client, timeout=20):
+        self.timeout = timeout
+        self.channel = client.invoke_shell()
+        self.read_until(SHELL_PROMPT)  # Consume the banner and first prompt
+
+    # Read output as it arrives until the pattern matches the end of it
+    def read_until(self, pattern, timeout=None):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        output = ''
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout(f'Timeout waiting for {pattern.pattern!r}')
+            self.channel.settimeout(remaining)
+            data = self.channel.recv(65535)
+            if not data:
+                raise EOFError('SSH channel closed by the device')
+            output += data.decode('utf-8', 'ignore')
+            if pattern.search(output[-PROMPT_WINDOW:]):
+                return output
+
+    # Send one command and return everything up to the next prompt
+    def send_command(self, command, timeout=None):
+        self.channel.send(command + '\n')
+        return self.read_until(SHELL_PROMPT, timeout)
+
+    # Run several commands over the same channel and return (command, output) pairs
+    def run_batch(self, commands, timeout=None):
+        return [(command, self.send_command(command, timeout)) for command in commands]
+
+    # Enter privileged exec mode, answering the password prompt if there is one
+    def enable(self, password):
+        self.channel.send('enable\n')
+        output = self.read_until(re.compile(f'(?:{SHELL_PROMPT.pattern})|(?:{PASSWORD_PROMPT.pattern})'))
+        if PASSWORD_PROMPT.search(output[-PROMPT_WINDOW:]):
+            output += self.send_command(password)
+        return output
+
+    def close(self):
+        self.channel.close()
+
+
 # A class is defined for the Telnet communication with a constructor method
 # function with the ip_address, username, password, and new_hostname as attributes
 class ConnectionToTelnet:
@@ -116,18 +175,24 @@ class ConnectionToSsh:
                 print(f"An error occurred: {e}")
                 return
         
-        # Executing commands after successful login
-        stdin, stdout, stderr = client.exec_command('enable')
-        stdin.write(self.password + '\n')  # Writing the password for enable mode
-        stdin.flush()
+        # Executing commands after successful login, all over one interactive shell channel
+        # so the device stays in enable/config mode between them
+        try:
+            shell = ShellChannel(client)
+            shell.enable(self.password)  # Writing the password for enable mode
 
-        stdin, stdout, stderr = client.exec_command('configure terminal')
-        stdin, stdout, stderr = client.exec_command(f'hostname {self.new_name}')  # Change the hostname
-        print(stdout.read().decode())  # Output from the hostname command
+            # Output is not paged, then the hostname is changed in configuration mode
+            outputs = shell.run_batch(['terminal length 0', 'configure terminal',
+                                       f'hostname {self.new_name}', 'end'])
+            print(outputs[2][1])  # Output from the hostname command
 
-        stdin, stdout, stderr = client.exec_command('show ip interface brief')
-        channel = stdout.read().decode()  # Capture output from the command
-        print(channel)  # Print the command output
+            channel = shell.send_command('show ip interface brief')  # Capture output from the command
+            print(channel)  # Print the command output
+            shell.close()
+        except (socket.timeout, EOFError, paramiko.SSHException) as e:
+            print(f"An error occurred: {e}")
+            client.close()
+            return
 
         # Writing the output to a file
         with open("labs_assignment_ssh.txt", "w") as f:
@@ -140,11 +205,17 @@ def menu():
     # This menu is displayed when the script is executed while collecting user information be it
     # Telnet or SSH
 
+    # Transports already found for known devices
+    load_cache()
+
     while True:
         print('\n-----Menu-------')
         print('1. Telnet Connection')
         print('2. SSH Connection')
-        print('3. Exit')
+        print('3. Telnet sweep from inventory (concurrent)')
+        print('4. Connection with automatic SSH/Telnet selection')
+        print('5. Sweep from inventory with automatic SSH/Telnet selection')
+        print('6. Exit')
 
         option = input('Select an option from the choices above: ')  # Fixed prompt text
 
@@ -167,6 +238,35 @@ def menu():
             ssh_connection.connection()  # Call the connection method
 
         elif option == '3':
+            # Telnet-only gear is logged into concurrently from this process,
+            # without a telnet child process per device
+            fleet_menu(AsyncTelnetSession)
+
+        elif option == '4':
+            # SSH and Telnet are probed in parallel and the working one is remembered for the device
+            host_ip = input('Enter the device IP address: ')
+            transport = choose_transport(host_ip)
+            if transport is None:
+                print(f'Neither SSH nor Telnet is reachable on {host_ip}.')
+                continue
+            save_cache()
+
+            print(f'{transport.upper()} selected for {host_ip}')
+            username = input(f'Enter the {transport.upper()} username: ')
+            password = input(f'Enter the {transport.upper()} password: ')
+            hostname = input('Enter the new hostname for the device: ')
+            if transport == 'ssh':
+                connection = ConnectionToSsh(host_ip, username, password, hostname)
+            else:
+                connection = ConnectionToTelnet(host_ip, username, password, hostname)
+            connection.connection()  # Call the connection method
+
+        elif option == '5':
+            # Every device gets whichever of SSH or Telnet answers first
+            fleet_menu(AutoTransportSession)
+            save_cache()
+
+        elif option == '6':
             # Close the program
             print("Cancelled. Goodbye")
             break
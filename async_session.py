@@ -0,0 +1,219 @@
+import abc  # Transports are provided by the subclasses
+import asyncio  # To drive many device sessions from one event loop
+import re  # To match the device prompts
+
+from prompts import SEARCH_WINDOW, compile_prompts  # Anchored, precompiled prompt patterns
+
+try:
+    import asyncssh  # In-process SSH client, so no local ssh child process per device
+except ImportError:
+    asyncssh = None
+
+
+# Prompts seen during the login/enable/configure sequence
+USERNAME_PROMPT = re.compile(r'[Uu]sername:\s*$')
+PASSWORD_PROMPT = re.compile(r'[Pp]assword:\s*$')
+USER_PROMPT = re.compile(r'>\s*$')
+ENABLE_PROMPT = re.compile(r'#\s*$')
+ANY_PROMPT = re.compile(r'[>#]\s*$')
+CONFIG_PROMPT = re.compile(r'\(config\)#\s*$')
+
+# Bytes read from the transport at a time
+READ_SIZE = 65536
+
+# Login password attempts before giving up, as in ConnectionToTelnet
+LOGIN_ATTEMPTS = 3
+
+
+# Asyncio counterpart of SSHTONetworkSession.
+# Subclasses open the transport and set self.reader/self.writer; every verb of
+# the pexpect class (login, enable, config mode, send/expect, show commands)
+# is an awaitable step here, so thousands of sessions can share one loop.
+class AsyncNetworkSession(abc.ABC):
+    default_port = None
+
+    def __init__(self, ip_address, username, password, hostname, enable_password='', port=None, timeout=20):
+        self.ip_address = ip_address
+        self.username = username
+        self.password = password
+        self.hostname = hostname
+        self.enable_password = enable_password
+        self.port = port or self.default_port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.buffer = ''  # Output received but not matched yet
+        self.before = ''  # Output preceding the last match, like pexpect's .before
+        self.after = ''  # Text of the last match, like pexpect's .after
+        self.error = ''  # Reason the last bootstrap failed, used in fleet summaries
+
+    # Open the connection and set self.reader/self.writer
+    @abc.abstractmethod
+    async def open_transport(self):
+        pass
+
+    # Write raw text to the device
+    async def send(self, text):
+        self.writer.write(text)
+        drain = getattr(self.writer, 'drain', None)
+        if drain is not None:
+            await drain()
+
+    async def sendline(self, line=''):
+        await self.send(line + '\n')
+
+    # Wait until one of the patterns matches the unread output and return its index.
+    # Prompts end the output, so only its last SEARCH_WINDOW characters are searched, as
+    # pexpect's searchwindowsize does, instead of rescanning a long output on every read.
+    # Raises asyncio.TimeoutError on timeout and EOFError if the device closes the session.
+    async def expect(self, patterns, timeout=None):
+        if not isinstance(patterns, (list, tuple)):
+            patterns = [patterns]
+        patterns = [re.compile(p) if isinstance(p, str) else p for p in patterns]
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.timeout if timeout is None else timeout)
+        while True:
+            start = max(0, len(self.buffer) - SEARCH_WINDOW)
+            for index, pattern in enumerate(patterns):
+                match = pattern.search(self.buffer, start)
+                if match:
+                    self.before = self.buffer[:match.start()]
+                    self.after = match.group()
+                    self.buffer = self.buffer[match.end():]
+                    return index
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f'Timeout waiting for prompt from {self.ip_address}')
+            data = await asyncio.wait_for(self.reader.read(READ_SIZE), remaining)
+            if not data:
+                raise EOFError(f'{self.ip_address} closed the session')
+            self.buffer += data
+
+    # Answer username/password prompts until the device shows its exec or enable prompt
+    async def login(self):
+        attempts = 0
+        while True:
+            index = await self.expect([USERNAME_PROMPT, PASSWORD_PROMPT, ANY_PROMPT])
+            if index == 0:
+                await self.sendline(self.username)
+            elif index == 1:
+                attempts += 1
+                if attempts > LOGIN_ATTEMPTS:
+                    return False
+                await self.sendline(self.password)
+            else:
+                return True
+
+    # Enter privileged exec mode, sending the enable password if asked for it
+    async def enable(self):
+        if ENABLE_PROMPT.search(self.after):
+            return True
+        await self.sendline('enable')
+        index = await self.expect([PASSWORD_PROMPT, ENABLE_PROMPT, USER_PROMPT])
+        if index == 0:
+            await self.sendline(self.enable_password)
+            index = await self.expect([ENABLE_PROMPT, USER_PROMPT, PASSWORD_PROMPT])
+            return index == 0
+        return index == 1
+
+    async def config_mode(self):
+        await self.sendline('configure terminal')
+        await self.expect(CONFIG_PROMPT)
+
+    async def set_hostname(self, hostname):
+        await self.sendline(f'hostname {hostname}')
+        await self.expect(compile_prompts(hostname)['config'])
+        self.hostname = hostname
+
+    # Leave configuration mode back to privileged exec
+    async def end(self):
+        await self.sendline('end')
+        await self.expect(ENABLE_PROMPT)
+
+    # Run an exec command and return its output without the echoed command line
+    async def send_command(self, command, timeout=10):
+        await self.sendline(command)
+        await self.expect(ANY_PROMPT, timeout)
+        lines = self.before.splitlines()
+        if lines and lines[0].strip() == command:
+            lines = lines[1:]
+        return '\n'.join(lines)
+
+    # Interface status lines, filtered the same way as show_ip_interface_brief()
+    async def show_ip_interface_brief(self):
+        output = await self.send_command('show ip interface brief')
+        filtered_lines = [line.strip() for line in output.splitlines() if line.strip()]
+        return [line for line in filtered_lines if "Interface" in line or "up" in line or "down" in line]
+
+    async def show_running_config(self):
+        return await self.send_command('show running-config', timeout=30)
+
+    # Record why the session could not be prepared so fleet runs can report it
+    def _fail(self, message):
+        self.error = message
+        print(f'{self.ip_address}: {message}')
+        return False
+
+    # The ssh_session() sequence as awaitable steps: connect, login, enable,
+    # configure terminal, hostname. Returns True when the device is ready.
+    async def bootstrap(self):
+        self.error = ''
+        try:
+            await asyncio.wait_for(self.open_transport(), self.timeout)
+        except Exception as e:
+            return self._fail(f'Session failed to establish: {e}')
+
+        try:
+            if not await self.login():
+                return self._fail('Authentication failed.')
+            if not await self.enable():
+                return self._fail('Enable mode failed.')
+        except (asyncio.TimeoutError, EOFError):
+            return self._fail('Authentication failed.')
+
+        try:
+            await self.config_mode()
+        except (asyncio.TimeoutError, EOFError):
+            return self._fail('Config mode failed.')
+
+        try:
+            await self.set_hostname(self.hostname)
+        except (asyncio.TimeoutError, EOFError):
+            return self._fail('Failed to set hostname.')
+
+        await self.end()
+        return True
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+# SSH transport for the asyncio engine, authenticated by asyncssh itself
+class AsyncSSHSession(AsyncNetworkSession):
+    default_port = 22
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connection = None
+
+    async def open_transport(self):
+        if asyncssh is None:
+            raise RuntimeError('the asyncio SSH engine needs the asyncssh package (pip install asyncssh)')
+
+        # Host keys are accepted automatically, as paramiko.AutoAddPolicy does in ConnectionToSsh
+        self.connection = await asyncssh.connect(self.ip_address, port=self.port, username=self.username,
+                                                 password=self.password, known_hosts=None)
+        process = await self.connection.create_process(term_type='vt100', encoding='utf-8')
+        self.reader = process.stdout
+        self.writer = process.stdin
+
+    async def close(self):
+        await super().close()
+        if self.connection is not None:
+            self.connection.close()
+            await self.connection.wait_closed()
+            self.connection = None
@@ -0,0 +1,131 @@
+import asyncio  # Non-blocking sockets, many sessions on one event loop
+import codecs  # To decode UTF-8 split across reads
+
+from async_session import READ_SIZE, AsyncNetworkSession  # Shared login/enable/config/show verbs
+
+
+# Telnet commands and options (RFC 854/857/858)
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+ECHO = 1
+SUPPRESS_GO_AHEAD = 3
+
+# Options we let the device enable on its side; everything else is refused
+ACCEPTED_OPTIONS = {ECHO, SUPPRESS_GO_AHEAD}
+
+
+# Reads from a telnet socket, answers option negotiation itself and returns only
+# the text stream, so AsyncNetworkSession can expect() on it like on SSH output
+class TelnetReader:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.pending = b''  # Start of a command split across two reads
+        self.remote_enabled = set()  # Options the device has enabled (WILL acknowledged with DO)
+        self.refused = set()  # (command, option) replies already sent, so negotiation never loops
+
+    async def read(self, size=READ_SIZE):
+        while True:
+            data = await self.reader.read(size)
+            if not data:
+                return self.decoder.decode(self.pending, final=True) if self.pending else ''
+            text = self.decoder.decode(self._parse(self.pending + data))
+            await self.writer.drain()
+            # Reads that only carried negotiation produce no text; keep reading
+            if text:
+                return text
+
+    # Strip telnet commands from the data and answer the option requests.
+    # Returns the plain data bytes; an incomplete command at the end is kept for the next read.
+    def _parse(self, data):
+        out = bytearray()
+        self.pending = b''
+        i = 0
+        while i < len(data):
+            byte = data[i]
+            if byte != IAC:
+                out.append(byte)
+                i += 1
+                continue
+            if i + 1 >= len(data):
+                self.pending = data[i:]
+                break
+
+            command = data[i + 1]
+            if command == IAC:
+                out.append(IAC)  # Escaped 0xFF data byte
+                i += 2
+            elif command in (DO, DONT, WILL, WONT):
+                if i + 2 >= len(data):
+                    self.pending = data[i:]
+                    break
+                self._negotiate(command, data[i + 2])
+                i += 3
+            elif command == SB:
+                # Sub-negotiation runs until IAC SE; none is supported so it is skipped
+                end = data.find(bytes([IAC, SE]), i + 2)
+                if end == -1:
+                    self.pending = data[i:]
+                    break
+                i = end + 2
+            else:
+                i += 2  # NOP, GA and the other two-byte commands carry no data
+        return bytes(out)
+
+    def _negotiate(self, command, option):
+        if command == WILL:
+            if option in ACCEPTED_OPTIONS:
+                if option not in self.remote_enabled:
+                    self.remote_enabled.add(option)
+                    self._reply(DO, option)
+            else:
+                self._reply(DONT, option)
+        elif command == WONT:
+            if option in self.remote_enabled:
+                self.remote_enabled.discard(option)
+                self._reply(DONT, option)
+        else:
+            # We enable nothing on our side, so every DO is refused and DONT needs no answer
+            if command == DO:
+                self._reply(WONT, option)
+
+    def _reply(self, command, option):
+        # Refusals are only sent once per option, so a device repeating itself cannot loop us
+        if command in (DONT, WONT):
+            if (command, option) in self.refused:
+                return
+            self.refused.add((command, option))
+        self.writer.write(bytes([IAC, command, option]))
+
+
+# Writes text to a telnet socket: NVT line endings and escaped 0xFF bytes
+class TelnetWriter:
+    def __init__(self, writer):
+        self.writer = writer
+
+    def write(self, text):
+        data = text.replace('\r\n', '\n').replace('\n', '\r\n').encode('utf-8')
+        self.writer.write(data.replace(bytes([IAC]), bytes([IAC, IAC])))
+
+    async def drain(self):
+        await self.writer.drain()
+
+    def close(self):
+        self.writer.close()
+
+
+# Telnet transport for the asyncio engine, replacing one `telnet` child process per device.
+# Login answers the Username:/Password: prompts with up to three attempts, as ConnectionToTelnet does.
+class AsyncTelnetSession(AsyncNetworkSession):
+    default_port = 23
+
+    async def open_transport(self):
+        reader, writer = await asyncio.open_connection(self.ip_address, self.port)
+        self.reader = TelnetReader(reader, writer)
+        self.writer = TelnetWriter(writer)
@@ -0,0 +1,437 @@
+import asyncio  # The asyncio engine and the simulator run on event loops
+import contextlib  # To silence the session methods' progress messages
+import json  # To save and load the baselines
+import multiprocessing  # The simulated devices run in their own process
+import os  # For /proc sampling and the null output
+import tempfile  # Each run keeps its config snapshots in its own directory
+import threading  # For the resource sampler
+import time  # To time the phases
+from concurrent.futures import ThreadPoolExecutor  # One thread per pexpect session
+
+import pexpect  # To spawn the ssh client like SSHTONetworkSession.login()
+
+from Luke import SSHTONetworkSession  # The session class being measured
+from async_session import AsyncSSHSession  # asyncio engine over SSH
+from async_telnet import AsyncTelnetSession  # asyncio engine over Telnet
+from config_cache import ConfigSnapshotCache, cached_config  # Startup/running retrieval as in Task2.py
+from config_diff import diff_configs  # Same comparison as compare_with_startup_config_ssh
+from config_transaction import find_errors  # Rejected lines in the echo of a config block
+from latency import LatencyProfile  # Timeouts learnt within one run
+from prompts import LEARN_PROMPT, SEARCH_WINDOW, PromptMatcher, compile_prompts  # Prompt patterns
+from simulator import DeviceProfile, Simulator, raise_file_limit  # Local stand-in devices
+
+
+# Phases of ssh_session() followed by the configuration and retrieval steps, in order
+PHASES = ['spawn', 'password_prompt', 'auth', 'enable', 'configure_terminal', 'hostname',
+          'creating_loopback', 'creating_ospf', 'get_running_config', 'compare_with_startup_config_ssh']
+
+CONCURRENCY_LEVELS = [1, 10, 100, 1000]
+PERCENTILES = [50, 90, 99]
+
+BASELINE_FILE = 'benchmark_baselines.json'
+BASE_PORT = 30000
+
+# A phase regresses when its p90 grows by more than this factor over the baseline
+REGRESSION_FACTOR = 1.2
+
+# Seconds between two resource samples
+SAMPLE_INTERVAL = 0.1
+
+SESSION_TIMEOUT = 60
+
+# ssh options for the simulator: throwaway host keys, and the keyboard-interactive
+# 'Password:' prompt that IOS presents and login() waits for
+SSH_OPTIONS = ('-o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -o LogLevel=ERROR '
+               '-o PreferredAuthentications=keyboard-interactive')
+
+
+# SSHTONetworkSession with the running config retrieval of Task2.py, so the benchmark covers the
+# whole ssh_session() workflow on one connection. Config snapshots go to the run's own cache and
+# timeouts are learnt from scratch, so a run neither reads nor changes the user's snapshots and profiles.
+class BenchmarkSession(SSHTONetworkSession):
+    def __init__(self, *args, snapshots=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.snapshots = snapshots or self.snapshots
+        self.latency = LatencyProfile()
+
+    def get_running_config(self):
+        return '\n'.join(cached_config(self, 'running', self.snapshots))
+
+
+# Durations and failures of every phase across the sessions of one run
+class PhaseTimings:
+    def __init__(self):
+        self.samples = {phase: [] for phase in PHASES}
+        self.failures = {phase: 0 for phase in PHASES}
+        self.lock = threading.Lock()
+
+    def add(self, phase, seconds, ok=True):
+        with self.lock:
+            if ok:
+                self.samples[phase].append(seconds)
+            else:
+                self.failures[phase] += 1
+
+    # Time a synchronous phase; a falsy result or an exception counts as a failure
+    @contextlib.contextmanager
+    def measure(self, phase):
+        start = time.perf_counter()
+        outcome = {'ok': True}
+        try:
+            yield outcome
+        except Exception:
+            outcome['ok'] = False
+            raise
+        finally:
+            self.add(phase, time.perf_counter() - start, outcome['ok'])
+
+
+# Value at the given percentile of a sorted list (nearest rank)
+def percentile(values, p):
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+# Peak resident memory and open file descriptors of this process and its children
+# (the ssh clients) while a run is in progress, sampled from /proc
+class ResourceSampler:
+    def __init__(self, exclude=()):
+        self.exclude = set(exclude)  # Child pids not to count, such as the simulator
+        self.peak_rss_kb = 0
+        self.peak_children_rss_kb = 0
+        self.peak_fds = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.page_kb = os.sysconf('SC_PAGE_SIZE') // 1024 if hasattr(os, 'sysconf') else 4
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self._sample()
+
+    def _run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            self._sample()
+
+    def _rss_kb(self, pid):
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                return int(f.read().split()[1]) * self.page_kb
+        except (OSError, IndexError, ValueError):
+            return 0
+
+    def _sample(self):
+        if not os.path.isdir('/proc/self'):
+            return
+        self.peak_rss_kb = max(self.peak_rss_kb, self._rss_kb('self'))
+        try:
+            self.peak_fds = max(self.peak_fds, len(os.listdir('/proc/self/fd')))
+        except OSError:
+            pass
+
+        children = 0
+        parent = str(os.getpid())
+        for pid in os.listdir('/proc'):
+            if not pid.isdigit() or int(pid) in self.exclude:
+                continue
+            try:
+                with open(f'/proc/{pid}/stat') as f:
+                    # The command name may contain spaces; the parent pid follows its closing parenthesis
+                    fields = f.read().rsplit(')', 1)[1].split()
+            except (OSError, IndexError):
+                continue
+            if fields[1] == parent:
+                children += self._rss_kb(pid)
+        self.peak_children_rss_kb = max(self.peak_children_rss_kb, children)
+
+
+# Run every phase against one device with the pexpect engine
+def run_pexpect_session(device, timings, index, snapshots):
+    ssh = BenchmarkSession(device['ip_address'], device['username'], device['password'],
+                           f'BENCH{index}', device['enable_password'], port=device['port'], snapshots=snapshots)
+    try:
+        with timings.measure('spawn'):
+            ssh.session = pexpect.spawn(f"ssh -p {device['port']} {SSH_OPTIONS} {device['username']}@{device['ip_address']}",
+                                        encoding='utf-8', timeout=SESSION_TIMEOUT)
+        with timings.measure('password_prompt') as outcome:
+            outcome['ok'] = ssh.session.expect(['Password:', pexpect.TIMEOUT, pexpect.EOF]) == 0
+        if not outcome['ok']:
+            return False
+        with timings.measure('auth') as outcome:
+            ssh.session.sendline(ssh.password)
+            outcome['ok'] = ssh.session.expect([LEARN_PROMPT, pexpect.TIMEOUT, pexpect.EOF],
+                                               searchwindowsize=SEARCH_WINDOW) == 0
+        if not outcome['ok']:
+            return False
+        # Same prompt learning as login()
+        ssh.prompts = PromptMatcher(ssh.session.match.group(1))
+        ssh.privileged = ssh.session.match.group(2) == '#'
+
+        with timings.measure('enable') as outcome:
+            outcome['ok'] = ssh.enter_enable()
+        with timings.measure('configure_terminal') as outcome:
+            ssh._send('configure terminal')
+            outcome['ok'] = ssh._expect('config') == 0
+        with timings.measure('hostname') as outcome:
+            ssh._send(f'hostname {ssh.hostname}')
+            ssh.prompts = PromptMatcher(ssh.hostname)
+            outcome['ok'] = ssh._expect('config') == 0
+            ssh._send('exit')
+            ssh._expect('enable')
+
+        # creating_loopback() and creating_ospf() report errors instead of raising them, so the
+        # phases call configure() directly; a rejected line or a timeout fails the phase. The
+        # save is flushed in the phase, as the baselines were taken when each step wrote memory.
+        with timings.measure('creating_loopback'):
+            ssh.configure(['interface loopback 0',
+                           f'ip address 10.255.{index // 250 % 250}.{index % 250 + 1} 255.255.255.255'])
+            ssh.commits.mark_dirty('interface loopback 0')
+            ssh.commits.flush()
+        with timings.measure('creating_ospf'):
+            ssh.configure(['router ospf 1', 'network 10.255.0.0 0.0.255.255 area 0'])
+            ssh.commits.mark_dirty('router ospf 1')
+            ssh.commits.flush()
+        with timings.measure('get_running_config') as outcome:
+            outcome['ok'] = bool(ssh.get_running_config())
+        # Same steps as compare_with_startup_config_ssh(), without its error handling and printing
+        with timings.measure('compare_with_startup_config_ssh') as outcome:
+            startup = cached_config(ssh, 'startup', ssh.snapshots)
+            running = cached_config(ssh, 'running', ssh.snapshots)
+            outcome['ok'] = bool(startup) and bool(running)
+            diff_configs(startup, running)
+        return True
+    except Exception:
+        return False
+    finally:
+        if ssh.session is not None:
+            ssh.session.close(force=True)
+
+
+# Run the same phases with the asyncio engine (no ssh child process, so no
+# separate password_prompt phase: the transport authenticates during 'spawn' or 'auth')
+async def run_async_session(session_class, device, timings, index):
+    hostname = f'BENCH{index}'
+    session = session_class(device['ip_address'], device['username'], device['password'],
+                            hostname, device['enable_password'], port=int(device['port']),
+                            timeout=SESSION_TIMEOUT)
+    enable_prompt = compile_prompts(hostname)['enable']
+
+    async def phase(name, step):
+        start = time.perf_counter()
+        try:
+            ok = await step()
+        except Exception:
+            ok = False
+        timings.add(name, time.perf_counter() - start, ok is not False)
+        return ok is not False
+
+    # Same pipelined write as run_config(); a line the device rejected fails the phase
+    async def configure(lines):
+        await session.send('\n'.join(['configure terminal', *lines, 'end']) + '\n')
+        await session.expect(enable_prompt)
+        return not find_errors(session.before)
+
+    async def hostname_step():
+        await session.set_hostname(hostname)
+        await session.end()
+
+    async def compare():
+        startup = (await session.send_command('show startup-config', timeout=30)).splitlines()
+        running = (await session.show_running_config()).splitlines()
+        diff_configs(startup, running)
+
+    try:
+        steps = [
+            ('spawn', session.open_transport),
+            ('auth', session.login),
+            ('enable', session.enable),
+            ('configure_terminal', session.config_mode),
+            ('hostname', hostname_step),
+            ('creating_loopback', lambda: configure(['interface loopback 0',
+                                                     f'ip address 10.255.{index // 250 % 250}.{index % 250 + 1} 255.255.255.255'])),
+            ('creating_ospf', lambda: configure(['router ospf 1', 'network 10.255.0.0 0.0.255.255 area 0'])),
+            ('get_running_config', session.show_running_config),
+            ('compare_with_startup_config_ssh', compare),
+        ]
+        for name, step in steps:
+            if not await phase(name, step):
+                return False
+        return True
+    finally:
+        await session.close()
+
+
+async def run_async_sessions(session_class, devices, timings):
+    return await asyncio.gather(*[run_async_session(session_class, device, timings, index)
+                                  for index, device in enumerate(devices)])
+
+
+# Entry point of the simulator process
+def serve_devices(count, protocol, base_port, profile, ready, stop):
+    async def serve():
+        async with Simulator(count, protocol, base_port, profile=profile):
+            ready.set()
+            while not stop.is_set():
+                await asyncio.sleep(0.2)
+    asyncio.run(serve())
+
+
+# One benchmark run: `concurrency` sessions, each against its own simulated device, all started together.
+# engine is 'pexpect' (SSHTONetworkSession over the ssh client) or 'asyncio'; protocol is 'ssh' or 'telnet'.
+def run_level(concurrency, engine='pexpect', protocol='ssh', profile=None, base_port=BASE_PORT):
+    raise_file_limit()
+    # Built here first so a missing asyncssh is reported before the server process starts
+    devices = Simulator(concurrency, protocol, base_port).inventory()
+    ready, stop = multiprocessing.Event(), multiprocessing.Event()
+    server = multiprocessing.Process(target=serve_devices,
+                                     args=(concurrency, protocol, base_port, profile or DeviceProfile(), ready, stop),
+                                     daemon=True)
+    server.start()
+    try:
+        if not ready.wait(60):
+            raise RuntimeError('The simulated devices did not start.')
+        timings = PhaseTimings()
+
+        with ResourceSampler(exclude=[server.pid]) as sampler, open(os.devnull, 'w') as null, \
+                contextlib.redirect_stdout(null), tempfile.TemporaryDirectory() as directory:
+            snapshots = ConfigSnapshotCache(directory)
+            start = time.perf_counter()
+            if engine == 'pexpect':
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    results = list(pool.map(lambda item: run_pexpect_session(item[1], timings, item[0], snapshots),
+                                            enumerate(devices)))
+            else:
+                session_class = AsyncSSHSession if protocol == 'ssh' else AsyncTelnetSession
+                results = asyncio.run(run_async_sessions(session_class, devices, timings))
+            elapsed = time.perf_counter() - start
+    finally:
+        stop.set()
+        server.join(10)
+        if server.is_alive():
+            server.terminate()
+
+    return summarize(engine, protocol, concurrency, timings, results, elapsed, sampler)
+
+
+def summarize(engine, protocol, concurrency, timings, results, elapsed, sampler):
+    phases = {}
+    for phase in PHASES:
+        values = sorted(timings.samples[phase])
+        if not values and not timings.failures[phase]:
+            continue
+        phases[phase] = {'count': len(values), 'failures': timings.failures[phase],
+                         'mean': sum(values) / len(values) if values else None,
+                         'max': values[-1] if values else None}
+        for p in PERCENTILES:
+            phases[phase][f'p{p}'] = percentile(values, p)
+
+    completed = sum(1 for result in results if result)
+    return {
+        'engine': engine,
+        'protocol': protocol,
+        'concurrency': concurrency,
+        'sessions': len(results),
+        'completed': completed,
+        'seconds': elapsed,
+        'throughput': completed / elapsed if elapsed else 0.0,  # Complete workflows per second
+        'peak_rss_kb': sampler.peak_rss_kb,
+        'peak_children_rss_kb': sampler.peak_children_rss_kb,
+        'peak_fds': sampler.peak_fds,
+        'phases': phases,
+    }
+
+
+def ms(value):
+    return '-' if value is None else f'{value * 1000:.1f}'
+
+
+def print_report(result):
+    print(f"\n--- {result['engine']}/{result['protocol']} at concurrency {result['concurrency']} ---")
+    print(f"{'Phase':<33}{'n':>6}{'fail':>6}" + ''.join(f"{f'p{p} ms':>10}" for p in PERCENTILES) + f"{'max ms':>10}")
+    for phase, stats in result['phases'].items():
+        print(f"{phase:<33}{stats['count']:>6}{stats['failures']:>6}"
+              + ''.join(f"{ms(stats[f'p{p}']):>10}" for p in PERCENTILES) + f"{ms(stats['max']):>10}")
+    print(f"{result['completed']}/{result['sessions']} sessions in {result['seconds']:.2f} s "
+          f"({result['throughput']:.1f} sessions/s), peak RSS {result['peak_rss_kb'] / 1024:.1f} MB "
+          f"+ {result['peak_children_rss_kb'] / 1024:.1f} MB in child processes, peak FDs {result['peak_fds']}")
+
+
+def baseline_key(result):
+    return f"{result['engine']}/{result['protocol']}/{result['concurrency']}"
+
+
+def load_baselines(path=BASELINE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_baselines(results, path=BASELINE_FILE):
+    baselines = load_baselines(path)
+    for result in results:
+        baselines[baseline_key(result)] = dict(result, saved_at=time.strftime('%Y-%m-%d %H:%M:%S'))
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2)
+
+
+# Phases (and throughput) that got slower than the saved baseline for the same engine and concurrency
+def find_regressions(result, baselines, factor=REGRESSION_FACTOR):
+    baseline = baselines.get(baseline_key(result))
+    if baseline is None:
+        return []
+    regressions = []
+    for phase, stats in result['phases'].items():
+        old = baseline['phases'].get(phase, {}).get('p90')
+        if old and stats['p90'] is not None and stats['p90'] > old * factor:
+            regressions.append(f"{phase}: p90 {ms(old)} -> {ms(stats['p90'])} ms")
+    if baseline['throughput'] and result['throughput'] * factor < baseline['throughput']:
+        regressions.append(f"throughput: {baseline['throughput']:.1f} -> {result['throughput']:.1f} sessions/s")
+    return regressions
+
+
+# Run the levels, print the reports and compare them with the baselines
+def run_suite(levels=CONCURRENCY_LEVELS, engine='pexpect', protocol='ssh', profile=None, save=False):
+    baselines = load_baselines()
+    results = []
+    for concurrency in levels:
+        result = run_level(concurrency, engine, protocol, profile)
+        print_report(result)
+        for regression in find_regressions(result, baselines):
+            print(f"REGRESSION {regression}")
+        results.append(result)
+    if save:
+        save_baselines(results)
+        print(f"\nBaselines saved to {BASELINE_FILE}.")
+    return results
+
+
+def menu():
+    print('--------- SESSION BENCHMARK ---------')
+    engine = input('Engine (pexpect/asyncio) [pexpect]: ').strip() or 'pexpect'
+    protocol = 'ssh' if engine == 'pexpect' else (input('Protocol (ssh/telnet) [ssh]: ').strip() or 'ssh')
+    levels = input(f"Concurrency levels [{' '.join(map(str, CONCURRENCY_LEVELS))}]: ").split()
+    latency = input('Simulated latency per command in seconds [0]: ').strip()
+    save = input('Save results as the new baseline (y/n) [n]: ').strip() == 'y'
+
+    try:
+        levels = [int(level) for level in levels] or CONCURRENCY_LEVELS
+        profile = DeviceProfile(latency=float(latency or 0))
+    except ValueError:
+        print('Invalid number.')
+        return
+    try:
+        run_suite(levels, engine, protocol, profile, save)
+    except RuntimeError as e:
+        print(e)
+
+
+if __name__ == "__main__":
+    menu()
@@ -0,0 +1,87 @@
+import threading  # For the debounce timer and to keep saves off a busy session
+import time  # To timestamp the unsaved changes
+from contextlib import contextmanager  # For the `with scheduler.batch():` form
+
+
+# Coalesces 'write memory' for one session.
+# Configuration helpers mark the session dirty instead of saving; the running
+# config is written to startup once, at the end of a batch, on flush()/close(),
+# or `debounce` seconds after the last change when a debounce is configured.
+class CommitScheduler:
+    def __init__(self, save, debounce=None, lock=None):
+        self.save = save  # Callable that runs 'write memory' on the session
+        self.debounce = debounce
+        self.lock = lock or threading.RLock()  # Held while saving, shared with the session's users
+        self.pending = []  # (time, description) of every change not saved yet
+        self.batch_depth = 0
+        self.timer = None
+
+    # Record a configuration change that still has to be saved
+    def mark_dirty(self, description):
+        with self.lock:
+            self.pending.append((time.time(), description))
+            if self.debounce is not None and self.batch_depth == 0:
+                self._restart_timer()
+
+    @property
+    def dirty(self):
+        return bool(self.pending)
+
+    # Descriptions of the changes that are not in the startup config yet
+    def unsaved(self):
+        with self.lock:
+            return [description for _, description in self.pending]
+
+    # Save now if anything is pending. Returns True if 'write memory' was sent.
+    def flush(self):
+        with self.lock:
+            self._cancel_timer()
+            if not self.pending:
+                return False
+            self.save()
+            # Only forget the changes once the save went through
+            self.pending = []
+            return True
+
+    # Defer saving until the outermost batch ends, then save once
+    @contextmanager
+    def batch(self):
+        with self.lock:
+            self.batch_depth += 1
+            self._cancel_timer()
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.batch_depth -= 1
+                if self.batch_depth == 0:
+                    self.flush()
+
+    # Change the debounce; None leaves saving to the end of a batch, flush() and close()
+    def set_debounce(self, seconds):
+        with self.lock:
+            self.debounce = seconds
+            self._cancel_timer()
+            if seconds is not None and self.pending and self.batch_depth == 0:
+                self._restart_timer()
+
+    # Save whatever is left before the session goes away
+    def close(self):
+        self.flush()
+
+    def _restart_timer(self):
+        self._cancel_timer()
+        self.timer = threading.Timer(self.debounce, self._on_timer)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def _on_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error saving configuration: {e}")
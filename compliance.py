@@ -0,0 +1,274 @@
+import hashlib  # Devices are evaluated again only when their config or the rules changed
+import json  # Rules, state and report are JSON files
+import multiprocessing  # Evaluation processes are spawned, like the drift diff pool
+import os  # For the atomic replace of the state and report files
+import re  # Line rules are regular expressions
+import time  # To time the run and stamp the report
+from concurrent.futures import ProcessPoolExecutor  # Evaluation across cores
+
+from config_tree import ConfigTree, area_key  # Parsed, indexed configurations
+from fleet import device_address, load_inventory  # Same inventory format as the fleet bootstrap
+from snapshot_store import STORE  # Latest running configuration of each device
+
+
+# Golden rules, a JSON list such as:
+# [{"id": "loopback0", "type": "interface_present", "name": "Loopback0"},
+#  {"id": "no-http", "type": "forbid_line", "pattern": "^ip http server"},
+#  {"id": "if-description", "type": "require_line", "section": "interface", "match": "^interface Gi",
+#   "pattern": "^description "},
+#  {"id": "ospf-areas", "type": "ospf_areas", "allowed": ["0", "1"]},
+#  {"id": "eigrp-as", "type": "eigrp_as", "allowed": ["100"]}]
+RULES_FILE = 'compliance_rules.json'
+
+# Results of the last run per device, so unchanged devices are not evaluated again
+STATE_FILE = 'compliance_state.json'
+COMPLIANCE_REPORT = 'compliance_report.json'
+
+# Devices sent to an evaluation process at a time
+BATCH_SIZE = 50
+
+# Processes evaluating configurations; None lets the pool use one per core
+EVALUATION_PROCESSES = None
+
+
+# Rule checks. Each compiles its patterns once and returns the violation messages for one tree.
+
+class InterfacePresent:
+    def __init__(self, spec):
+        self.name = spec['name']
+
+    def check(self, tree):
+        return [] if tree.interface(self.name) else [f'interface {self.name} is missing']
+
+
+# A line matching `pattern` must exist: at top level, or under every section of type
+# `section` whose header matches `match`
+class RequireLine:
+    def __init__(self, spec):
+        self.pattern = re.compile(spec['pattern'])
+        self.section = spec.get('section')
+        self.match = re.compile(spec['match']) if spec.get('match') else None
+
+    def check(self, tree):
+        if self.section is None:
+            found = any(self.pattern.search(node.text) for node in tree.root.children)
+            return [] if found else [f'no line matching {self.pattern.pattern!r}']
+        return [f'{node.text}: no line matching {self.pattern.pattern!r}'
+                for node in _sections(tree, self.section, self.match)
+                if not any(self.pattern.search(child.text) for child in node.children)]
+
+
+# No line may match `pattern`: at top level, or under the sections selected as for RequireLine
+class ForbidLine(RequireLine):
+    def check(self, tree):
+        if self.section is None:
+            return [f'forbidden line {node.text!r}' for node in tree.root.children if self.pattern.search(node.text)]
+        return [f'{node.text}: forbidden line {child.text!r}'
+                for node in _sections(tree, self.section, self.match)
+                for child in node.children if self.pattern.search(child.text)]
+
+
+class OspfAreas:
+    def __init__(self, spec):
+        self.allowed = {area_key(area) for area in spec['allowed']}
+
+    def check(self, tree):
+        return [f'router ospf {network.process}: network {network.address} in area {network.area} is not allowed'
+                for area, networks in tree.ospf_areas.items() if area not in self.allowed
+                for network in networks]
+
+
+class EigrpAs:
+    def __init__(self, spec):
+        self.allowed = {str(number) for number in spec['allowed']}
+
+    def check(self, tree):
+        return [f'router eigrp {number} is not an allowed AS' for number in tree.eigrp if number not in self.allowed]
+
+
+RULE_TYPES = {
+    'interface_present': InterfacePresent,
+    'require_line': RequireLine,
+    'forbid_line': ForbidLine,
+    'ospf_areas': OspfAreas,
+    'eigrp_as': EigrpAs,
+}
+
+
+def _sections(tree, kind, match):
+    return [node for node in tree.section(kind) if match is None or match.search(node.text)]
+
+
+# Compile rule specs into (id, check) pairs. Raises ValueError naming the first bad rule.
+def compile_rules(specs):
+    if not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+        raise ValueError('rules must be a list of objects')
+    rules = []
+    for number, spec in enumerate(specs, 1):
+        rule_id = spec.get('id') or f'rule-{number}'
+        if spec.get('type') not in RULE_TYPES:
+            raise ValueError(f"rule {rule_id}: unknown type {spec.get('type')!r}")
+        try:
+            rules.append((rule_id, RULE_TYPES[spec['type']](spec)))
+        except (KeyError, re.error) as e:
+            raise ValueError(f'rule {rule_id}: {e}')
+    return rules
+
+
+def load_rules(path=RULES_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def rules_hash(specs):
+    return hashlib.sha256(json.dumps(specs, sort_keys=True).encode()).hexdigest()
+
+
+def config_hash(lines):
+    return hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+
+
+# Rules compiled once per evaluation process, by the pool initializer
+COMPILED_RULES = []
+
+
+def _init_worker(specs):
+    global COMPILED_RULES
+    COMPILED_RULES = compile_rules(specs)
+
+
+# Evaluate every rule against one configuration: a list of {'rule', 'message'}
+def evaluate_config(lines, rules):
+    tree = ConfigTree(lines)
+    return [{'rule': rule_id, 'message': message} for rule_id, rule in rules for message in rule.check(tree)]
+
+
+# Evaluate a batch of (device, lines) in a worker process
+def _evaluate_batch(batch):
+    return [(device, evaluate_config(lines, COMPILED_RULES)) for device, lines in batch]
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_json(path, data):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+# Evaluate the rules against many configurations ({device: lines}).
+# Devices whose configuration hash and rule set are the same as in `state` keep their
+# previous violations; the others are parsed and checked in batches across processes.
+# Returns ({device: violations}, number of devices evaluated); `state` is updated in place.
+def evaluate_fleet(configs, specs, state, processes=EVALUATION_PROCESSES):
+    ruleset = rules_hash(specs)
+    results, pending, hashes = {}, [], {}
+    for device, lines in configs.items():
+        hashes[device] = config_hash(lines)
+        previous = state.get(device)
+        if previous and previous['config_hash'] == hashes[device] and previous['rules_hash'] == ruleset:
+            results[device] = previous['violations']
+        else:
+            pending.append((device, lines))
+
+    if pending:
+        batches = [pending[start:start + BATCH_SIZE] for start in range(0, len(pending), BATCH_SIZE)]
+        if len(batches) == 1:
+            # One batch is not worth starting processes for
+            rules = compile_rules(specs)
+            evaluated = [(device, evaluate_config(lines, rules)) for device, lines in pending]
+        else:
+            with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(specs,)) as pool:
+                evaluated = [result for batch in pool.map(_evaluate_batch, batches) for result in batch]
+        for device, violations in evaluated:
+            results[device] = violations
+            state[device] = {'config_hash': hashes[device], 'rules_hash': ruleset, 'violations': violations}
+    return results, len(pending)
+
+
+# Check the latest stored running configuration of every inventory device and write the report
+def check_fleet(devices, specs, state_path=STATE_FILE, report_path=COMPLIANCE_REPORT):
+    start = time.monotonic()
+    configs, missing = {}, []
+    for device in devices:
+        address = device_address(device['ip_address'], device.get('port'))
+        manifest = STORE.latest(address, 'running')
+        if manifest is None:
+            missing.append(address)
+        else:
+            configs[address] = STORE.load(manifest)
+
+    state = load_state(state_path)
+    results, evaluated = evaluate_fleet(configs, specs, state)
+    _write_json(state_path, state)
+
+    entries = []
+    for device in devices:
+        address = device_address(device['ip_address'], device.get('port'))
+        violations = results.get(address, [])
+        status = 'no_config' if address in missing else 'non_compliant' if violations else 'compliant'
+        entries.append({'ip_address': device['ip_address'], 'hostname': device['hostname'],
+                        'status': status, 'violations': violations})
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'seconds': round(time.monotonic() - start, 2),
+        'rules': len(specs),
+        'devices': len(devices),
+        'evaluated': evaluated,
+        'compliant': sum(1 for entry in entries if entry['status'] == 'compliant'),
+        'non_compliant': sum(1 for entry in entries if entry['status'] == 'non_compliant'),
+        'no_config': len(missing),
+        'results': entries,
+    }
+    _write_json(report_path, report)
+    return report
+
+
+def print_compliance_summary(report, path=COMPLIANCE_REPORT):
+    print("\n--- Compliance Summary ---")
+    print(f"{'IP address':<18}{'Hostname':<20}{'Status':<15}{'Violations':>10}")
+    for entry in report['results']:
+        print(f"{entry['ip_address']:<18}{entry['hostname']:<20}{entry['status']:<15}{len(entry['violations']):>10}")
+        for violation in entry['violations']:
+            print(f"    [{violation['rule']}] {violation['message']}")
+    print(f"\n{report['compliant']} compliant, {report['non_compliant']} non-compliant, "
+          f"{report['no_config']} without a stored config out of {report['devices']} devices "
+          f"({report['evaluated']} evaluated, {report['rules']} rules) in {report['seconds']:.2f} s. "
+          f"Report written to {path}.")
+
+
+# Ask for an inventory and a rules file, then check the stored configurations against the rules
+def compliance_menu():
+    path = input('Enter inventory file (CSV): ')
+    rules_path = input(f'Enter rules file [{RULES_FILE}]: ').strip() or RULES_FILE
+
+    try:
+        devices = load_inventory(path)
+    except FileNotFoundError:
+        print(f"Inventory file {path} not found.")
+        return
+
+    if not devices:
+        print("No devices found in the inventory.")
+        return
+
+    try:
+        specs = load_rules(rules_path)
+        compile_rules(specs)  # Report a bad rule before any work starts
+    except FileNotFoundError:
+        print(f"Rules file {rules_path} not found.")
+        return
+    except ValueError as e:
+        print(f"Invalid rules file {rules_path}: {e}")
+        return
+
+    report = check_fleet(devices, specs)
+    print_compliance_summary(report)
+    return report
@@ -0,0 +1,308 @@
+import hashlib  # Per-section hashes
+import json  # Snapshots are kept on disk between runs
+import os  # For the snapshot directory and atomic replace
+import re  # To build safe file names from device addresses
+import threading  # The cache is shared by the fleet worker threads
+import time  # To timestamp the snapshots
+
+
+# Directory holding one snapshot file per device and configuration
+SNAPSHOT_DIR = 'config_snapshots'
+
+# Command that prints each configuration
+CONFIG_COMMANDS = {
+    'running': 'show running-config',
+    'startup': 'show startup-config',
+}
+
+# Header lines that change whenever the configuration does. Filtering the show command
+# down to them costs one or two lines over the CLI instead of the whole configuration.
+MARKER_FILTERS = {
+    'running': 'Last configuration change|Current configuration',
+    'startup': 'NVRAM config last updated|Using [0-9]+ out of',
+}
+
+
+# Top-level lines of the running config, blank lines included: one line per section
+SKELETON_FILTER = '^[^ ]|^$'
+
+# Configuration commands that open a section, used to tell which sections a change touched
+SECTION_KEYWORDS = ('interface', 'router', 'line', 'ip access-list', 'ipv6 access-list', 'route-map',
+                    'class-map', 'policy-map', 'vrf definition', 'key chain', 'object-group', 'crypto map')
+
+# Size the device reports in the running-config header
+CURRENT_SIZE = re.compile(r'^Current configuration : (\d+) bytes')
+
+# Longest section regex sent in one '| section' command, and most commands per refresh
+# before downloading the whole configuration is cheaper
+MAX_PULL_PATTERN = 200
+MAX_SECTION_PULLS = 20
+
+# An incremental refresh is only trusted this many seconds after the last full download
+FULL_REFRESH_AGE = 3600
+
+
+def _file_name(device, kind):
+    return re.sub(r'[^\w.\-]', '_', device) + f'_{kind}.json'
+
+
+# Last configuration fetched from each device, with the change marker it had at the time.
+# A snapshot is only served while the device still reports the same marker.
+class ConfigSnapshotCache:
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        self.snapshots = {}  # (device, kind) -> {'marker', 'config', 'fetched_at', 'hashes', 'changed', ...}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _path(self, device, kind):
+        return os.path.join(self.directory, _file_name(device, kind))
+
+    def _load(self, device, kind):
+        try:
+            with open(self._path(device, kind)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    # Last snapshot of a device's configuration, loaded from disk on first use
+    def snapshot(self, device, kind):
+        with self.lock:
+            snapshot = self.snapshots.get((device, kind))
+            if snapshot is None:
+                snapshot = self._load(device, kind)
+                if snapshot is not None:
+                    self.snapshots[(device, kind)] = snapshot
+            return snapshot
+
+    # Cached configuration lines if the marker has not moved, else None
+    def get(self, device, kind, marker):
+        snapshot = self.snapshot(device, kind)
+        with self.lock:
+            if marker and snapshot is not None and snapshot['marker'] == marker:
+                self.stats['hits'] += 1
+                return snapshot['config']
+            self.stats['misses'] += 1
+            return None
+
+    # Store a configuration with its marker, its section hashes and the headers of the
+    # sections that differ from the previous snapshot. `full` is False for merged refreshes.
+    def put(self, device, kind, marker, config, full=True):
+        previous = self.snapshot(device, kind)
+        hashes = section_hashes(config)
+        snapshot = {'marker': marker, 'config': config, 'fetched_at': time.time(), 'hashes': hashes,
+                    'changed': changed_sections(previous['hashes'], hashes) if previous and 'hashes' in previous else [],
+                    'full_at': time.time() if full or not previous else previous.get('full_at', 0),
+                    'size_offset': size_offset(config) if full else (previous or {}).get('size_offset')}
+        with self.lock:
+            self.snapshots[(device, kind)] = snapshot
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(device, kind)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(path + '.tmp', path)
+
+    def forget(self, device, kind=None):
+        for name in ([kind] if kind else list(CONFIG_COMMANDS)):
+            with self.lock:
+                self.snapshots.pop((device, name), None)
+                try:
+                    os.remove(self._path(device, name))
+                except FileNotFoundError:
+                    pass
+
+
+SNAPSHOTS = ConfigSnapshotCache()
+
+
+# Split configuration lines into sections: each top-level line with the indented lines under it.
+# Returns ((header, occurrence), lines) pairs; occurrence tells repeated headers such as '!' apart.
+def split_sections(config):
+    sections = []
+    seen = {}
+    for line in config:
+        if line.startswith(' ') and sections:
+            sections[-1][1].append(line)
+            continue
+        occurrence = seen.get(line, 0)
+        seen[line] = occurrence + 1
+        sections.append(((line, occurrence), [line]))
+    return sections
+
+
+# [header, sha1] of every section, in configuration order
+def section_hashes(config):
+    return [[header, hashlib.sha1('\n'.join(lines).encode()).hexdigest()]
+            for (header, _), lines in split_sections(config)]
+
+
+# Headers of the sections added, removed or changed between two section hash lists
+def changed_sections(old, new):
+    old_set = {tuple(entry) for entry in old}
+    new_set = {tuple(entry) for entry in new}
+    headers = [header for header, _ in new if (header, _) not in old_set]
+    headers += [header for header, _ in old if (header, _) not in new_set and header not in headers]
+    return [header for header in headers
+            if header.strip() and not header.startswith(('!', 'Building configuration', 'Current configuration'))]
+
+
+# Bytes of the configuration body as counted here: every line after the 'Current configuration' header
+def _body_size(config):
+    for index, line in enumerate(config):
+        if CURRENT_SIZE.match(line):
+            return sum(len(text) + 1 for text in config[index + 1:])
+    return None
+
+
+def _reported_size(lines):
+    for line in lines:
+        match = CURRENT_SIZE.match(line.strip())
+        if match:
+            return int(match.group(1))
+    return None
+
+
+# Difference between the size the device reports and _body_size(), learnt on a full download,
+# so a merged configuration can be checked against the size in the marker
+def size_offset(config):
+    reported, counted = _reported_size(config), _body_size(config)
+    if reported is None or counted is None:
+        return None
+    return reported - counted
+
+
+# Section headers opened by a block of configuration lines, as typed ('interface loopback 0')
+def section_headers(lines):
+    return [line.strip() for line in lines
+            if not line.startswith(' ') and line.strip().lower().startswith(SECTION_KEYWORDS)]
+
+
+# Regular expression matching a header line exactly. '?' would open the CLI help, so it matches any character.
+def _header_pattern(header):
+    return '^' + re.sub(r'([.^$*+()\[\]{}|\\])', r'\\\1', header).replace('?', '.') + '$'
+
+
+# True if every configuration change since the snapshot was made by this session.
+# The session records the marker read just before and just after each configure()
+# (session.config_changes); they have to chain from the snapshot's marker to the current one.
+# Another operator's edit breaks the chain unless it lands in the round trip between a marker
+# read and the block it brackets.
+def changes_attested(session, snapshot, marker):
+    changes = getattr(session, 'config_changes', None)
+    if not changes:
+        return False
+    current = snapshot['marker']
+    for before, after in changes:
+        if before is None or after is None or before != current:
+            return False
+        current = after
+    return current == marker
+
+
+# True if configure() should read the marker before and after its block. The markers only
+# serve incremental_config(), so they are skipped, at two round trips per change, when there is
+# no running snapshot to refresh or an earlier change of the session already broke the chain.
+def tracks_changes(session, cache=SNAPSHOTS):
+    if any(before is None or after is None for before, after in session.config_changes):
+        return False
+    return cache.snapshot(session.address, 'running') is not None
+
+
+# Refresh a running-config snapshot by pulling only what this session changed:
+# - the top-level lines (the skeleton) show added, removed and reordered sections;
+# - sections this session configured (session.changed_sections) and new sections are pulled,
+#   interfaces with 'show running-config interface', the rest with one batched '| section';
+# - everything else is taken from the snapshot.
+# Reused sections cannot be checked against the device, so this is only done when
+# changes_attested() shows no one else changed the configuration; the merged configuration
+# must also add up to the size in the marker. Otherwise None is returned and the caller
+# downloads the whole configuration, as it does when a full one is overdue.
+def incremental_config(session, snapshot, marker):
+    reported = _reported_size(marker.splitlines())
+    if reported is None or snapshot.get('size_offset') is None or \
+            time.time() - snapshot.get('full_at', 0) > FULL_REFRESH_AGE or \
+            not changes_attested(session, snapshot, marker):
+        return None
+
+    skeleton = list(session.iter_lines(f"{CONFIG_COMMANDS['running']} | include {SKELETON_FILTER}"))
+    if any(line.startswith('%') for line in skeleton):
+        return None
+    cached = dict(split_sections(snapshot['config']))
+    keys = [key for key, _ in split_sections(skeleton)]
+
+    # New top-level lines outside SECTION_KEYWORDS are taken as single lines; the size check covers the rest
+    hints = set(getattr(session, 'changed_sections', ()))
+    wanted = [header for (header, _) in keys
+              if (header, 0) not in cached and header.lower().startswith(SECTION_KEYWORDS)]
+    wanted += [header for header in hints if not header.lower().startswith('interface ')]
+
+    pulled = {}
+    for header in sorted(hint for hint in hints if hint.lower().startswith('interface ')):
+        for key, lines in split_sections(list(session.iter_lines(f"{CONFIG_COMMANDS['running']} {header}"))):
+            if key[0].startswith('interface '):
+                pulled[key] = lines
+
+    patterns = []
+    for header in dict.fromkeys(wanted):
+        pattern = _header_pattern(header)
+        if patterns and len(patterns[-1]) + len(pattern) + 1 <= MAX_PULL_PATTERN:
+            patterns[-1] += '|' + pattern
+        else:
+            patterns.append(pattern)
+    if len(patterns) + len(pulled) > MAX_SECTION_PULLS:
+        return None
+    for pattern in patterns:
+        output = list(session.iter_lines(f"{CONFIG_COMMANDS['running']} | section {pattern}"))
+        if any(line.startswith('%') for line in output):
+            return None
+        for key, lines in split_sections(output):
+            pulled[key] = lines
+
+    config = []
+    for key in keys:
+        config.extend(pulled.get(key) or cached.get(key) or [key[0]])
+
+    counted = _body_size(config)
+    if counted is None or counted + snapshot['size_offset'] != reported:
+        return None
+    return config
+
+
+# Change marker of a device's configuration, read with an '| include' filter.
+# None when the device prints no marker lines, in which case nothing is cached.
+def config_marker(session, kind):
+    command = f'{CONFIG_COMMANDS[kind]} | include {MARKER_FILTERS[kind]}'
+    lines = [line.strip() for line in session.iter_lines(command) if line.strip()]
+    # A device that rejects the filter ('% Invalid input') has no usable marker
+    if any(line.startswith('%') for line in lines):
+        return None
+    return '\n'.join(lines) or None
+
+
+# Configuration lines of a session's device ('running' or 'startup'). Only the
+# marker is read when it matches the snapshot. When it moved, a running config is
+# refreshed section by section if possible (incremental_config), otherwise the full
+# configuration is downloaded and the snapshot replaced.
+# The marker is read before the configuration, so a change in between only
+# leads to one more download next time, never to a stale snapshot.
+def cached_config(session, kind, cache=SNAPSHOTS, incremental=True):
+    marker = config_marker(session, kind)
+    config = cache.get(session.address, kind, marker)
+    if config is not None:
+        return config
+
+    full = True
+    snapshot = cache.snapshot(session.address, kind)
+    if incremental and kind == 'running' and marker and snapshot is not None:
+        config = incremental_config(session, snapshot, marker)
+        full = config is None
+    if config is None:
+        config = list(session.iter_lines(CONFIG_COMMANDS[kind]))
+    if marker:
+        cache.put(session.address, kind, marker, config, full)
+
+    # The snapshot now includes this session's own changes
+    if kind == 'running' and getattr(session, 'changed_sections', None) is not None:
+        session.changed_sections.clear()
+        session.config_changes.clear()
+    return config
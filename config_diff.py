@@ -0,0 +1,96 @@
+import difflib  # Line diff inside a changed block
+import hashlib  # To tell unchanged blocks apart without comparing their lines
+
+from config_cache import split_sections  # A block is a top-level line with its indented children
+
+
+# Lines that are not configuration: '!' separators and comments, blank lines and
+# the headers of 'show running-config' / 'show startup-config'
+NOISE_PREFIXES = ('!', 'Building configuration', 'Current configuration :', 'Using ')
+
+# Name of the group holding changed top-level lines that have no children (hostname, service, ...)
+GLOBAL_BLOCK = 'global'
+
+
+# Configuration lines without line endings and noise
+def clean_lines(lines):
+    lines = [line.rstrip('\r\n') for line in lines]
+    return [line for line in lines if line.strip() and not line.startswith(NOISE_PREFIXES)]
+
+
+# Blocks of a configuration: (header, occurrence) -> (sha1 of the block, child lines), in configuration order
+def index_blocks(lines):
+    blocks = {}
+    for key, block in split_sections(clean_lines(lines)):
+        digest = hashlib.sha1('\n'.join(block).encode()).digest()
+        blocks[key] = (digest, block[1:])
+    return blocks
+
+
+# Differences between two configurations, grouped per block:
+# a list of (header, status, lines) where status is 'added', 'removed' or 'changed'
+# and lines are '-'/'+' prefixed child lines.
+# Blocks are matched by header, so a block that only moved is not a difference,
+# and only the lines of blocks whose hashes differ are compared.
+# Top-level lines without children are gathered in one GLOBAL_BLOCK group.
+def diff_configs(old, new):
+    old_blocks = index_blocks(old)
+    new_blocks = index_blocks(new)
+    changes = []
+    global_lines = []
+
+    for key, (digest, children) in new_blocks.items():
+        previous = old_blocks.get(key)
+        if previous is None:
+            if children:
+                changes.append((key[0], 'added', ['+' + line for line in children]))
+            else:
+                global_lines.append('+' + key[0])
+        elif previous[0] != digest:
+            changes.append((key[0], 'changed', _diff_children(previous[1], children)))
+
+    for key, (digest, children) in old_blocks.items():
+        if key in new_blocks:
+            continue
+        if children:
+            changes.append((key[0], 'removed', ['-' + line for line in children]))
+        else:
+            global_lines.append('-' + key[0])
+
+    if global_lines:
+        # Removals first, so 'hostname R1' / 'hostname R2' read as a replacement
+        global_lines.sort(key=lambda line: line[0] == '+')
+        changes.insert(0, (GLOBAL_BLOCK, 'changed', global_lines))
+    return changes
+
+
+def _diff_children(old, new):
+    lines = []
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        lines.extend('-' + line for line in old[old_start:old_end])
+        lines.extend('+' + line for line in new[new_start:new_end])
+    return lines
+
+
+# Printable lines of diff_configs() output, one '@@' group per block
+def format_diff(changes, fromfile='', tofile=''):
+    yield f'--- {fromfile}'
+    yield f'+++ {tofile}'
+    for header, status, lines in changes:
+        yield f'@@ {header} ({status}) @@'
+        yield from lines
+
+
+# Diff two configurations and print the result, or a note when they match.
+# `differ` computes the changes, e.g. a DiffCache's diff_configs.
+def print_diff(old, new, fromfile='', tofile='', differ=diff_configs):
+    changes = differ(old, new)
+    if not changes:
+        print('No differences found.')
+        return changes
+    for line in format_diff(changes, fromfile, tofile):
+        print(line)
+    return changes
@@ -0,0 +1,50 @@
+import re  # To find the error markers in the echoed output
+
+from prompts import SEARCH_WINDOW  # Only the tail of the buffer can hold the prompt
+
+
+# Messages IOS prints under a configuration line it rejected
+CONFIG_ERROR = re.compile(r'^\s*(% (?:Invalid|Incomplete|Ambiguous)[^\r\n]*)')
+
+# Echo of a configuration line after a config-mode prompt, e.g. 'R1(config-if)#ip address ...'
+CONFIG_ECHO = re.compile(r'\([\w\-]+\)#(.*)$')
+
+
+# Raised when the device rejected one or more lines of a transaction
+class ConfigTransactionError(Exception):
+    def __init__(self, errors):
+        self.errors = errors  # (configuration line, error message) pairs
+        super().__init__('; '.join(f"'{line}': {message}" for line, message in errors))
+
+
+# (line, message) for every '% Invalid/Incomplete/Ambiguous' in the echoed output,
+# paired with the configuration line echoed just before it
+def find_errors(output):
+    errors = []
+    current = ''
+    for text in output.splitlines():
+        echo = CONFIG_ECHO.search(text)
+        if echo:
+            current = echo.group(1).strip()
+            continue
+        error = CONFIG_ERROR.match(text)
+        if error:
+            errors.append((current, error.group(1).strip()))
+    return errors
+
+
+# Apply a block of configuration lines with a single write: 'configure terminal',
+# the lines and 'end' are sent together and only the final enable prompt is awaited,
+# so the whole change costs about one round trip instead of one per line.
+# The echoed output is checked afterwards and ConfigTransactionError lists any rejected line.
+# IOS keeps the lines it accepted; there is no rollback of the rest of the block.
+def run_config(session, lines, enable_prompt, timeout=30):
+    block = '\n'.join(['configure terminal', *lines, 'end']) + '\n'
+    session.send(block)
+    session.expect(enable_prompt, timeout=timeout, searchwindowsize=SEARCH_WINDOW)
+
+    output = session.before
+    errors = find_errors(output)
+    if errors:
+        raise ConfigTransactionError(errors)
+    return output
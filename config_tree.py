@@ -0,0 +1,190 @@
+import hashlib  # Parsed trees are reused while the configuration text is unchanged
+import re  # To split interface names into type and number
+import threading  # Trees are shared by the fleet worker threads
+
+from config_diff import clean_lines  # Same noise filtering as the diff engine
+
+
+# Interface types, so 'Gi0/1', 'gig 0/1' and 'GigabitEthernet0/1' find the same interface.
+# Longer names first: an abbreviation is resolved to the first type it starts.
+INTERFACE_TYPES = ('GigabitEthernet', 'FastEthernet', 'TenGigabitEthernet', 'Ethernet', 'Loopback', 'Serial',
+                   'Tunnel', 'Vlan', 'Port-channel', 'Dialer', 'Virtual-Template', 'BVI', 'Null')
+
+# Section types made of two words ('ip access-list', 'router ospf' is handled separately)
+TWO_WORD_SECTIONS = ('ip access-list', 'ipv6 access-list', 'vrf definition', 'key chain', 'crypto map')
+
+INTERFACE_NAME = re.compile(r'^([A-Za-z-]+)\s*(\d[\d/.:]*)$')
+
+# Parsed trees kept per device, at most one per device
+TREES_LOCK = threading.Lock()
+TREES = {}  # device -> (sha1 of the configuration, ConfigTree)
+
+
+# One configuration line with the lines indented under it
+class ConfigNode:
+    __slots__ = ('text', 'parent', 'children')
+
+    def __init__(self, text, parent=None):
+        self.text = text
+        self.parent = parent
+        self.children = []
+
+    # The line and every line under it, indented as in the configuration
+    def lines(self, depth=0):
+        yield ' ' * depth + self.text
+        for child in self.children:
+            yield from child.lines(depth + 1)
+
+
+# A network statement of a routing process
+class Network:
+    __slots__ = ('protocol', 'process', 'address', 'wildcard', 'area', 'node')
+
+    def __init__(self, protocol, process, address, wildcard, area, node):
+        self.protocol = protocol
+        self.process = process
+        self.address = address
+        self.wildcard = wildcard
+        self.area = area  # None for EIGRP
+        self.node = node
+
+    def __repr__(self):
+        words = [self.address, self.wildcard, f'area {self.area}' if self.area is not None else None]
+        return f"<{self.protocol} {self.process}: network {' '.join(word for word in words if word)}>"
+
+
+# 'Gi0/1' -> 'gigabitethernet0/1'; None if the name does not look like an interface
+def interface_key(name):
+    match = INTERFACE_NAME.match(name.strip())
+    if match is None:
+        return None
+    prefix, number = match.group(1).lower(), match.group(2)
+    for full in INTERFACE_TYPES:
+        if full.lower().startswith(prefix):
+            return full.lower() + number
+    return prefix + number
+
+
+# OSPF areas can be written as numbers or dotted quads; both are kept as the number
+def area_key(area):
+    area = str(area)
+    if '.' not in area:
+        return area
+    try:
+        octets = [int(part) for part in area.split('.')]
+    except ValueError:
+        return area
+    return str(sum(octet << shift for octet, shift in zip(octets, (24, 16, 8, 0))))
+
+
+# Type of a top-level section: 'interface', 'router ospf', 'ip access-list', 'line', 'hostname', ...
+def section_type(text):
+    words = text.split()
+    if words[0] == 'router' and len(words) > 1:
+        return 'router ' + words[1]
+    if ' '.join(words[:2]) in TWO_WORD_SECTIONS:
+        return ' '.join(words[:2])
+    return words[0]
+
+
+# An IOS configuration as a tree of ConfigNode, with indexes built once at parse time
+# so that questions such as 'OSPF networks in area 0' or 'all loopbacks' need no device command
+class ConfigTree:
+    def __init__(self, lines):
+        self.root = ConfigNode('')
+        self.sections = {}  # section type -> top-level nodes, in configuration order
+        self.interfaces = {}  # interface_key() -> node
+        self.interface_types = {}  # 'loopback', 'gigabitethernet', ... -> nodes
+        self.ospf = {}  # process id -> 'router ospf' node
+        self.eigrp = {}  # autonomous system -> 'router eigrp' node
+        self.networks = []  # every Network, in configuration order
+        self.process_networks = {}  # (protocol, process) -> [Network]
+        self.ospf_areas = {}  # area_key() -> [Network]
+        self._parse(clean_lines(lines))
+
+    def _parse(self, lines):
+        stack = [(-1, self.root)]  # (indentation, node) of the open parents
+        for line in lines:
+            indent = len(line) - len(line.lstrip(' '))
+            while stack[-1][0] >= indent:
+                stack.pop()
+            node = ConfigNode(line.strip(), stack[-1][1])
+            stack[-1][1].children.append(node)
+            stack.append((indent, node))
+        for node in self.root.children:
+            self._index(node)
+
+    def _index(self, node):
+        kind = section_type(node.text)
+        self.sections.setdefault(kind, []).append(node)
+        words = node.text.split()
+        if kind == 'interface' and len(words) > 1:
+            key = interface_key(' '.join(words[1:])) or words[1]
+            self.interfaces[key] = node
+            match = INTERFACE_NAME.match(key)
+            self.interface_types.setdefault(match.group(1) if match else key, []).append(node)
+        elif kind == 'router ospf' and len(words) > 2:
+            self.ospf[words[2]] = node
+            self._index_networks(node, 'ospf', words[2])
+        elif kind == 'router eigrp' and len(words) > 2:
+            self.eigrp[words[2]] = node
+            self._index_networks(node, 'eigrp', words[2])
+
+    def _index_networks(self, node, protocol, process):
+        for child in node.children:
+            words = child.text.split()
+            if not words or words[0] != 'network' or len(words) < 2:
+                continue
+            wildcard = words[2] if len(words) > 2 and words[2] != 'area' else None
+            area = words[words.index('area') + 1] if 'area' in words[:-1] else None
+            network = Network(protocol, process, words[1], wildcard, area, child)
+            self.networks.append(network)
+            self.process_networks.setdefault((protocol, process), []).append(network)
+            if protocol == 'ospf' and area is not None:
+                self.ospf_areas.setdefault(area_key(area), []).append(network)
+
+    # Top-level nodes of a section type, e.g. tree.section('router ospf')
+    def section(self, kind):
+        return self.sections.get(kind, [])
+
+    def interface(self, name):
+        return self.interfaces.get(interface_key(name) or name)
+
+    def loopbacks(self):
+        return self.interface_types.get('loopback', [])
+
+    # (address, mask) of an interface's primary address, None if it has none
+    def interface_address(self, name):
+        node = self.interface(name)
+        for child in node.children if node else ():
+            words = child.text.split()
+            if words[:2] == ['ip', 'address'] and len(words) >= 4 and 'secondary' not in words:
+                return words[2], words[3]
+        return None
+
+    def ospf_networks(self, area=None):
+        if area is None:
+            return [network for network in self.networks if network.protocol == 'ospf']
+        return self.ospf_areas.get(area_key(area), [])
+
+    def eigrp_networks(self, autonomous_system=None):
+        if autonomous_system is not None:
+            return self.process_networks.get(('eigrp', str(autonomous_system)), [])
+        return [network for network in self.networks if network.protocol == 'eigrp']
+
+
+def parse_config(lines):
+    return ConfigTree(lines)
+
+
+# Parsed tree of a device's configuration, parsed again only when the text changed
+def parsed_config(device, lines):
+    digest = hashlib.sha1('\n'.join(lines).encode()).digest()
+    with TREES_LOCK:
+        entry = TREES.get(device)
+        if entry is not None and entry[0] == digest:
+            return entry[1]
+    tree = ConfigTree(lines)
+    with TREES_LOCK:
+        TREES[device] = (digest, tree)
+    return tree
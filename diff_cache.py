@@ -0,0 +1,155 @@
+import hashlib  # Results are keyed by the hashes of what was compared
+import json  # Results are kept on disk as JSON
+import mmap  # Large files are hashed without being read into memory
+import os  # For the cache directory and access times
+import threading  # Shared by the menu and the fleet worker threads
+from collections import OrderedDict  # Least recently used order of the memory tier
+
+import file_compare  # Streaming comparison of large files and its settings
+from config_diff import diff_configs  # Block-level comparison
+from snapshot_store import _write_atomic  # Unique temporary file per write, safe across threads and processes
+
+
+# Directory of the on-disk tier
+DIFF_CACHE_DIR = 'diff_cache'
+
+# Results kept in memory, and on disk, before the least recently used ones are dropped
+MEMORY_ENTRIES = 256
+DISK_ENTRIES = 4096
+
+# Streamed results longer than this are not cached, so one huge diff cannot fill the cache
+MAX_CACHED_LINES = 100000
+
+# Bumped whenever a diff engine changes its output, so older results are not served
+DIFF_VERSION = 1
+
+
+def content_hash(lines):
+    return hashlib.sha256('\n'.join(line.rstrip('\r\n') for line in lines).encode()).hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for pos in range(0, len(data), file_compare.CHUNK):
+                    digest.update(data[pos:pos + file_compare.CHUNK])
+    return digest.hexdigest()
+
+
+# Diff results keyed by the content hashes of both inputs and the diff options.
+# Recently used results stay in memory; every result is also written to disk, where
+# the least recently used files are removed once there are more than DISK_ENTRIES.
+class DiffCache:
+    def __init__(self, directory=DIFF_CACHE_DIR, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.entries = OrderedDict()  # key -> result
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    @staticmethod
+    def key(old_hash, new_hash, options):
+        text = json.dumps([DIFF_VERSION, old_hash, new_hash, options], sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self.entries[key]
+        try:
+            with open(self._path(key)) as f:
+                result = json.load(f)
+            os.utime(self._path(key))  # The file time marks the last use, for the disk eviction
+        except (FileNotFoundError, ValueError):
+            with self.lock:
+                self.stats['misses'] += 1
+            return None
+        with self.lock:
+            self.stats['disk_hits'] += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        with self.lock:
+            self._remember(key, result)
+        _write_atomic(self._path(key), json.dumps(result))
+        self._evict_disk()
+
+    def _remember(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.memory_entries:
+            self.entries.popitem(last=False)
+
+    def _evict_disk(self):
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except FileNotFoundError:
+            return
+        if len(names) <= self.disk_entries:
+            return
+        # Another writer may remove files meanwhile; those are simply not counted
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                pass
+        entries.sort()
+        for _, path in entries[:len(entries) - self.disk_entries]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else ():
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+    # diff_configs() through the cache; results come back as lists of [header, status, lines]
+    def diff_configs(self, old, new):
+        key = self.key(content_hash(old), content_hash(new), {'engine': 'blocks'})
+        changes = self.get(key)
+        if changes is None:
+            changes = [list(change) for change in diff_configs(old, new)]
+            self.put(key, changes)
+        return changes
+
+    # file_compare.stream_diff() through the cache. Lines are yielded as the diff streams;
+    # the hunks are only stored once the whole diff is known and if it is not too long.
+    def stream_diff(self, old_path, new_path):
+        options = {'engine': 'stream', 'lookahead': file_compare.LOOKAHEAD, 'anchor': file_compare.ANCHOR_LINES}
+        key = self.key(file_hash(old_path), file_hash(new_path), options)
+        hunks = self.get(key)
+        if hunks is not None:
+            if hunks:
+                yield f'--- {old_path}'
+                yield f'+++ {new_path}'
+            yield from hunks
+            return
+
+        hunks = []
+        # The first two lines name the files, which are not part of the cached result
+        for number, line in enumerate(file_compare.stream_diff(old_path, new_path)):
+            if number >= 2 and hunks is not None:
+                hunks.append(line)
+                if len(hunks) > MAX_CACHED_LINES:
+                    hunks = None
+            yield line
+        if hunks is not None:
+            self.put(key, hunks)
+
+
+DIFFS = DiffCache()
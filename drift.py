@@ -0,0 +1,138 @@
+import json  # The report is written as JSON
+import multiprocessing  # Diff processes are spawned, not forked from a process full of session threads
+import os  # For the atomic replace of the report file
+import time  # To time each device and stamp the report
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed  # I/O threads, diff processes
+
+from config_cache import cached_config  # Configs are downloaded again only when their marker moved
+from config_diff import diff_configs  # Block-level running vs startup comparison
+from fleet import DEFAULT_WORKERS, device_address, load_inventory, open_session  # Same inventory as the fleet bootstrap
+from snapshot_store import STORE  # Every audit also records the configurations in the history store
+
+
+# File the aggregated drift report is written to
+DRIFT_REPORT = 'drift_report.json'
+
+# Processes diffing configurations; None lets the pool use one per core
+DIFF_PROCESSES = None
+
+
+# Log in to one device and read its startup and running configurations.
+# Only login and enable are run: an audit must not change the hostname like bootstrap() does.
+def fetch_configs(session_class, device):
+    start = time.monotonic()
+    ssh = open_session(session_class, device)
+    address = device_address(device['ip_address'], device.get('port'))
+    result = {'ip_address': device['ip_address'], 'hostname': device['hostname'],
+              'startup': None, 'running': None, 'error': ''}
+    try:
+        if ssh.login() and ssh.enter_enable():
+            result['startup'] = cached_config(ssh, 'startup')
+            result['running'] = cached_config(ssh, 'running')
+            STORE.save(address, result['startup'], 'startup')
+            STORE.save(address, result['running'], 'running')
+        else:
+            result['error'] = ssh.error or 'login failed'
+    except Exception as e:
+        result['error'] = str(e) or type(e).__name__
+    finally:
+        if hasattr(ssh, 'close'):
+            ssh.close()
+        elif ssh.session is not None:
+            ssh.session.close()
+    result['seconds'] = round(time.monotonic() - start, 2)
+    return result
+
+
+# Report entry of one device from its diff_configs() changes
+def drift_entry(fetched, changes):
+    return {
+        'ip_address': fetched['ip_address'],
+        'hostname': fetched['hostname'],
+        'status': 'drifted' if changes else 'in_sync',
+        'error': '',
+        'seconds': fetched['seconds'],
+        'blocks': [{'header': header, 'status': status, 'lines': lines} for header, status, lines in changes],
+    }
+
+
+# Compare running against startup on every device.
+# Configurations are fetched by at most `workers` sessions at once; each pair is handed to a
+# process pool as soon as it arrives, so diffing large configs never holds up the sessions.
+# Returns one entry per device, in inventory order.
+def fleet_drift(session_class, devices, workers=DEFAULT_WORKERS, processes=DIFF_PROCESSES):
+    results = [None] * len(devices)
+    diffs = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as threads, \
+            ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        fetches = {threads.submit(fetch_configs, session_class, device): index
+                   for index, device in enumerate(devices)}
+        for future in as_completed(fetches):
+            index, fetched = fetches[future], future.result()
+            if fetched['error']:
+                results[index] = {'ip_address': fetched['ip_address'], 'hostname': fetched['hostname'],
+                                  'status': 'failed', 'error': fetched['error'],
+                                  'seconds': fetched['seconds'], 'blocks': []}
+                continue
+            diff = pool.submit(diff_configs, fetched['startup'], fetched['running'])
+            diffs[diff] = (index, {key: fetched[key] for key in ('ip_address', 'hostname', 'seconds')})
+
+        for diff in as_completed(diffs):
+            index, fetched = diffs[diff]
+            try:
+                results[index] = drift_entry(fetched, diff.result())
+            except Exception as e:
+                results[index] = {**fetched, 'status': 'failed', 'error': f'diff failed: {e}', 'blocks': []}
+    return results
+
+
+# Write the report: totals first, then one entry per device with its changed blocks
+def write_report(results, elapsed, path=DRIFT_REPORT):
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'seconds': round(elapsed, 2),
+        'devices': len(results),
+        'drifted': sum(1 for result in results if result['status'] == 'drifted'),
+        'in_sync': sum(1 for result in results if result['status'] == 'in_sync'),
+        'failed': sum(1 for result in results if result['status'] == 'failed'),
+        'results': results,
+    }
+    with open(path + '.tmp', 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(path + '.tmp', path)
+    return report
+
+
+def print_drift_summary(report, path=DRIFT_REPORT):
+    print("\n--- Fleet Drift Summary ---")
+    print(f"{'IP address':<18}{'Hostname':<20}{'Status':<9}{'Blocks':>7}  Error")
+    for result in report['results']:
+        print(f"{result['ip_address']:<18}{result['hostname']:<20}{result['status']:<9}"
+              f"{len(result['blocks']):>7}  {result['error']}")
+    print(f"\n{report['drifted']} drifted, {report['in_sync']} in sync, {report['failed']} failed "
+          f"out of {report['devices']} devices in {report['seconds']:.2f} s. Report written to {path}.")
+
+
+# Ask for an inventory file and a pool size, then audit the fleet for unsaved changes
+def drift_menu(session_class):
+    path = input('Enter inventory file (CSV): ')
+    workers = input(f'Enter number of parallel sessions [{DEFAULT_WORKERS}]: ').strip()
+
+    try:
+        devices = load_inventory(path)
+    except FileNotFoundError:
+        print(f"Inventory file {path} not found.")
+        return
+
+    if not devices:
+        print("No devices found in the inventory.")
+        return
+
+    if not workers.isdigit() or int(workers) == 0:
+        workers = DEFAULT_WORKERS
+
+    start = time.monotonic()
+    results = fleet_drift(session_class, devices, int(workers))
+    report = write_report(results, time.monotonic() - start)
+    print_drift_summary(report)
+    return report
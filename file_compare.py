@@ -0,0 +1,200 @@
+import mmap  # The files are compared in place instead of being read into lists
+import os  # For the file sizes
+
+# Files larger than this are compared by streaming instead of the block diff
+LARGE_FILE = 8 * 1024 * 1024
+
+# Bytes compared at a time while looking for identical spans; compares start
+# at FIRST_CHUNK bytes and double up to CHUNK, so a nearby difference stays cheap
+FIRST_CHUNK = 4096
+CHUNK = 1024 * 1024
+
+# Lines read ahead on each side when looking for where two files agree again.
+# This bounds the memory used; a change larger than this is reported as one hunk.
+LOOKAHEAD = 2000
+
+# Consecutive identical lines needed before the files count as back in step,
+# so a lone '!' or blank line does not end a hunk
+ANCHOR_LINES = 3
+
+
+# Read-only map of a file; empty files cannot be mapped and are treated as no bytes
+def _map(f):
+    if os.fstat(f.fileno()).st_size == 0:
+        return b''
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# Number of identical bytes from a[a_start:] and b[b_start:], compared a chunk at a time
+def _matching_bytes(a, a_start, a_end, b, b_start, b_end):
+    limit = min(a_end - a_start, b_end - b_start)
+    size, chunk = 0, FIRST_CHUNK
+    while size < limit:
+        step = min(chunk, limit - size)
+        if a[a_start + size:a_start + size + step] == b[b_start + size:b_start + size + step]:
+            size += step
+            chunk = min(chunk * 2, CHUNK)
+            continue
+        # Narrow down to the first differing byte inside the chunk
+        while step > 1:
+            half = step // 2
+            if a[a_start + size:a_start + size + half] == b[b_start + size:b_start + size + half]:
+                size += half
+                step -= half
+            else:
+                step = half
+        break
+    return size
+
+
+# Length of the common prefix of two maps, moved back to the start of a line
+def common_prefix(a, b):
+    size = _matching_bytes(a, 0, len(a), b, 0, len(b))
+    if size == len(a) == len(b):
+        return size
+    return a.rfind(b'\n', 0, size) + 1
+
+
+# Length of the common suffix of two maps after `prefix`, moved forward to the start of a line
+def common_suffix(a, b, prefix):
+    limit = min(len(a), len(b)) - prefix
+    size, chunk = 0, FIRST_CHUNK
+    while size < limit:
+        step = min(chunk, limit - size)
+        if a[len(a) - size - step:len(a) - size] == b[len(b) - size - step:len(b) - size]:
+            size += step
+            chunk = min(chunk * 2, CHUNK)
+            continue
+        while step > 1:
+            half = step // 2
+            if a[len(a) - size - half:len(a) - size] == b[len(b) - size - half:len(b) - size]:
+                size += half
+                step -= half
+            else:
+                step = half
+        break
+    # Keep whole lines only: the suffix has to start right after a newline in both files
+    if size and not (_line_start(a, len(a) - size) and _line_start(b, len(b) - size)):
+        newline = a.find(b'\n', len(a) - size, len(a))
+        size = len(a) - newline - 1 if newline != -1 else 0
+    return size
+
+
+def _line_start(data, pos):
+    return pos == 0 or data[pos - 1:pos] == b'\n'
+
+
+def _count_lines(data, start, end):
+    lines = 0
+    for pos in range(start, end, CHUNK):
+        lines += data[pos:min(pos + CHUNK, end)].count(b'\n')
+    return lines
+
+
+# Lines of a map between two offsets, read on demand into a bounded look-ahead buffer
+class _LineReader:
+    def __init__(self, data, start, end, line_number):
+        self.data = data
+        self.pos = start
+        self.end = end
+        self.line_number = line_number  # Number of the first buffered line
+        self.buffer = []
+
+    def fill(self, count):
+        while len(self.buffer) < count and self.pos < self.end:
+            newline = self.data.find(b'\n', self.pos, self.end)
+            stop = self.end if newline == -1 else newline + 1
+            self.buffer.append(self.data[self.pos:stop])
+            self.pos = stop
+        return len(self.buffer)
+
+    # Skip the identical lines that follow in both readers with chunked byte compares,
+    # so long unchanged spans between two changes are never split into lines
+    def skip_common(self, other):
+        if self.buffer or other.buffer:
+            return
+        size = _matching_bytes(self.data, self.pos, self.end, other.data, other.pos, other.end)
+        if self.pos + size < self.end or other.pos + size < other.end:
+            size = self.data.rfind(b'\n', self.pos, self.pos + size) + 1 - self.pos if size else 0
+            size = max(size, 0)
+        lines = _count_lines(self.data, self.pos, self.pos + size)
+        for reader in (self, other):
+            reader.pos += size
+            reader.line_number += lines
+
+    def first(self):
+        return self.buffer[0] if self.fill(1) else None
+
+    def take(self, count):
+        lines = self.buffer[:count]
+        del self.buffer[:count]
+        self.line_number += count
+        return lines
+
+
+# Lines to drop from each side before they agree again: the closest pair of positions
+# starting ANCHOR_LINES identical lines, or everything read ahead if there is none
+def _resync(old, new):
+    old.fill(LOOKAHEAD)
+    new.fill(LOOKAHEAD)
+    anchors = {}
+    for j in range(len(new.buffer) - ANCHOR_LINES + 1):
+        anchors.setdefault(tuple(new.buffer[j:j + ANCHOR_LINES]), j)
+
+    best = None
+    for i in range(len(old.buffer) - ANCHOR_LINES + 1):
+        if best is not None and i >= sum(best):
+            break
+        j = anchors.get(tuple(old.buffer[i:i + ANCHOR_LINES]))
+        if j is not None and (best is None or i + j < sum(best)):
+            best = (i, j)
+    return best or (len(old.buffer), len(new.buffer))
+
+
+def _decode(line):
+    return line.rstrip(b'\r\n').decode('utf-8', errors='replace')
+
+
+# Unified-diff lines of two files, yielded hunk by hunk as they are found.
+# Both files are memory-mapped; the identical start and end are skipped without being
+# split into lines, and only LOOKAHEAD lines per side are held while a change is resolved.
+def stream_diff(old_path, new_path):
+    with open(old_path, 'rb') as old_file, open(new_path, 'rb') as new_file:
+        old_data, new_data = _map(old_file), _map(new_file)
+        try:
+            prefix = common_prefix(old_data, new_data)
+            if prefix == len(old_data) == len(new_data):
+                return
+            suffix = common_suffix(old_data, new_data, prefix)
+            first_line = _count_lines(old_data, 0, prefix) + 1
+
+            yield f'--- {old_path}'
+            yield f'+++ {new_path}'
+            old = _LineReader(old_data, prefix, len(old_data) - suffix, first_line)
+            new = _LineReader(new_data, prefix, len(new_data) - suffix, first_line)
+            while True:
+                # Skip lines that are still the same on both sides
+                old.skip_common(new)
+                if old.first() is not None and old.first() == new.first():
+                    old.take(1)
+                    new.take(1)
+                    continue
+                if old.first() is None and new.first() is None:
+                    break
+
+                old_start, new_start = old.line_number, new.line_number
+                removed, added = _resync(old, new)
+                yield f'@@ -{old_start},{removed} +{new_start},{added} @@'
+                for line in old.take(removed):
+                    yield '-' + _decode(line)
+                for line in new.take(added):
+                    yield '+' + _decode(line)
+        finally:
+            for data in (old_data, new_data):
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+
+# True if either file is big enough to be compared with stream_diff()
+def is_large(*paths):
+    return any(os.path.getsize(path) > LARGE_FILE for path in paths)
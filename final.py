@@ -1,30 +1,45 @@
 
 import pexpect  # To handle SSH session
 
+from fleet import fleet_menu  # To bootstrap many devices in parallel
+
 
 # SSH class for managing network sessions
 class SSHTONetworkSession:
-    def __init__(self, ip_address, username, password, hostname, enable_password=''):
+    def __init__(self, ip_address, username, password, hostname, enable_password='', port=None):
         self.ip_address = ip_address
+        self.port = port  # SSH port when the device does not listen on 22
         self.username = username
         self.password = password
         self.hostname = hostname
         self.enable_password = enable_password
         self.session = None
+        self.error = ''
 
     # Initiate SSH session
     def ssh_session(self):
-        self.session = pexpect.spawn(f'ssh {self.username}@{self.ip_address}', encoding='utf-8', timeout=20)
+        if self.bootstrap():
+            self.compare_configs_menu()
+
+    # Record why the session could not be prepared so fleet runs can report it
+    def _fail(self, message):
+        self.error = message
+        print(message)
+        return False
+
+    # Login, enable and hostname sequence shared by the interactive and fleet modes
+    def bootstrap(self):
+        self.error = ''
+        port = f' -p {self.port}' if self.port else ''
+        self.session = pexpect.spawn(f'ssh{port} {self.username}@{self.ip_address}', encoding='utf-8', timeout=20)
         result = self.session.expect(['Password:', pexpect.TIMEOUT, pexpect.EOF])
         if result != 0:
-            print('Session failed to establish.')
-            return
+            return self._fail('Session failed to establish.')
 
         self.session.sendline(self.password)
         result = self.session.expect(['>', '#', pexpect.TIMEOUT, pexpect.EOF])
         if result != 0:
-            print('Authentication failed.')
-            return
+            return self._fail('Authentication failed.')
 
         # Enter enable mode
         self.session.sendline('enable')
@@ -33,15 +48,13 @@ class SSHTONetworkSession:
             self.session.sendline(self.enable_password)
             result = self.session.expect('#')
         if result != 0:
-            print('Enable mode failed.')
-            return
+            return self._fail('Enable mode failed.')
 
         # Enter configuration mode
         self.session.sendline('configure terminal')
         result = self.session.expect(r'\(config\)#')
         if result != 0:
-            print('Config mode failed.')
-            return
+            return self._fail('Config mode failed.')
 
         # Set hostname
         self.session.sendline(f'hostname {self.hostname}')
@@ -49,13 +62,12 @@ class SSHTONetworkSession:
         if result == 0:
             print('Hostname set successfully.')
         else:
-            print('Failed to set hostname.')
-            return
+            return self._fail('Failed to set hostname.')
 
         # Exit configuration mode
         self.session.sendline('exit')
         print('Session ready for further commands.')
-        self.compare_configs_menu()
+        return True
 
     # Creating a loopback interface
     # Creating a loopback interface and saving it to startup configuration
@@ -274,7 +286,8 @@ def menu():
     while True:
         print('--------- MENU ---------')
         print('a. SSH Session')
-        print('b. Exit')
+        print('b. Fleet bootstrap from inventory')
+        print('c. Exit')
 
         option = input('Choose an option: ')
 
@@ -290,6 +303,10 @@ def menu():
             ssh.ssh_session()
 
         elif option == 'b':
+            print("FLEET BOOTSTRAP SELECTED")
+            fleet_menu(SSHTONetworkSession)
+
+        elif option == 'c':
             print('Session cancelled. Goodbye.')
             break
 
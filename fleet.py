@@ -0,0 +1,152 @@
+import asyncio  # To run the asyncio session engine across the fleet
+import csv  # To read the device inventory
+import time  # To time each device
+from concurrent.futures import ThreadPoolExecutor, as_completed  # Bounded pool of worker threads
+
+
+# Columns of the inventory file, in the same order as the SSHTONetworkSession arguments
+INVENTORY_FIELDS = ['ip_address', 'username', 'password', 'hostname', 'enable_password']
+
+# Optional column: TCP port of the device's SSH or Telnet server, when it is not the default
+PORT_FIELD = 'port'
+
+# Number of devices bootstrapped at the same time when the operator does not choose
+DEFAULT_WORKERS = 20
+
+
+# Read a CSV inventory (with a header row) into a list of device dictionaries
+def load_inventory(path):
+    devices = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            device = {field: (row.get(field) or '').strip() for field in INVENTORY_FIELDS}
+            port = (row.get(PORT_FIELD) or '').strip()
+            device[PORT_FIELD] = int(port) if port.isdigit() else None
+
+            # Skip blank lines and rows without an address
+            if device['ip_address']:
+                devices.append(device)
+    return devices
+
+
+# Key of a device in caches, profiles and the snapshot store: its address, with the port
+# when one is given, so devices sharing an address (e.g. the simulator's) stay apart
+def device_address(ip_address, port=None):
+    return ip_address if port is None else f'{ip_address}:{port}'
+
+
+# Session for one inventory row, connecting to its port when the row has one
+def open_session(session_class, device):
+    return session_class(device['ip_address'], device['username'], device['password'],
+                         device['hostname'], device.get('enable_password', ''), port=device.get(PORT_FIELD))
+
+
+# Run the login/enable/hostname sequence for one device and return its result row
+def bootstrap_device(session_class, device):
+    start = time.monotonic()
+    ssh = open_session(session_class, device)
+    try:
+        ok = ssh.bootstrap()
+        error = '' if ok else ssh.error
+    except Exception as e:
+        ok = False
+        error = str(e) or type(e).__name__
+    finally:
+        # The fleet run only bootstraps, so the SSH child is not kept around.
+        # Sessions with their own close() also end their trace there.
+        if hasattr(ssh, 'close'):
+            ssh.close()
+        elif ssh.session is not None:
+            ssh.session.close()
+
+    return {
+        'ip_address': device['ip_address'],
+        'hostname': device['hostname'],
+        'status': 'ok' if ok else 'failed',
+        'error': error,
+        'seconds': round(time.monotonic() - start, 2),
+    }
+
+
+# Bootstrap every device with at most `workers` sessions open at once.
+# Results come back in inventory order whatever order the devices finish in.
+def bootstrap_fleet(session_class, devices, workers=DEFAULT_WORKERS):
+    results = [None] * len(devices)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(bootstrap_device, session_class, device): index
+                   for index, device in enumerate(devices)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
+
+# Asyncio version of bootstrap_device() for AsyncNetworkSession classes
+async def bootstrap_device_async(session_class, device):
+    start = time.monotonic()
+    session = open_session(session_class, device)
+    try:
+        ok = await session.bootstrap()
+        error = '' if ok else session.error
+    except Exception as e:
+        ok = False
+        error = str(e) or type(e).__name__
+    finally:
+        await session.close()
+
+    return {
+        'ip_address': device['ip_address'],
+        'hostname': device['hostname'],
+        'status': 'ok' if ok else 'failed',
+        'error': error,
+        'seconds': round(time.monotonic() - start, 2),
+    }
+
+
+# Bootstrap every device on one event loop with at most `workers` sessions in flight
+async def bootstrap_fleet_async(session_class, devices, workers=DEFAULT_WORKERS):
+    limit = asyncio.Semaphore(max(1, workers))
+
+    async def run(device):
+        async with limit:
+            return await bootstrap_device_async(session_class, device)
+
+    return await asyncio.gather(*(run(device) for device in devices))
+
+
+# Print one line per device followed by the totals
+def print_summary(results, elapsed):
+    print("\n--- Fleet Bootstrap Summary ---")
+    print(f"{'IP address':<18}{'Hostname':<20}{'Status':<8}{'Time (s)':>9}  Error")
+    for result in results:
+        print(f"{result['ip_address']:<18}{result['hostname']:<20}{result['status']:<8}"
+              f"{result['seconds']:>9.2f}  {result['error']}")
+
+    succeeded = sum(1 for result in results if result['status'] == 'ok')
+    print(f"\n{succeeded}/{len(results)} devices bootstrapped in {elapsed:.2f} s.")
+
+
+# Ask for an inventory file and a pool size, then bootstrap the whole fleet
+def fleet_menu(session_class):
+    path = input('Enter inventory file (CSV): ')
+    workers = input(f'Enter number of parallel sessions [{DEFAULT_WORKERS}]: ').strip()
+
+    try:
+        devices = load_inventory(path)
+    except FileNotFoundError:
+        print(f"Inventory file {path} not found.")
+        return
+
+    if not devices:
+        print("No devices found in the inventory.")
+        return
+
+    if not workers.isdigit() or int(workers) == 0:
+        workers = DEFAULT_WORKERS
+
+    start = time.monotonic()
+    if asyncio.iscoroutinefunction(session_class.bootstrap):
+        results = asyncio.run(bootstrap_fleet_async(session_class, devices, int(workers)))
+    else:
+        results = bootstrap_fleet(session_class, devices, int(workers))
+    print_summary(results, time.monotonic() - start)
+    return results
@@ -0,0 +1,167 @@
+import json  # To persist the profiles between runs
+import threading  # Profiles are shared by the fleet worker threads
+from collections import deque  # Bounded sample history
+
+
+# Timeouts used for a device until enough samples have been collected
+DEFAULT_CONNECT_TIMEOUT = 20
+DEFAULT_COMMAND_TIMEOUT = 10
+
+# Bounds on any derived timeout, in seconds
+MIN_TIMEOUT = 1.0
+MAX_TIMEOUT = 120.0
+
+# Samples kept per device, and how many are needed before they are trusted
+MAX_SAMPLES = 50
+MIN_SAMPLES = 3
+
+# Derived timeout = PERCENTILE of the samples * HEADROOM + SLACK seconds
+PERCENTILE = 95
+HEADROOM = 4
+SLACK = 0.5
+
+# Commands that routinely take longer than a prompt round trip on IOS (NVRAM writes, config
+# generation), by their first words. Their timeout never drops below these seconds.
+SLOW_COMMAND_FLOORS = {
+    'write': 30.0,
+    'copy': 30.0,
+    'configure': 10.0,
+    'show startup-config': 15.0,
+    'show running-config': 15.0,
+}
+
+# Words of a command that identify it in the per-command history ('show running-config', not its filter)
+COMMAND_KEY_WORDS = 2
+
+# Outputs larger than this are used to estimate the device's output throughput (bytes/s)
+THROUGHPUT_MIN_BYTES = 4096
+
+# File the profiles are saved to between runs
+PROFILES_FILE = 'latency_profiles.json'
+
+
+# Value below which `pct` percent of the samples fall (nearest-rank)
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def _clamp(value):
+    return max(MIN_TIMEOUT, min(MAX_TIMEOUT, value))
+
+
+# 'show running-config | include x' -> 'show running-config'
+def command_key(command):
+    return ' '.join(str(command or '').split('|')[0].split()[:COMMAND_KEY_WORDS])
+
+
+def slow_command_floor(command):
+    key = command_key(command)
+    for prefix, floor in SLOW_COMMAND_FLOORS.items():
+        if key == prefix or key.startswith(prefix + ' '):
+            return floor
+    return 0.0
+
+
+# Handshake and per-command round-trip history of one device, used to derive its timeouts
+class LatencyProfile:
+    def __init__(self):
+        self.handshakes = deque(maxlen=MAX_SAMPLES)  # Seconds from spawn to the password prompt
+        self.round_trips = deque(maxlen=MAX_SAMPLES)  # Seconds from sendline to the prompt, any command
+        self.command_round_trips = {}  # command_key() -> its own round trips
+        self.throughputs = deque(maxlen=MAX_SAMPLES)  # Bytes per second of large outputs
+        self.output_sizes = {}  # Last output size of each command, for the size allowance
+
+    def record_handshake(self, seconds):
+        self.handshakes.append(seconds)
+
+    def record_command(self, command, seconds, nbytes=0):
+        self.round_trips.append(seconds)
+        key = command_key(command)
+        if key not in self.command_round_trips:
+            self.command_round_trips[key] = deque(maxlen=MAX_SAMPLES)
+        self.command_round_trips[key].append(seconds)
+
+        # Only commands with large outputs need a size allowance, so only they are remembered
+        if nbytes >= THROUGHPUT_MIN_BYTES:
+            self.output_sizes[command] = nbytes
+            if seconds > 0:
+                self.throughputs.append(nbytes / seconds)
+        else:
+            self.output_sizes.pop(command, None)
+
+    # Timeout for reaching the device and getting its password prompt
+    def connect_timeout(self):
+        if len(self.handshakes) < MIN_SAMPLES:
+            return DEFAULT_CONNECT_TIMEOUT
+        return _clamp(percentile(self.handshakes, PERCENTILE) * HEADROOM + SLACK)
+
+    # Timeout for a command: percentile of that command's own round trips (of all commands
+    # until it has enough), plus an allowance for the size its output had last time at the
+    # throughput seen on this device, and never below the floor of a known slow command
+    def command_timeout(self, command=None):
+        samples = self.command_round_trips.get(command_key(command), ())
+        if len(samples) < MIN_SAMPLES:
+            samples = self.round_trips
+        floor = slow_command_floor(command)
+        if len(samples) < MIN_SAMPLES:
+            return max(DEFAULT_COMMAND_TIMEOUT, floor)
+        timeout = percentile(samples, PERCENTILE) * HEADROOM + SLACK
+        expected_bytes = self.output_sizes.get(command, 0)
+        if expected_bytes >= THROUGHPUT_MIN_BYTES and self.throughputs:
+            slowest = percentile(self.throughputs, 100 - PERCENTILE)
+            timeout += expected_bytes / slowest * HEADROOM
+        return min(MAX_TIMEOUT, max(_clamp(timeout), floor))
+
+    def to_dict(self):
+        return {
+            'handshakes': list(self.handshakes),
+            'round_trips': list(self.round_trips),
+            'command_round_trips': {key: list(samples) for key, samples in self.command_round_trips.items()},
+            'throughputs': list(self.throughputs),
+            'output_sizes': self.output_sizes,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls()
+        profile.handshakes.extend(data.get('handshakes', []))
+        profile.round_trips.extend(data.get('round_trips', []))
+        for key, samples in data.get('command_round_trips', {}).items():
+            profile.command_round_trips[key] = deque(samples, maxlen=MAX_SAMPLES)
+        profile.throughputs.extend(data.get('throughputs', []))
+        profile.output_sizes.update(data.get('output_sizes', {}))
+        return profile
+
+
+# Profiles of every device seen by this process, keyed by IP address
+PROFILES = {}
+_profiles_lock = threading.Lock()
+
+
+def profile_for(ip_address):
+    with _profiles_lock:
+        if ip_address not in PROFILES:
+            PROFILES[ip_address] = LatencyProfile()
+        return PROFILES[ip_address]
+
+
+# Write every profile to disk so the next run starts from known latencies
+def save_profiles(path=PROFILES_FILE):
+    with _profiles_lock:
+        data = {ip: profile.to_dict() for ip, profile in PROFILES.items()}
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def load_profiles(path=PROFILES_FILE):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return
+    with _profiles_lock:
+        for ip, profile in data.items():
+            PROFILES[ip] = LatencyProfile.from_dict(profile)
+
@@ -2,6 +2,8 @@ import difflib  # For comparing configurations
 import pexpect  # For handling SSH sessions
 import sqlite3  # For database storage
 
+from fleet import fleet_menu  # For bootstrapping many devices in parallel
+
 
 # Database setup
 def setup_database():
@@ -29,31 +31,44 @@ def save_log(action):
 
 # SSH class for managing network sessions
 class SSHTONetworkSession:
-    def __init__(self, ip_address, username, password, hostname, enable_password=''):
+    def __init__(self, ip_address, username, password, hostname, enable_password='', port=None):
         self.ip_address = ip_address
+        self.port = port  # SSH port when the device does not listen on 22
         self.username = username
         self.password = password
         self.hostname = hostname
         self.enable_password = enable_password
         self.session = None
+        self.error = ''
 
 
     # Initiate SSH session
     def ssh_session(self):
+        if self.bootstrap():
+            self.compare_configs_menu()
+
+    # Record why the session could not be prepared so fleet runs can report it
+    def _fail(self, message):
+        self.error = message
+        print(message)
+        return False
+
+    # Login, enable and hostname sequence shared by the interactive and fleet modes
+    def bootstrap(self):
+        self.error = ''
         try:
-            self.session = pexpect.spawn(f'ssh {self.username}@{self.ip_address}', encoding='utf-8', timeout=20)
+            port = f' -p {self.port}' if self.port else ''
+            self.session = pexpect.spawn(f'ssh{port} {self.username}@{self.ip_address}', encoding='utf-8', timeout=20)
             result = self.session.expect(['Password:', pexpect.TIMEOUT, pexpect.EOF])
             if result != 0:
-                print('Session failed to establish.')
                 save_log('Failed to establish SSH session.')
-                return
+                return self._fail('Session failed to establish.')
 
             self.session.sendline(self.password)
             result = self.session.expect(['>', '#', pexpect.TIMEOUT, pexpect.EOF])
             if result != 0:
-                print('Authentication failed.')
                 save_log('Authentication failed during SSH session.')
-                return
+                return self._fail('Authentication failed.')
 
             # Enter enable mode
             self.session.sendline('enable')
@@ -62,17 +77,15 @@ class SSHTONetworkSession:
                 self.session.sendline(self.enable_password)
                 result = self.session.expect('#')
             if result != 0:
-                print('Enable mode failed.')
                 save_log('Failed to enter enable mode.')
-                return
+                return self._fail('Enable mode failed.')
 
             # Enter configuration mode
             self.session.sendline('configure terminal')
             result = self.session.expect(r'\(config\)#')
             if result != 0:
-                print('Config mode failed.')
                 save_log('Failed to enter configuration mode.')
-                return
+                return self._fail('Config mode failed.')
 
             # Set hostname
             self.session.sendline(f'hostname {self.hostname}')
@@ -81,19 +94,18 @@ class SSHTONetworkSession:
                 print('Hostname set successfully.')
                 save_log(f'Successfully set hostname to {self.hostname}.')
             else:
-                print('Failed to set hostname.')
                 save_log('Failed to set hostname.')
-                return
+                return self._fail('Failed to set hostname.')
 
             # Exit configuration mode
             self.session.sendline('exit')
             print('Session ready for further commands.')
             save_log('SSH session established and ready.')
-            self.compare_configs_menu()
+            return True
 
         except Exception as e:
-            print(f"Error during SSH session: {e}")
             save_log(f'Error during SSH session: {e}')
+            return self._fail(f"Error during SSH session: {e}")
 
     # Show IP interface brief
     def show_ip_interface_brief(self):
@@ -186,7 +198,8 @@ def menu():
     while True:
         print('--------- MENU ---------')
         print('a. SSH Session')
-        print('b. Exit')
+        print('b. Fleet bootstrap from inventory')
+        print('c. Exit')
         option = input('Choose an option: ')
         if option == 'a':
             host_ip = input('Enter IP address: ')
@@ -197,6 +210,8 @@ def menu():
             ssh = SSHTONetworkSession(host_ip, username, password, hostname, enable_password)
             ssh.ssh_session()
         elif option == 'b':
+            fleet_menu(SSHTONetworkSession)
+        elif option == 'c':
             print('Session cancelled. Goodbye.')
             break
         else:
@@ -0,0 +1,205 @@
+import bisect  # To find a sample's histogram bucket
+import functools  # To keep the wrapped method's name and docstring
+import threading  # Sessions run their operations from worker threads
+import time  # To time commands and operations
+from contextlib import contextmanager  # For the `with metrics.operation(...)` form
+
+import pexpect  # To tell timeouts and closed sessions apart from matches
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Words of a command kept in its label; the rest (addresses, masks, ...) would make every line a new series
+COMMAND_LABEL_WORDS = {'show': 4, 'write': 2, 'copy': 3, 'configure': 2, 'terminal': 2, 'router': 2, 'ip': 2, 'no': 2}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# Monotonic counter per label set
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f'{self.name}{_labels(self.label_names, labels)} {_number(value)}' for labels, value in items]
+
+
+# Cumulative bucket counts, sum and count per label set
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.values = {}  # labels -> [per-bucket counts (last one is +Inf), sum]
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        with self.lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self.values.items())
+        lines = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + ['+Inf'], counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+
+# Holds every metric and renders them in the Prometheus text exposition format
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help_text, label_names):
+        metric = Counter(name, help_text, label_names)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, label_names, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    'device_command_duration_seconds', 'Time from sending a command to matching the expected prompt.',
+    ('device', 'operation', 'command'))
+COMMAND_BYTES = REGISTRY.counter(
+    'device_command_output_bytes_total', 'Bytes of output read before the expected prompt.',
+    ('device', 'operation', 'command'))
+COMMAND_TIMEOUTS = REGISTRY.counter(
+    'device_command_timeouts_total', 'Expect waits that timed out.',
+    ('device', 'operation', 'command'))
+OPERATION_SECONDS = REGISTRY.histogram(
+    'device_operation_duration_seconds', 'Duration of high-level operations such as creating_ospf.',
+    ('device', 'operation'))
+OPERATION_ERRORS = REGISTRY.counter(
+    'device_operation_errors_total', 'Operations that hit a timeout, a closed session or an exception.',
+    ('device', 'operation'))
+
+
+# Label of a command: its keyword, plus the sub-command for show/write/copy/...
+def command_label(command):
+    words = command.split()
+    if not words:
+        return '<enter>'
+    return ' '.join(words[:COMMAND_LABEL_WORDS.get(words[0], 1)])
+
+
+# Metrics recorder for one device session.
+# The session calls sent() when a command goes out and expected() when its prompt
+# wait ends; operations group those commands under a name such as 'creating_ospf'.
+# State is per thread, as truths.py runs menu operations from worker threads.
+class DeviceMetrics:
+    def __init__(self, device):
+        self.device = device
+        self.state = threading.local()
+
+    def _current(self):
+        return getattr(self.state, 'operation', None) or 'session'
+
+    def sent(self, command):
+        self.state.command = command_label(command)
+        self.state.sent_at = time.monotonic()
+
+    # Record the wait that just ended. `after` is the session's .after (pexpect.TIMEOUT or
+    # pexpect.EOF when those were matched from the pattern list); `error` is a raised exception.
+    def expected(self, nbytes, after=None, error=None):
+        sent_at = getattr(self.state, 'sent_at', None)
+        if sent_at is None:
+            return
+        self.state.sent_at = None
+        labels = (self.device, self._current(), self.state.command)
+
+        if error is not None or after is pexpect.TIMEOUT or after is pexpect.EOF:
+            if isinstance(error, pexpect.TIMEOUT) or after is pexpect.TIMEOUT:
+                COMMAND_TIMEOUTS.inc(labels)
+            self.state.failed = True
+            return
+        COMMAND_SECONDS.observe(labels, time.monotonic() - sent_at)
+        COMMAND_BYTES.inc(labels, nbytes)
+
+    # Time a high-level operation; it counts as an error if one of its waits failed or it raised
+    @contextmanager
+    def operation(self, name):
+        outer = getattr(self.state, 'operation', None)
+        outer_failed = getattr(self.state, 'failed', False)
+        self.state.operation = name
+        self.state.failed = False
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.state.failed = True
+            raise
+        finally:
+            OPERATION_SECONDS.observe((self.device, name), time.monotonic() - start)
+            failed = self.state.failed
+            if failed:
+                OPERATION_ERRORS.inc((self.device, name))
+            # A failure inside a nested operation also fails the enclosing one
+            self.state.operation = outer
+            self.state.failed = outer_failed or failed
+
+
+# Decorator for session methods: runs the method inside self.metrics.operation(name)
+def instrumented(name):
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.operation(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,48 @@
+import re  # To build the prompt patterns
+from functools import lru_cache  # To compile each hostname's patterns only once
+
+
+# Characters at the end of the session buffer searched for a prompt.
+# Passed to pexpect as searchwindowsize so long outputs are not rescanned on every read.
+SEARCH_WINDOW = 512
+
+# Prompt suffix of each CLI mode
+MODE_SUFFIXES = {
+    'exec': r'>',
+    'enable': r'#',
+    'config': r'\(config\)#',
+    'config-if': r'\(config-if\)#',
+    'config-router': r'\(config-router\)#',
+    'any': r'(?:\([\w\-]+\))?[>#]',
+}
+
+# A whole line made of a hostname and a prompt character, used to learn the prompt after login
+LEARN_PROMPT = re.compile(r'(?:^|[\r\n])([\w.\-]+)(?:\([\w\-]+\))?([>#])\s*$')
+
+
+# Anchored patterns for every mode of one hostname.
+# Each pattern must start on a new line and end the buffer, so a '#' inside a
+# banner, a config line or the middle of an output no longer counts as a prompt.
+@lru_cache(maxsize=1024)
+def compile_prompts(hostname):
+    host = re.escape(hostname)
+    return {mode: re.compile(rf'(?:^|[\r\n]){host}{suffix}\s*$') for mode, suffix in MODE_SUFFIXES.items()}
+
+
+# The prompt patterns of one device, learnt once after login
+class PromptMatcher:
+    def __init__(self, hostname):
+        self.hostname = hostname
+        self.patterns = compile_prompts(hostname)
+
+    # Precompiled pattern for a mode name from MODE_SUFFIXES
+    def pattern(self, mode):
+        return self.patterns[mode]
+
+    # Hostname and prompt character ('>' or '#') from the text of a LEARN_PROMPT match
+    @staticmethod
+    def parse(text):
+        match = LEARN_PROMPT.search(text)
+        if match is None:
+            return None, None
+        return match.group(1), match.group(2)
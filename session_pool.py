@@ -0,0 +1,126 @@
+import hashlib  # Pooled sessions are keyed by a hash of the credentials, never the credentials
+import threading  # To share the pool between worker threads
+import time  # To track how long sessions have been idle
+from collections import OrderedDict  # Idle sessions in least-recently-used order
+from contextlib import contextmanager  # For the `with pool.connection(...)` form
+
+
+# Privilege levels a pooled session can be handed out at
+PRIVILEGE_EXEC = 1
+PRIVILEGE_ENABLE = 15
+
+# Idle sessions older than this many seconds are closed instead of reused
+DEFAULT_IDLE_TTL = 300
+
+# Upper bound on idle sessions kept open; the least recently used one is closed first
+DEFAULT_MAX_SESSIONS = 32
+
+
+# Hash of the passwords a session was opened with
+def credentials_hash(password, enable_password):
+    return hashlib.sha256(f'{password}\0{enable_password}'.encode()).hexdigest()
+
+
+# Pool of authenticated (and, at privilege 15, enabled) SSHTONetworkSession objects
+# keyed by (ip address, port, username, privilege level, credentials hash), so only a caller
+# with the same passwords gets a pooled session.
+# A session is handed out to one caller at a time and is put back with release().
+class SessionPool:
+    def __init__(self, session_class, max_sessions=DEFAULT_MAX_SESSIONS, idle_ttl=DEFAULT_IDLE_TTL):
+        self.session_class = session_class
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.idle = OrderedDict()  # key -> (session, time it was released)
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'reconnects': 0, 'evictions': 0}
+
+    # Return a ready session for the device, reusing an idle one when it still answers.
+    # Returns None if a new session could not be logged in or enabled.
+    def acquire(self, ip_address, username, password, enable_password='', privilege=PRIVILEGE_ENABLE, port=None):
+        key = (ip_address, port, username, privilege, credentials_hash(password, enable_password))
+        with self.lock:
+            expired = self._evict_expired()
+            entry = self.idle.pop(key, None)
+        # Closing may save the configuration, so it happens outside the lock
+        for old in expired:
+            old.close()
+
+        if entry is not None:
+            session = entry[0]
+            if session.probe():
+                self._count('hits')
+                return session
+
+            # The pooled session went stale, so reconnect transparently
+            session.close()
+            self._count('reconnects')
+
+        self._count('misses')
+        session = self.session_class(ip_address, username, password, '', enable_password, port=port)
+        ready = session.login()
+        if ready and privilege >= PRIVILEGE_ENABLE:
+            ready = session.enter_enable()
+        if not ready:
+            session.close()
+            return None
+
+        session.pool_key = key
+        return session
+
+    # Hand a session back so later callers for the same device can skip connection setup
+    def release(self, session):
+        key = getattr(session, 'pool_key', None)
+        if key is None or session.session is None:
+            session.close()
+            return
+
+        with self.lock:
+            previous = self.idle.pop(key, None)
+            self.idle[key] = (session, time.monotonic())
+            evicted = [previous[0]] if previous is not None else []
+            while len(self.idle) > self.max_sessions:
+                evicted.append(self.idle.popitem(last=False)[1][0])
+                self.stats['evictions'] += 1
+
+        for old in evicted:
+            old.close()
+
+    # Drop a session that is known to be broken instead of returning it to the pool
+    def discard(self, session):
+        session.close()
+
+    # Acquire a session for the duration of a `with` block
+    @contextmanager
+    def connection(self, ip_address, username, password, enable_password='', privilege=PRIVILEGE_ENABLE, port=None):
+        session = self.acquire(ip_address, username, password, enable_password, privilege, port)
+        try:
+            yield session
+        except Exception:
+            if session is not None:
+                self.discard(session)
+            raise
+        else:
+            if session is not None:
+                self.release(session)
+
+    # Close every idle session, e.g. when the program exits
+    def close_all(self):
+        with self.lock:
+            sessions = [entry[0] for entry in self.idle.values()]
+            self.idle.clear()
+        for session in sessions:
+            session.close()
+
+    # Remove idle sessions past their TTL and return them for the caller to close once it has
+    # released self.lock, so a slow write memory on close never blocks the other callers
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = []
+        for key in [key for key, (session, released) in self.idle.items() if now - released > self.idle_ttl]:
+            expired.append(self.idle.pop(key)[0])
+            self.stats['evictions'] += 1
+        return expired
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
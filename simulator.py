@@ -0,0 +1,674 @@
+import asyncio  # Every virtual device runs on one event loop
+import csv  # To write an inventory of the virtual devices
+import random  # For latency jitter and failure injection
+import re  # For the '| include/section' output filters
+import time  # To timestamp configuration changes
+
+from fleet import INVENTORY_FIELDS, PORT_FIELD  # Inventory columns read by fleet.py
+
+try:
+    import asyncssh  # In-process SSH server; without it only Telnet devices can be started
+except ImportError:
+    asyncssh = None
+
+try:
+    import resource  # To raise the open-file limit for large simulations (Unix only)
+except ImportError:
+    resource = None
+
+
+# Telnet bytes the simulator needs to negotiate like an IOS vty
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+ECHO = 1
+SUPPRESS_GO_AHEAD = 3
+
+READ_SIZE = 4096
+LOGIN_ATTEMPTS = 3
+NVRAM_SIZE = 262144
+TIME_FORMAT = '%H:%M:%S UTC %a %b %d %Y'
+
+DEFAULT_BASE_PORT = 10000
+DEFAULT_USERNAME = 'admin'
+DEFAULT_PASSWORD = 'cisco'
+DEFAULT_ENABLE_PASSWORD = 'cisco'
+
+LINE_END = re.compile(r'[\r\n]')
+
+INVALID_INPUT = "% Invalid input detected at '^' marker."
+
+# Global configuration keywords stored as plain lines
+GLOBAL_KEYWORDS = ('ip', 'ipv6', 'service', 'logging', 'banner', 'username', 'enable', 'ntp',
+                   'snmp-server', 'clock', 'boot', 'no', 'cdp', 'lldp', 'spanning-tree', 'vtp')
+INTERFACE_KEYWORDS = ('ip', 'ipv6', 'description', 'shutdown', 'no', 'duplex', 'speed',
+                      'bandwidth', 'delay', 'mtu', 'encapsulation', 'switchport', 'cdp')
+ROUTER_KEYWORDS = ('network', 'router-id', 'passive-interface', 'auto-summary', 'no', 'redistribute',
+                   'eigrp', 'log-adjacency-changes', 'default-information', 'area', 'metric',
+                   'distance', 'maximum-paths', 'timers', 'variance')
+
+
+# Behaviour of a virtual device: response times, output size and injected failures
+class DeviceProfile:
+    def __init__(self, latency=0.0, jitter=0.0, fail_rate=0.0, drop_rate=0.0, stall_rate=0.0,
+                 extra_interfaces=0, privilege=1):
+        self.latency = latency  # Seconds before every command is answered
+        self.jitter = jitter  # Random extra delay, up to this many seconds
+        self.fail_rate = fail_rate  # Chance a configuration line is rejected with '% Invalid input'
+        self.drop_rate = drop_rate  # Chance the connection is closed instead of answering
+        self.stall_rate = stall_rate  # Chance a command is never answered, to exercise timeouts
+        self.extra_interfaces = extra_interfaces  # Filler loopbacks that make the configs larger
+        self.privilege = privilege  # 15 logs straight into the enable '#' prompt
+
+    def delay(self):
+        return self.latency + random.uniform(0, self.jitter) if self.jitter else self.latency
+
+
+# Configuration state of one virtual router, shared by every session open to it
+class VirtualDevice:
+    def __init__(self, index, username=DEFAULT_USERNAME, password=DEFAULT_PASSWORD,
+                 enable_password=DEFAULT_ENABLE_PASSWORD, profile=None):
+        self.username = username
+        self.password = password
+        self.enable_password = enable_password
+        self.profile = profile or DeviceProfile()
+        self.hostname = f'Router{index}'
+        self.globals = ['service timestamps debug datetime msec', 'service timestamps log datetime msec',
+                        'no ip domain lookup']
+        self.blocks = {}  # Section header -> child lines, in configuration order
+        self.blocks['interface GigabitEthernet0/0'] = [f' ip address 10.{index // 250 % 250}.{index % 250}.1 255.255.255.0',
+                                                        ' duplex auto']
+        self.blocks['interface GigabitEthernet0/1'] = [' no ip address', ' shutdown', ' duplex auto']
+        for number in range(self.profile.extra_interfaces):
+            self.blocks[f'interface Loopback{1000 + number}'] = [
+                f' description filler interface {number}',
+                f' ip address 172.{16 + number // 62500 % 16}.{number // 250 % 250}.{number % 250 + 1} 255.255.255.255']
+        self.last_change = time.time()
+        self.startup = self.config_lines()  # Saved configuration, as 'show startup-config' prints it
+        self.saved_at = self.last_change
+
+    # Body of the running configuration, from 'version' to 'end'
+    def config_lines(self):
+        lines = ['!', 'version 15.2', *self.globals, '!', f'hostname {self.hostname}', '!']
+        # IOS lists interfaces before the routing processes
+        headers = sorted(self.blocks, key=lambda header: not header.startswith('interface'))
+        for header in headers:
+            lines.append(header)
+            lines.extend(self.blocks[header])
+            lines.append('!')
+        lines.extend(['line con 0', 'line vty 0 4', ' login local', '!', 'end'])
+        return lines
+
+    def running_config(self):
+        body = [f'! Last configuration change at {time.strftime(TIME_FORMAT, time.gmtime(self.last_change))}',
+                *self.config_lines()]
+        size = sum(len(line) + 1 for line in body)
+        return ['Building configuration...', '', f'Current configuration : {size} bytes', *body]
+
+    # 'show running-config interface X': one interface block, None if there is no such interface
+    def interface_config(self, name):
+        header = f'interface {name}'
+        if header not in self.blocks:
+            return None
+        body = ['!', header, *self.blocks[header], 'end']
+        size = sum(len(line) + 1 for line in body)
+        return ['Building configuration...', '', f'Current configuration : {size} bytes', *body]
+
+    def startup_config(self):
+        size = sum(len(line) + 1 for line in self.startup)
+        return [f'Using {size} out of {NVRAM_SIZE} bytes',
+                f'! NVRAM config last updated at {time.strftime(TIME_FORMAT, time.gmtime(self.saved_at))}',
+                *self.startup]
+
+    def write_memory(self):
+        self.startup = self.config_lines()
+        self.saved_at = time.time()
+
+    def interface_brief(self):
+        lines = [f"{'Interface':<27}{'IP-Address':<16}OK? Method Status                Protocol"]
+        for header, children in self.blocks.items():
+            if not header.startswith('interface '):
+                continue
+            address = 'unassigned'
+            for child in children:
+                words = child.split()
+                if words[:2] == ['ip', 'address'] and len(words) >= 3:
+                    address = words[2]
+            down = ' shutdown' in children
+            status = 'administratively down' if down else 'up'
+            lines.append(f"{header[10:]:<27}{address:<16}YES {'NVRAM':<7}{status:<22}{'down' if down else 'up'}")
+        return lines
+
+    def changed(self):
+        self.last_change = time.time()
+
+
+# 'loopback 0' -> 'Loopback0', 'gi0/1' stays as typed apart from the capital letter
+def interface_name(words):
+    name = ''.join(words)
+    return name[:1].upper() + name[1:]
+
+
+# True if the typed words abbreviate the keywords, as IOS accepts 'sh run' or 'conf t'
+def abbreviates(words, keywords):
+    keywords = keywords.split()
+    if len(words) < len(keywords):
+        return False
+    return all(word and keyword.startswith(word.lower()) for word, keyword in zip(words, keywords))
+
+
+# 'write', 'wr' or 'write memory'
+def is_write_memory(words):
+    if not words or len(words[0]) < 2 or not 'write'.startswith(words[0].lower()):
+        return False
+    return len(words) == 1 or abbreviates(words[1:], 'memory')
+
+
+# Apply an IOS output modifier ('| include', '| exclude', '| begin', '| section') to output lines
+def filter_output(lines, modifier):
+    words = modifier.split(None, 1)
+    if len(words) < 2:
+        return None
+    keyword, expression = words[0].lower(), words[1]
+    try:
+        pattern = re.compile(expression)
+    except re.error:
+        return None
+
+    if 'include'.startswith(keyword):
+        return [line for line in lines if pattern.search(line)]
+    if 'exclude'.startswith(keyword):
+        return [line for line in lines if not pattern.search(line)]
+    if 'begin'.startswith(keyword):
+        for index, line in enumerate(lines):
+            if pattern.search(line):
+                return lines[index:]
+        return []
+    if 'section'.startswith(keyword):
+        # A section is a top-level line with its indented children; it is shown whole when any line matches
+        selected, block = [], []
+        for line in lines + ['']:
+            if block and not line.startswith(' '):
+                if any(pattern.search(text) for text in block):
+                    selected.extend(block)
+                block = []
+            if line and line != '!':
+                block.append(line)
+        return selected
+    return None
+
+
+# One CLI session on a virtual device: prompt, modes and command handling.
+# `write` sends text to the client, `read` returns the next chunk of input ('' at EOF).
+class CLISession:
+    def __init__(self, device, read, write):
+        self.device = device
+        self.read_chunk = read
+        self.write = write
+        self.buffer = ''
+        self.skip_newline = False  # A '\r' was the last character, so a following '\n' is the same Enter
+        self.privileged = device.profile.privilege >= 15
+        self.mode = ''  # '', 'config', 'config-if' or 'config-router'
+        self.block = None  # Section header being configured in a sub-mode
+
+    def prompt(self):
+        if self.mode:
+            return f'{self.device.hostname}({self.mode})#'
+        return f"{self.device.hostname}{'#' if self.privileged else '>'}"
+
+    # Next line typed by the client, or None once the connection is closed.
+    # CR, LF and CR LF all end a line; typed lines are echoed like on a terminal.
+    async def read_line(self, echo=True):
+        while True:
+            if self.skip_newline and self.buffer:
+                if self.buffer[0] == '\n':
+                    self.buffer = self.buffer[1:]
+                self.skip_newline = False
+            match = LINE_END.search(self.buffer)
+            if match:
+                line, self.buffer = self.buffer[:match.start()], self.buffer[match.end():]
+                self.skip_newline = match.group() == '\r'
+                self.write((line if echo else '') + '\r\n')
+                return line
+            data = await self.read_chunk()
+            if not data:
+                return None
+            self.buffer += data
+
+    def output(self, lines):
+        if lines:
+            self.write('\r\n'.join(lines) + '\r\n')
+
+    # Username/password exchange for transports without their own authentication (Telnet)
+    async def authenticate(self):
+        self.write('\r\nUser Access Verification\r\n\r\n')
+        for _ in range(LOGIN_ATTEMPTS):
+            self.write('Username: ')
+            username = await self.read_line()
+            if username is None:
+                return False
+            self.write('Password: ')
+            password = await self.read_line(echo=False)
+            if password is None:
+                return False
+            if username == self.device.username and password == self.device.password:
+                return True
+            self.write('% Login invalid\r\n\r\n')
+        return False
+
+    # Serve commands until the client exits or the connection drops
+    async def run(self):
+        profile = self.device.profile
+        while True:
+            self.write(self.prompt())
+            line = await self.read_line()
+            if line is None:
+                return
+            command = line.strip()
+            if not command:
+                continue
+
+            await asyncio.sleep(profile.delay())
+            if profile.drop_rate and random.random() < profile.drop_rate:
+                return
+            if profile.stall_rate and random.random() < profile.stall_rate:
+                # Never answer; the client has to time out and close the connection
+                while await self.read_chunk():
+                    pass
+                return
+
+            words = command.split()
+            if self.mode and words[0].lower() == 'do' and len(words) > 1:
+                # 'do show ...' runs an exec command without leaving configuration mode
+                mode, self.mode = self.mode, ''
+                keep_going = await self.execute(' '.join(words[1:]))
+                self.mode = mode
+            elif self.mode:
+                keep_going = self.configure(command)
+            else:
+                keep_going = await self.execute(command)
+            if not keep_going:
+                return
+
+    # Exec-mode commands. Returns False when the session ends.
+    async def execute(self, command):
+        words = command.split()
+        device = self.device
+
+        if abbreviates(words, 'exit') or abbreviates(words, 'logout') or abbreviates(words, 'quit'):
+            return False
+        if abbreviates(words, 'enable') and len(words) == 1:
+            if not self.privileged:
+                if device.enable_password:
+                    self.write('Password: ')
+                    password = await self.read_line(echo=False)
+                    if password is None:
+                        return False
+                    if password != device.enable_password:
+                        self.output(['% Access denied'])
+                        return True
+                self.privileged = True
+            return True
+        if abbreviates(words, 'disable'):
+            self.privileged = False
+            return True
+        if abbreviates(words, 'terminal length') or abbreviates(words, 'terminal width'):
+            return True
+
+        # Everything else shows or changes configuration and needs the enable prompt
+        command, _, modifier = command.partition('|')
+        words = command.split()
+        if abbreviates(words, 'show ip interface brief'):
+            lines = device.interface_brief()
+        elif not self.privileged:
+            lines = None
+        elif abbreviates(words, 'configure terminal') or words == ['configure'] or words == ['conf']:
+            self.output(['Enter configuration commands, one per line.  End with CNTL/Z.'])
+            self.mode = 'config'
+            return True
+        elif abbreviates(words, 'show running-config interface') and len(words) > 3:
+            lines = device.interface_config(interface_name(words[3:]))
+        elif abbreviates(words, 'show running-config'):
+            lines = device.running_config()
+        elif abbreviates(words, 'show startup-config'):
+            lines = device.startup_config()
+        elif is_write_memory(words) or abbreviates(words, 'copy running-config startup-config'):
+            device.write_memory()
+            lines = ['Building configuration...', '[OK]']
+        else:
+            lines = None
+
+        if lines is not None and modifier:
+            lines = filter_output(lines, modifier.strip())
+        self.output([INVALID_INPUT] if lines is None else lines)
+        return True
+
+    # Configuration-mode commands; the session always continues
+    def configure(self, command):
+        words = command.split()
+        device = self.device
+
+        if words[0].lower() == 'end' or command == '\x1a':
+            self.mode, self.block = '', None
+            return True
+        if words[0].lower() == 'exit':
+            if self.mode == 'config':
+                self.mode = ''
+            else:
+                self.mode, self.block = 'config', None
+            return True
+        if device.profile.fail_rate and random.random() < device.profile.fail_rate:
+            self.output([' ' * (len(self.prompt()) + len(words[0])) + '^', INVALID_INPUT])
+            return True
+
+        # Sub-mode lines first; anything else falls back to global configuration, as on IOS
+        keyword = words[0].lower()
+        sub_keywords = {'config-if': INTERFACE_KEYWORDS, 'config-router': ROUTER_KEYWORDS}.get(self.mode, ())
+        removes_section = keyword == 'no' and len(words) > 1 and words[1].lower() in ('interface', 'router')
+        if keyword in sub_keywords and not removes_section:
+            self._set_child(command)
+            return True
+
+        if keyword == 'hostname' and len(words) == 2:
+            device.hostname = words[1]
+        elif keyword == 'interface' and len(words) >= 2:
+            self._enter_block(f'interface {interface_name(words[1:])}', 'config-if')
+            return True
+        elif keyword == 'router' and len(words) >= 2 and words[1].lower() in ('ospf', 'eigrp', 'bgp', 'rip'):
+            self._enter_block(' '.join(['router', *words[1:]]).lower(), 'config-router')
+            return True
+        elif keyword == 'no' and len(words) >= 3 and words[1].lower() in ('interface', 'router'):
+            header = f'interface {interface_name(words[2:])}' if words[1].lower() == 'interface' \
+                else ' '.join(words[1:]).lower()
+            if device.blocks.pop(header, None) is None:
+                self.output([INVALID_INPUT])
+                return True
+        elif keyword in GLOBAL_KEYWORDS and len(words) >= 2:
+            if keyword == 'no':
+                text = ' '.join(words[1:])
+                device.globals = [line for line in device.globals if line != text]
+            elif command not in device.globals:
+                device.globals.append(command)
+        else:
+            self.output([' ' * len(self.prompt()) + '^', INVALID_INPUT])
+            return True
+        device.changed()
+        return True
+
+    def _enter_block(self, header, mode):
+        if header not in self.device.blocks:
+            self.device.blocks[header] = []
+            self.device.changed()
+        self.mode, self.block = mode, header
+
+    # Add or replace a line under the current section; 'no <line>' removes it
+    def _set_child(self, command):
+        children = self.device.blocks.setdefault(self.block, [])
+        words = command.split()
+        if words[0].lower() == 'no' and ' ' + ' '.join(words[1:]) in children:
+            children.remove(' ' + ' '.join(words[1:]))
+        elif words[0].lower() == 'shutdown' or words == ['no', 'shutdown']:
+            children[:] = [line for line in children if line.strip() not in ('shutdown', 'no shutdown')]
+            if words[0].lower() == 'shutdown':
+                children.append(' shutdown')
+        elif words[:2] == ['ip', 'address']:
+            children[:] = [line for line in children if not line.startswith((' ip address', ' no ip address'))]
+            children.insert(0, ' ' + command)
+        elif words[0].lower() == 'description':
+            children[:] = [line for line in children if not line.startswith(' description')]
+            children.insert(0, ' ' + command)
+        elif ' ' + command not in children:
+            children.append(' ' + command)
+        self.device.changed()
+
+
+# Telnet side of a connection: strips option negotiation and answers it like an IOS vty
+# (the device echoes and suppresses go-ahead; every other option is refused)
+class TelnetConnection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = b''
+
+    def start(self):
+        self.writer.write(bytes([IAC, WILL, ECHO, IAC, WILL, SUPPRESS_GO_AHEAD]))
+
+    async def read(self):
+        while True:
+            try:
+                data = await self.reader.read(READ_SIZE)
+            except ConnectionError:
+                return ''
+            if not data:
+                return ''
+            text = self._parse(self.pending + data).decode('utf-8', errors='replace')
+            if text:
+                return text
+
+    def _parse(self, data):
+        out = bytearray()
+        self.pending = b''
+        i = 0
+        while i < len(data):
+            if data[i] != IAC:
+                if data[i] != 0:  # NUL follows a bare CR on NVT lines
+                    out.append(data[i])
+                i += 1
+                continue
+            if i + 1 >= len(data):
+                self.pending = data[i:]
+                break
+            command = data[i + 1]
+            if command == IAC:
+                out.append(IAC)
+                i += 2
+            elif command in (DO, DONT, WILL, WONT):
+                if i + 2 >= len(data):
+                    self.pending = data[i:]
+                    break
+                option = data[i + 2]
+                if command == DO and option not in (ECHO, SUPPRESS_GO_AHEAD):
+                    self.writer.write(bytes([IAC, WONT, option]))
+                elif command == WILL and option != SUPPRESS_GO_AHEAD:
+                    self.writer.write(bytes([IAC, DONT, option]))
+                i += 3
+            elif command == SB:
+                end = data.find(bytes([IAC, SE]), i + 2)
+                if end == -1:
+                    self.pending = data[i:]
+                    break
+                i = end + 2
+            else:
+                i += 2
+        return bytes(out)
+
+    def write(self, text):
+        if not self.writer.is_closing():
+            self.writer.write(text.encode('utf-8').replace(bytes([IAC]), bytes([IAC, IAC])))
+
+    def close(self):
+        self.writer.close()
+
+
+async def serve_telnet(device, reader, writer):
+    connection = TelnetConnection(reader, writer)
+    connection.start()
+    cli = CLISession(device, connection.read, connection.write)
+    try:
+        if await cli.authenticate():
+            await cli.run()
+    finally:
+        connection.close()
+
+
+if asyncssh is not None:
+    # Authenticates SSH clients against the virtual device's credentials.
+    # Keyboard-interactive shows a 'Password:' prompt, which is what IOS presents to OpenSSH.
+    class DeviceSSHServer(asyncssh.SSHServer):
+        def __init__(self, device):
+            self.device = device
+
+        def begin_auth(self, username):
+            return True
+
+        def password_auth_supported(self):
+            return True
+
+        def validate_password(self, username, password):
+            return username == self.device.username and password == self.device.password
+
+        def kbdint_auth_supported(self):
+            return True
+
+        def get_kbdint_challenge(self, username, lang, submethods):
+            return '', '', '', [('Password: ', False)]
+
+        def validate_kbdint_response(self, username, responses):
+            return len(responses) == 1 and self.validate_password(username, responses[0])
+
+
+async def serve_ssh(device, process):
+    async def read():
+        try:
+            return await process.stdin.read(READ_SIZE)
+        except (asyncssh.BreakReceived, asyncssh.TerminalSizeChanged):
+            return ' '
+        except (asyncssh.Error, ConnectionError):
+            return ''
+
+    def write(text):
+        if not process.stdout.is_closing():
+            process.stdout.write(text)
+
+    cli = CLISession(device, read, write)
+    try:
+        await cli.run()
+    finally:
+        process.exit(0)
+
+
+# A set of virtual devices listening on localhost.
+# Each device gets its own port (base_port + n) on `host`; with spread=True each gets its
+# own loopback address (127.0.x.y) on the standard port instead, so clients that cannot
+# pick a port (the ssh/telnet command lines in this repo) can reach every device.
+class Simulator:
+    def __init__(self, count, protocol='telnet', base_port=DEFAULT_BASE_PORT, host='127.0.0.1',
+                 spread=False, profile=None, username=DEFAULT_USERNAME, password=DEFAULT_PASSWORD,
+                 enable_password=DEFAULT_ENABLE_PASSWORD):
+        if protocol == 'ssh' and asyncssh is None:
+            raise RuntimeError('SSH devices need the asyncssh package.')
+        self.protocol = protocol
+        self.devices = [VirtualDevice(index, username, password, enable_password, profile)
+                        for index in range(count)]
+        self.addresses = []
+        for index in range(count):
+            if spread:
+                self.addresses.append((f'127.0.{index // 250 + 1}.{index % 250 + 1}',
+                                       22 if protocol == 'ssh' else 23))
+            else:
+                self.addresses.append((host, base_port + index))
+        self.servers = []
+
+    async def start(self):
+        raise_file_limit()
+        host_key = asyncssh.generate_private_key('ssh-ed25519') if self.protocol == 'ssh' else None
+        for device, (host, port) in zip(self.devices, self.addresses):
+            if self.protocol == 'ssh':
+                server = await asyncssh.create_server(
+                    lambda device=device: DeviceSSHServer(device), host, port,
+                    server_host_keys=[host_key], line_editor=False, encoding='utf-8',
+                    process_factory=lambda process, device=device: serve_ssh(device, process))
+            else:
+                server = await asyncio.start_server(
+                    lambda reader, writer, device=device: serve_telnet(device, reader, writer), host, port)
+            self.servers.append(server)
+
+    async def stop(self):
+        for server in self.servers:
+            server.close()
+        for server in self.servers:
+            await server.wait_closed()
+        self.servers = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # Rows for fleet.load_inventory(), with the port each device listens on
+    def inventory(self):
+        return [{'ip_address': host, 'username': device.username, 'password': device.password,
+                 'hostname': f'SIM{index}', 'enable_password': device.enable_password, PORT_FIELD: port}
+                for index, (device, (host, port)) in enumerate(zip(self.devices, self.addresses))]
+
+    def write_inventory(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=INVENTORY_FIELDS + [PORT_FIELD])
+            writer.writeheader()
+            writer.writerows(self.inventory())
+
+
+# Hundreds of devices need more sockets than the usual soft limit of 1024
+def raise_file_limit():
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+        except (ValueError, OSError):
+            pass
+
+
+async def run_forever(simulator):
+    async with simulator:
+        await asyncio.Event().wait()
+
+
+def ask(prompt, default, convert=str):
+    answer = input(f'{prompt} [{default}]: ').strip()
+    try:
+        return convert(answer) if answer else default
+    except ValueError:
+        print(f'Invalid value, using {default}.')
+        return default
+
+
+# Ask for the size and behaviour of the simulated fleet, then serve it until Ctrl-C
+def menu():
+    print('--------- DEVICE SIMULATOR ---------')
+    count = ask('Number of devices', 100, int)
+    protocol = ask('Protocol (telnet/ssh)', 'telnet')
+    spread = ask('One loopback address per device on the standard port (y/n)', 'n') == 'y'
+    base_port = DEFAULT_BASE_PORT if spread else ask('First port', DEFAULT_BASE_PORT, int)
+    profile = DeviceProfile(latency=ask('Latency per command (s)', 0.0, float),
+                            jitter=ask('Latency jitter (s)', 0.0, float),
+                            fail_rate=ask('Rejected config line rate (0-1)', 0.0, float),
+                            drop_rate=ask('Dropped connection rate (0-1)', 0.0, float),
+                            stall_rate=ask('Unanswered command rate (0-1)', 0.0, float),
+                            extra_interfaces=ask('Extra loopback interfaces per device', 0, int))
+    path = ask('Write inventory to', 'sim_inventory.csv')
+
+    try:
+        simulator = Simulator(count, protocol, base_port, spread=spread, profile=profile)
+    except RuntimeError as e:
+        print(e)
+        return
+    simulator.write_inventory(path)
+    first, last = simulator.addresses[0], simulator.addresses[-1]
+    print(f'Serving {count} {protocol} devices from {first[0]}:{first[1]} to {last[0]}:{last[1]} '
+          f'(user {DEFAULT_USERNAME}, password {DEFAULT_PASSWORD}). Ctrl-C to stop.')
+    try:
+        asyncio.run(run_forever(simulator))
+    except KeyboardInterrupt:
+        print('Simulator stopped.')
+
+
+if __name__ == "__main__":
+    menu()
@@ -0,0 +1,161 @@
+import hashlib  # Blocks are stored under the hash of their text
+import json  # Manifests are small JSON files
+import os  # For the store directories and atomic replace
+import re  # To build safe directory names from device addresses
+import tempfile  # Unique temporary names for the atomic writes
+import threading  # The store is shared by the fleet worker threads
+import time  # To timestamp the snapshots
+import zlib  # Cheap checksum for the block boundaries
+
+from config_cache import split_sections  # Blocks are cut between configuration sections
+
+
+# Directory of the configuration history
+STORE_DIR = 'config_store'
+
+# Blocks hold this many sections on average, and never more than MAX_BLOCK_SECTIONS.
+# Fewer, larger blocks keep manifests short; smaller ones store less again per change.
+BLOCK_SECTIONS = 8
+MAX_BLOCK_SECTIONS = 64
+
+
+def _device_dir(device):
+    return re.sub(r'[^\w.\-]', '_', device)
+
+
+def _timestamp(seconds):
+    return time.strftime('%Y%m%dT%H%M%S', time.gmtime(seconds)) + f'.{int(seconds * 1e6) % 1000000:06d}Z'
+
+
+# Split configuration lines into blocks of whole sections. A block ends after a section whose
+# checksum hits 1 in BLOCK_SECTIONS, so the boundaries depend on the content only: an edit
+# changes its own block, and devices with the same sections cut them into the same blocks.
+def split_blocks(lines):
+    blocks, block, sections = [], [], 0
+    for (header, _), section in split_sections(lines):
+        block.extend(section)
+        sections += 1
+        boundary = not header.startswith('!') and \
+            zlib.crc32('\n'.join(section).encode()) % BLOCK_SECTIONS == 0
+        if boundary or sections >= MAX_BLOCK_SECTIONS:
+            blocks.append(block)
+            block, sections = [], 0
+    if block:
+        blocks.append(block)
+    return blocks
+
+
+# Write through a temporary file unique to this call, so threads saving the same block
+# never share one; the last replace wins and every writer leaves the same content
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'w') as f:
+            f.write(text)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+# History of device configurations, stored by content.
+# Each block of a configuration (a run of sections, see split_blocks) is written once under
+# its sha256 in blocks/, whatever device or snapshot it came from. A snapshot is only a
+# manifest in manifests/<device>/ listing its block hashes, so devices sharing most of their
+# configuration, and snapshots that barely change, add little more than their manifests.
+class SnapshotStore:
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+        self.blocks = {}  # hash -> block lines, for blocks already read or written
+        self.lock = threading.Lock()
+
+    def _block_path(self, digest):
+        return os.path.join(self.directory, 'blocks', digest[:2], digest)
+
+    def _manifest_dir(self, device):
+        return os.path.join(self.directory, 'manifests', _device_dir(device))
+
+    # Store a block unless it is already there, and return its hash
+    def _put_block(self, lines):
+        text = '\n'.join(lines)
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        with self.lock:
+            if digest in self.blocks:
+                return digest
+        path = self._block_path(digest)
+        if not os.path.exists(path):
+            _write_atomic(path, text)
+        with self.lock:
+            self.blocks[digest] = lines
+        return digest
+
+    def _get_block(self, digest):
+        with self.lock:
+            lines = self.blocks.get(digest)
+        if lines is None:
+            with open(self._block_path(digest)) as f:
+                lines = f.read().split('\n')
+            with self.lock:
+                self.blocks[digest] = lines
+        return lines
+
+    # Record a configuration ('running', 'startup', ...) of a device and return its manifest.
+    # A configuration identical to the device's latest one of that kind is not recorded again.
+    def save(self, device, lines, kind='running', seconds=None):
+        lines = [line.rstrip('\r\n') for line in lines]
+        hashes = [self._put_block(block) for block in split_blocks(lines)]
+        latest = self.latest(device, kind)
+        if latest is not None and latest['blocks'] == hashes:
+            return latest
+
+        seconds = time.time() if seconds is None else seconds
+        manifest = {'device': device, 'kind': kind, 'timestamp': _timestamp(seconds), 'blocks': hashes}
+        name = f"{manifest['timestamp']}_{kind}.json"
+        _write_atomic(os.path.join(self._manifest_dir(device), name), json.dumps(manifest))
+        return manifest
+
+    # Manifests of a device, oldest first, optionally of one kind only
+    def history(self, device, kind=None):
+        try:
+            names = sorted(os.listdir(self._manifest_dir(device)))
+        except FileNotFoundError:
+            return []
+        manifests = []
+        for name in names:
+            if not name.endswith('.json') or (kind and not name.endswith(f'_{kind}.json')):
+                continue
+            with open(os.path.join(self._manifest_dir(device), name)) as f:
+                manifests.append(json.load(f))
+        return manifests
+
+    def latest(self, device, kind='running'):
+        try:
+            names = sorted(name for name in os.listdir(self._manifest_dir(device)) if name.endswith(f'_{kind}.json'))
+        except FileNotFoundError:
+            return None
+        if not names:
+            return None
+        with open(os.path.join(self._manifest_dir(device), names[-1])) as f:
+            return json.load(f)
+
+    # Configuration lines of a manifest
+    def load(self, manifest):
+        lines = []
+        for digest in manifest['blocks']:
+            lines.extend(self._get_block(digest))
+        return lines
+
+    # Number of stored blocks and manifests, and the bytes they take on disk
+    def usage(self):
+        usage = {'blocks': 0, 'manifests': 0, 'bytes': 0}
+        for folder, key in (('blocks', 'blocks'), ('manifests', 'manifests')):
+            for root, _, files in os.walk(os.path.join(self.directory, folder)):
+                for name in files:
+                    usage[key] += 1
+                    usage['bytes'] += os.path.getsize(os.path.join(root, name))
+        return usage
+
+
+STORE = SnapshotStore()
@@ -0,0 +1,93 @@
+import os  # For the control socket directory
+import shlex  # The command line is split again by pexpect.spawn
+import socket  # To tell live control sockets from stale ones
+import subprocess  # To run `ssh -O check/exit` against a master
+import threading  # Masters are shared by the fleet worker threads
+
+from session_pool import credentials_hash  # Attaching is only allowed with the password the device accepted
+
+
+# Directory holding the control sockets; %C keeps each socket path short and unique
+CONTROL_DIR = os.path.expanduser('~/.ssh/prog_eng_mux')
+
+# Seconds a master stays up after its last session ends
+DEFAULT_PERSIST = 600
+
+
+# OpenSSH ControlMaster multiplexing for pexpect-spawned `ssh` clients.
+# The first session to a device becomes the master and keeps the authenticated
+# transport open; later spawns attach to its socket and skip key exchange and login.
+# An attached session never sends its password, so only sessions with the password the
+# device accepted in this process attach; any other password gets its own connection.
+class ControlMaster:
+    def __init__(self, control_dir=CONTROL_DIR, persist=DEFAULT_PERSIST):
+        self.control_dir = control_dir
+        self.persist = persist
+        self.masters = set()  # (username, ip address, port) of masters this process may have started
+        self.accepted = {}  # (username, ip address, port) -> hash of the password the device accepted
+        self.lock = threading.Lock()
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+
+    # Control socket option, and the port when the device does not listen on 22 (%C covers the port)
+    def _options(self, port=None):
+        options = ['-o', f'ControlPath={os.path.join(self.control_dir, "%C")}']
+        return options + ['-p', str(port)] if port else options
+
+    # Command line for pexpect.spawn: attach to the device's master when the password is the
+    # accepted one, otherwise authenticate (as a new master the first time, so any socket left
+    # over from an earlier run is not attached to without a password check)
+    def ssh_command(self, username, ip_address, port=None, password=''):
+        key = (username, ip_address, port)
+        with self.lock:
+            accepted = self.accepted.get(key)
+        if accepted is not None and accepted != credentials_hash(password, ''):
+            options = ['-o', 'ControlPath=none', *(['-p', str(port)] if port else [])]
+        else:
+            # Only commands that go through the control socket can leave a master to clean up
+            with self.lock:
+                self.masters.add(key)
+            mode = 'yes' if accepted is None else 'auto'
+            options = ['-o', f'ControlMaster={mode}', *self._options(port), '-o', f'ControlPersist={self.persist}']
+        return ' '.join(shlex.quote(argument) for argument in ['ssh', *options, f'{username}@{ip_address}'])
+
+    # Note the password the device accepted in a login through ssh_command()
+    def accept(self, username, ip_address, port, password):
+        with self.lock:
+            self.accepted[(username, ip_address, port)] = credentials_hash(password, '')
+
+    # True if a master for the device is running and answering
+    def is_active(self, username, ip_address, port=None):
+        result = subprocess.run(['ssh', '-O', 'check', *self._options(port), f'{username}@{ip_address}'],
+                                stdin=subprocess.DEVNULL, capture_output=True)
+        return result.returncode == 0
+
+    # Stop the device's master, closing its SSH connection
+    def close(self, username, ip_address, port=None):
+        subprocess.run(['ssh', '-O', 'exit', *self._options(port), f'{username}@{ip_address}'],
+                       stdin=subprocess.DEVNULL, capture_output=True)
+        with self.lock:
+            self.masters.discard((username, ip_address, port))
+            self.accepted.pop((username, ip_address, port), None)
+
+    # Stop every master started from this process and remove dead sockets
+    def cleanup(self):
+        with self.lock:
+            masters = list(self.masters)
+        for username, ip_address, port in masters:
+            self.close(username, ip_address, port)
+        self.remove_stale_sockets()
+
+    # Delete control sockets whose master process has gone away
+    def remove_stale_sockets(self):
+        for name in os.listdir(self.control_dir):
+            path = os.path.join(self.control_dir, name)
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except OSError:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            finally:
+                probe.close()
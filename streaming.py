@@ -0,0 +1,46 @@
+from prompts import SEARCH_WINDOW  # Only the tail of the pending text can hold the prompt
+
+
+# Characters requested from the pty per read
+READ_SIZE = 65536
+
+
+# Send a command on a pexpect session and yield its output lines as they arrive,
+# stopping at the prompt. Only the current partial line is held in memory, so a
+# consumer can filter, parse or write the first line while the rest is still coming.
+# `timeout` is the longest wait for more output, not for the whole command.
+def iter_command_lines(session, command, prompt, timeout=30):
+    # Output already read by an earlier expect() but not matched yet
+    pending = session.buffer
+    session.buffer = ''
+    session.sendline(command)
+
+    echo_skipped = False
+    try:
+        while True:
+            match = prompt.search(pending, max(0, len(pending) - SEARCH_WINDOW))
+            if match:
+                lines = pending[:match.start()].split('\n')
+                session.buffer = pending[match.end():]
+            else:
+                pending += session.read_nonblocking(READ_SIZE, timeout)
+
+                # Keep the unfinished last line, it may still turn out to be the prompt
+                lines = pending.split('\n')
+                pending = lines.pop()
+
+            for line in lines:
+                # The first line is the device echoing the command back
+                if not echo_skipped:
+                    echo_skipped = True
+                    continue
+                yield line.rstrip('\r')
+
+            if match:
+                return
+    except GeneratorExit:
+        # A consumer that stops early still leaves the rest of the output on the
+        # session, so read up to the prompt before the next command is sent
+        session.buffer = pending
+        session.expect(prompt, timeout=timeout, searchwindowsize=SEARCH_WINDOW)
+        raise
@@ -0,0 +1,88 @@
+import asyncio  # The simulator runs on its own event loop
+import os  # Paths of the repository and the bridge
+import socket  # To find free ports for the simulated devices
+import sys  # The repository modules are top-level modules
+import threading  # The event loop runs next to the blocking pexpect sessions
+
+import pexpect  # The sessions under test spawn their client with it
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import Luke  # noqa: E402  (needs ROOT on the path)
+from config_cache import ConfigSnapshotCache  # noqa: E402
+from simulator import DeviceProfile, Simulator  # noqa: E402
+
+BRIDGE = os.path.join(ROOT, 'tests', 'telnet_bridge.py')
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+# Telnet simulator with one device, served from a background event loop.
+# The device (simulator.devices[0]) can be inspected and changed directly by the tests.
+class RunningSimulator:
+    def __init__(self, profile=None):
+        self.simulator = Simulator(1, 'telnet', free_port(), profile=profile or DeviceProfile())
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    @property
+    def device(self):
+        return self.simulator.devices[0]
+
+    @property
+    def address(self):
+        return self.simulator.addresses[0]
+
+    def start(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.simulator.start(), self.loop).result(10)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.simulator.stop(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(10)
+
+
+@pytest.fixture
+def simulator():
+    running = []
+
+    def start(profile=None):
+        sim = RunningSimulator(profile)
+        sim.start()
+        running.append(sim)
+        return sim
+
+    yield start
+    for sim in running:
+        sim.stop()
+
+
+# Logged-in, enabled SSHTONetworkSession on a simulated device. The ssh command the
+# session builds is replaced by the Telnet bridge; snapshots go to the test's directory.
+@pytest.fixture
+def connect(monkeypatch, tmp_path):
+    spawn = pexpect.spawn
+    sessions = []
+
+    def open_session(sim):
+        host, port = sim.address
+        device = sim.device
+        monkeypatch.setattr(pexpect, 'spawn', lambda command, **kwargs: spawn(
+            sys.executable, [BRIDGE, host, str(port), device.username], **kwargs))
+        session = Luke.SSHTONetworkSession(host, device.username, device.password, 'R1',
+                                           device.enable_password, port=port)
+        session.snapshots = ConfigSnapshotCache(str(tmp_path / 'snapshots'))
+        assert session.login() and session.enter_enable()
+        sessions.append(session)
+        return session
+
+    yield open_session
+    for session in sessions:
+        session.close()
@@ -0,0 +1,66 @@
+import os  # Raw reads and writes on the terminal
+import socket  # Connection to the simulated device
+import sys  # Command line arguments and the terminal
+import threading  # Terminal input is copied while device output is read
+import tty  # The terminal must not echo or translate, like the ssh client's
+
+IAC = 255
+SB = 250
+SE = 240
+
+
+# Stand-in for `ssh user@host` against the simulator's Telnet devices, spawned by pexpect:
+# answers the Username prompt itself so the session sees 'Password:' first, as over SSH,
+# strips Telnet negotiation from the device output and copies the terminal to the device.
+# Usage: telnet_bridge.py host port username
+def main():
+    host, port, username = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+    if os.isatty(0):
+        tty.setraw(0)
+    connection = socket.create_connection((host, port))
+
+    def copy_input():
+        while True:
+            data = os.read(0, 4096)
+            if not data:
+                break
+            connection.sendall(data)
+        connection.shutdown(socket.SHUT_WR)
+
+    threading.Thread(target=copy_input, daemon=True).start()
+
+    pending, answered = b'', False
+    while True:
+        data = connection.recv(4096)
+        if not data:
+            break
+        data, pending, out = pending + data, b'', bytearray()
+        i = 0
+        while i < len(data):
+            if data[i] != IAC:
+                out.append(data[i])
+                i += 1
+            elif i + 1 < len(data) and data[i + 1] == IAC:
+                out.append(IAC)
+                i += 2
+            elif i + 1 < len(data) and data[i + 1] == SB:
+                end = data.find(bytes([IAC, SE]), i)
+                if end == -1:
+                    pending = data[i:]
+                    break
+                i = end + 2
+            elif i + 2 < len(data):
+                i += 3
+            else:
+                pending = data[i:]
+                break
+        if not answered and b'Username:' in out:
+            answered = True
+            out = out.replace(b'Username: ', b'')
+            connection.sendall(username.encode() + b'\r\n')
+            continue
+        os.write(1, bytes(out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import compliance
+from compliance import evaluate_fleet
+
+SPECS = [
+    {'id': 'loopback', 'type': 'interface_present', 'name': 'Loopback0'},
+    {'id': 'no-http', 'type': 'forbid_line', 'pattern': '^ip http server$'},
+    {'id': 'ospf-backbone', 'type': 'ospf_areas', 'allowed': ['0']},
+]
+
+
+def device_config(hostname, *extra):
+    return [
+        f'hostname {hostname}',
+        '!',
+        'interface Loopback0',
+        ' ip address 1.1.1.1 255.255.255.255',
+        '!',
+        'router ospf 1',
+        ' network 10.0.0.0 0.0.0.255 area 0',
+        '!',
+        *extra,
+        'end',
+    ]
+
+
+def fleet():
+    return {'R1': device_config('R1'), 'R2': device_config('R2', 'ip http server')}
+
+
+def test_violations():
+    results, evaluated = evaluate_fleet(fleet(), SPECS, {})
+    assert evaluated == 2
+    assert results['R1'] == []
+    assert len(results['R2']) == 1
+    assert 'ip http server' in str(results['R2'][0])
+
+
+def test_only_changed_devices_are_evaluated():
+    state = {}
+    first, evaluated = evaluate_fleet(fleet(), SPECS, state)
+    assert evaluated == 2
+
+    again, evaluated = evaluate_fleet(fleet(), SPECS, state)
+    assert evaluated == 0
+    assert again == first
+
+    configs = fleet()
+    configs['R1'] = device_config('R1', 'router ospf 2', ' network 10.1.0.0 0.0.0.255 area 5')
+    changed, evaluated = evaluate_fleet(configs, SPECS, state)
+    assert evaluated == 1
+    assert changed['R2'] == first['R2']
+    assert len(changed['R1']) == 1
+    assert 'area 5' in str(changed['R1'][0])
+
+
+def test_new_rules_evaluate_every_device():
+    state = {}
+    evaluate_fleet(fleet(), SPECS, state)
+    _, evaluated = evaluate_fleet(fleet(), SPECS + [{'type': 'eigrp_as', 'allowed': [100]}], state)
+    assert evaluated == 2
+
+
+def test_batches_across_processes_match_in_process(monkeypatch):
+    expected, _ = evaluate_fleet(fleet(), SPECS, {})
+    monkeypatch.setattr(compliance, 'BATCH_SIZE', 1)
+    results, evaluated = evaluate_fleet(fleet(), SPECS, {}, processes=2)
+    assert evaluated == 2
+    assert results == expected
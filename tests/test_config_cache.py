@@ -0,0 +1,123 @@
+from config_cache import CONFIG_COMMANDS, cached_config
+
+FULL = CONFIG_COMMANDS['running']
+
+
+# Record every exec command the session streams, to tell marker reads from downloads
+def record_commands(session):
+    commands = []
+    iter_lines = session.iter_lines
+
+    def recording(command):
+        commands.append(command)
+        return iter_lines(command)
+
+    session.iter_lines = recording
+    return commands
+
+
+def body(config):
+    return [line for line in config if line.strip()]
+
+
+def full_config(session):
+    return list(session.iter_lines(FULL))
+
+
+def test_cache_miss_then_hit(simulator, connect):
+    sim = simulator()
+    session = connect(sim)
+    commands = record_commands(session)
+
+    first = cached_config(session, 'running', session.snapshots)
+    assert FULL in commands
+    assert session.snapshots.stats['misses'] == 1
+    assert f'hostname {sim.device.hostname}' in first
+
+    commands.clear()
+    second = cached_config(session, 'running', session.snapshots)
+    assert second == first
+    assert FULL not in commands
+    assert all('| include' in command for command in commands)
+    assert session.snapshots.stats['hits'] == 1
+
+
+def test_foreign_change_downloads_the_whole_config(simulator, connect):
+    sim = simulator()
+    session = connect(sim)
+    cached_config(session, 'running', session.snapshots)
+    commands = record_commands(session)
+
+    sim.device.globals.append('ip domain-lookup')
+    sim.device.changed()
+    config = cached_config(session, 'running', session.snapshots)
+
+    assert FULL in commands
+    assert 'ip domain-lookup' in config
+
+
+def test_own_change_is_refreshed_incrementally(simulator, connect):
+    sim = simulator()
+    session = connect(sim)
+    cached_config(session, 'running', session.snapshots)
+
+    session.configure(['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0'])
+    assert 'router ospf 1' in session.changed_sections
+    assert len(session.config_changes) == 1
+    before, after = session.config_changes[0]
+    assert before is not None and after is not None and before != after
+
+    commands = record_commands(session)
+    config = cached_config(session, 'running', session.snapshots)
+    assert FULL not in commands
+    assert any('| section' in command for command in commands)
+    assert ' network 10.0.0.0 0.0.0.255 area 0' in config
+    assert not session.changed_sections
+    assert session.config_changes == []
+
+    assert body(config) == body(full_config(session))
+    # The merged snapshot is current: the next read is a hit
+    commands.clear()
+    assert cached_config(session, 'running', session.snapshots) == config
+    assert FULL not in commands
+
+
+def test_own_interface_change_is_pulled_by_name(simulator, connect):
+    sim = simulator()
+    session = connect(sim)
+    cached_config(session, 'running', session.snapshots)
+
+    session.configure(['interface GigabitEthernet0/1', 'description uplink'])
+    commands = record_commands(session)
+    config = cached_config(session, 'running', session.snapshots)
+
+    assert f'{FULL} interface GigabitEthernet0/1' in commands
+    assert FULL not in commands
+    assert ' description uplink' in config
+    assert body(config) == body(full_config(session))
+
+
+def test_foreign_and_own_change_downloads_the_whole_config(simulator, connect):
+    sim = simulator()
+    session = connect(sim)
+    cached_config(session, 'running', session.snapshots)
+
+    sim.device.blocks['interface GigabitEthernet0/1'].append(' description changed elsewhere')
+    sim.device.changed()
+    session.configure(['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0'])
+    commands = record_commands(session)
+    config = cached_config(session, 'running', session.snapshots)
+
+    assert FULL in commands
+    assert ' description changed elsewhere' in config
+    assert ' network 10.0.0.0 0.0.0.255 area 0' in config
+
+
+def test_no_markers_without_a_snapshot(simulator, connect):
+    sim = simulator()
+    session = connect(sim)
+    commands = record_commands(session)
+
+    session.configure(['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0'])
+    assert commands == []
+    assert session.config_changes == [(None, None)]
@@ -0,0 +1,91 @@
+import pytest
+
+from config_transaction import ConfigTransactionError, find_errors
+from simulator import DeviceProfile
+
+
+def test_find_errors_pairs_each_error_with_its_line():
+    output = '\r\n'.join([
+        'configure terminal',
+        'R1(config)#interface loopback 0',
+        'R1(config-if)#ip adress 1.1.1.1 255.255.255.255',
+        '                 ^',
+        "% Invalid input detected at '^' marker.",
+        'R1(config-if)#description ok',
+        'R1(config-if)#ip address',
+        '% Incomplete command.',
+        'R1(config-if)#end',
+    ])
+    assert find_errors(output) == [
+        ('ip adress 1.1.1.1 255.255.255.255', "% Invalid input detected at '^' marker."),
+        ('ip address', '% Incomplete command.'),
+    ]
+
+
+def test_find_errors_on_clean_output():
+    assert find_errors('R1(config)#router ospf 1\r\nR1(config-router)#end\r\n') == []
+
+
+def test_configure_applies_the_block(simulator, connect):
+    sim = simulator()
+    session = connect(sim)
+    session.configure(['interface loopback 0', 'ip address 1.1.1.1 255.255.255.255'])
+    assert sim.device.blocks['interface Loopback0'] == [' ip address 1.1.1.1 255.255.255.255']
+
+
+def test_configure_raises_on_rejected_lines(simulator, connect):
+    sim = simulator(DeviceProfile(fail_rate=1.0))
+    session = connect(sim)
+    lines = ['interface loopback 0', 'ip address 1.1.1.1 255.255.255.255']
+    with pytest.raises(ConfigTransactionError) as e:
+        session.configure(lines)
+    assert [line for line, _ in e.value.errors] == lines
+    assert 'interface Loopback0' not in sim.device.blocks
+    # The session is still usable after the rejected block
+    assert session.probe(timeout=5)
+
+
+# A rejected block may still have changed the device, so the helpers must leave it
+# marked for the next write memory instead of dropping it with a generic error
+@pytest.mark.parametrize('helper, args, header', [
+    ('creating_loopback', ('1.1.1.1', '255.255.255.255'), 'interface loopback 0'),
+    ('creating_ospf', ('1', '10.0.0.0', '0.0.0.255', '0'), 'router ospf 1'),
+    ('creating_eigrp', ('100', '10.0.0.0', '0.0.0.255'), 'router eigrp 100'),
+])
+def test_helpers_keep_rejected_changes_unsaved(simulator, connect, helper, args, header):
+    sim = simulator(DeviceProfile(fail_rate=1.0))
+    session = connect(sim)
+    getattr(session, helper)(*args)
+
+    unsaved = session.commits.unsaved()
+    assert len(unsaved) == 1
+    assert unsaved[0].startswith(f'{header} (partly rejected)')
+    assert header in session.changed_sections
+
+
+@pytest.mark.parametrize('helper, args, header, child', [
+    ('creating_loopback', ('1.1.1.1', '255.255.255.255'), 'interface Loopback0', ' ip address 1.1.1.1 255.255.255.255'),
+    ('creating_ospf', ('1', '10.0.0.0', '0.0.0.255', '0'), 'router ospf 1', ' network 10.0.0.0 0.0.0.255 area 0'),
+    ('creating_eigrp', ('100', '10.0.0.0', '0.0.0.255'), 'router eigrp 100', ' network 10.0.0.0 0.0.0.255'),
+])
+def test_helpers_configure_and_mark_dirty(simulator, connect, helper, args, header, child):
+    sim = simulator()
+    session = connect(sim)
+    getattr(session, helper)(*args)
+
+    assert sim.device.blocks[header] == [child]
+    assert len(session.commits.unsaved()) == 1
+    assert 'partly rejected' not in session.commits.unsaved()[0]
+
+
+def test_loopback_without_mask_sends_nothing(simulator, connect):
+    sim = simulator()
+    session = connect(sim)
+    sent = []
+    configure = session.configure
+    session.configure = lambda lines: sent.append(lines) or configure(lines)
+
+    session.creating_loopback('1.1.1.1')
+    assert sent == []
+    assert not session.commits.dirty
+    assert 'interface Loopback0' not in sim.device.blocks
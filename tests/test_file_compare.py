@@ -0,0 +1,66 @@
+import re
+
+import file_compare
+
+
+HUNK = re.compile(r'@@ -(\d+),(\d+) \+(\d+),(\d+) @@')
+
+
+def write(path, lines):
+    path.write_text(''.join(line + '\n' for line in lines))
+    return str(path)
+
+
+# Rebuild the new file from the old one and the hunks of stream_diff()
+def apply_diff(old, diff):
+    new, position = [], 0
+    hunks = diff[2:]
+    i = 0
+    while i < len(hunks):
+        start, removed, _, added = map(int, HUNK.match(hunks[i]).groups())
+        new.extend(old[position:start - 1])
+        assert [line[1:] for line in hunks[i + 1:i + 1 + removed]] == old[start - 1:start - 1 + removed]
+        new.extend(line[1:] for line in hunks[i + 1 + removed:i + 1 + removed + added])
+        position = start - 1 + removed
+        i += 1 + removed + added
+    return new + old[position:]
+
+
+def test_identical_files_have_no_diff(tmp_path):
+    lines = [f'interface Loopback{n}' for n in range(50)]
+    assert list(file_compare.stream_diff(write(tmp_path / 'a', lines), write(tmp_path / 'b', lines))) == []
+
+
+def test_diff_rebuilds_the_new_file(tmp_path):
+    old = [f'line {n}' for n in range(300)]
+    new = list(old)
+    new[10] = 'changed'
+    del new[120:125]
+    new.insert(200, 'added')
+    new.append('last')
+    diff = list(file_compare.stream_diff(write(tmp_path / 'a', old), write(tmp_path / 'b', new)))
+
+    assert diff[:2] == [f"--- {tmp_path / 'a'}", f"+++ {tmp_path / 'b'}"]
+    assert sum(1 for line in diff if line.startswith('@@')) == 4
+    assert apply_diff(old, diff) == new
+
+
+def test_empty_file_against_content(tmp_path):
+    lines = ['hostname R1', 'end']
+    diff = list(file_compare.stream_diff(write(tmp_path / 'a', []), write(tmp_path / 'b', lines)))
+    assert diff[2:] == ['@@ -1,0 +1,2 @@', '+hostname R1', '+end']
+
+
+def test_change_larger_than_lookahead(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_compare, 'LOOKAHEAD', 10)
+    old = [f'old {n}' for n in range(40)] + [f'same {n}' for n in range(20)]
+    new = [f'new {n}' for n in range(40)] + [f'same {n}' for n in range(20)]
+    diff = list(file_compare.stream_diff(write(tmp_path / 'a', old), write(tmp_path / 'b', new)))
+    assert apply_diff(old, diff) == new
+
+
+def test_is_large(tmp_path, monkeypatch):
+    small = write(tmp_path / 'a', ['x'] * 10)
+    assert not file_compare.is_large(small)
+    monkeypatch.setattr(file_compare, 'LARGE_FILE', 5)
+    assert file_compare.is_large(small)
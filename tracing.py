@@ -0,0 +1,167 @@
+import atexit  # To flush the trace file when the program ends
+import functools  # To keep the traced method's name
+import json  # Spans are written as JSON lines
+import random  # For trace and span ids
+import threading  # Current span per thread, and one writer for all threads
+import time  # Span start times and durations
+
+
+# File the spans are appended to when tracing is switched on
+TRACE_FILE = 'traces.jsonl'
+
+
+def _new_id():
+    return '%016x' % random.getrandbits(64)
+
+
+# One timed step of a device interaction. Spans are written when they end;
+# children point at their parent through parent_id and share its trace_id.
+class Span:
+    __slots__ = ('tracer', 'trace_id', 'span_id', 'parent_id', 'name', 'start', 'started', 'attributes',
+                 'status', 'previous')
+
+    def __init__(self, tracer, name, parent, attributes):
+        self.tracer = tracer
+        self.trace_id = parent.trace_id if parent is not None else _new_id()
+        self.span_id = _new_id()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.attributes = attributes
+        self.status = 'ok'
+        self.previous = None  # Span that was current in this thread before this one was entered
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def fail(self, message):
+        self.status = 'error'
+        self.attributes['error'] = message
+
+    def end(self):
+        self.tracer.export(self, time.perf_counter() - self.started)
+
+    # Entering makes the span the parent of spans started in this thread until it exits
+    def __enter__(self):
+        self.previous = self.tracer.current()
+        self.tracer.local.span = self
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.fail(str(exc) or exc_type.__name__)
+        self.tracer.local.span = self.previous
+        self.end()
+        return False
+
+
+# Stand-in returned while tracing is off, so instrumented code costs one call and no allocation
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+    def fail(self, message):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+# Creates spans and writes the finished ones to a JSON-lines file
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.file = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def enable(self, path=TRACE_FILE):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+            self.path = path
+            self.file = open(path, 'a')
+            self.enabled = True
+
+    def disable(self):
+        with self.lock:
+            self.enabled = False
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def current(self):
+        return getattr(self.local, 'span', None)
+
+    # New span under `parent`, else the thread's current span, else `root`.
+    # Use it with `with`; a span kept open across calls (a session, a command) is ended with end().
+    def span(self, name, parent=None, root=None, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = parent or self.current() or root
+        return Span(self, name, parent if isinstance(parent, Span) else None, attributes)
+
+    # Span that starts a new trace, such as one device session
+    def root(self, name, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, None, attributes)
+
+    def export(self, span, seconds):
+        record = {
+            'trace_id': span.trace_id,
+            'span_id': span.span_id,
+            'parent_id': span.parent_id,
+            'name': span.name,
+            'start': span.start,
+            'duration_ms': round(seconds * 1000, 3),
+            'status': span.status,
+            'thread': threading.current_thread().name,
+            'attributes': span.attributes,
+        }
+        line = json.dumps(record, default=str) + '\n'
+        with self.lock:
+            if self.file is not None:
+                self.file.write(line)
+                # A finished trace is flushed so it can be read while the program runs
+                if span.parent_id is None:
+                    self.file.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+
+TRACER = Tracer()
+atexit.register(TRACER.disable)
+
+
+# Decorator for session methods: runs the method in a span under the session's root span
+# (self.trace_root()). A method returning False marks its span failed with self.error.
+def traced(name):
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not TRACER.enabled:
+                return method(self, *args, **kwargs)
+            with TRACER.span(name, root=self.trace_root()) as span:
+                result = method(self, *args, **kwargs)
+                if result is False:
+                    span.fail(getattr(self, 'error', '') or 'failed')
+                return result
+        return wrapper
+    return decorator
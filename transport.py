@@ -0,0 +1,168 @@
+import asyncio  # To race the port probes
+import json  # To persist the transport cache
+import threading  # The cache is shared with synchronous callers
+import time  # To age cache entries
+
+from async_session import AsyncSSHSession  # SSH transport of the asyncio engine
+from async_telnet import AsyncTelnetSession  # Telnet transport of the asyncio engine
+from fleet import device_address  # Cache key of a device, with its port when it has one
+
+
+# Transports in order of preference with their TCP ports
+TRANSPORTS = [('ssh', 22), ('telnet', 23)]
+
+# Head start given to each transport before the next one is tried (as in RFC 8305)
+ATTEMPT_DELAY = 0.25
+
+# Longest wait for a single TCP connect
+PROBE_TIMEOUT = 5
+
+# Cached choices are re-checked after this many seconds, e.g. once a device gets SSH enabled
+CACHE_TTL = 24 * 3600
+CACHE_FILE = 'transport_cache.json'
+
+SESSION_CLASSES = {'ssh': AsyncSSHSession, 'telnet': AsyncTelnetSession}
+
+# ip address -> (transport name, time it was chosen)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+# True if a TCP connection to the port can be opened
+async def probe_port(ip_address, port, timeout=PROBE_TIMEOUT):
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip_address, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass  # A reset while closing still means the port answered
+    return True
+
+
+# Happy-eyeballs race: the preferred transport is probed first and each following one
+# starts after ATTEMPT_DELAY, or at once if every running probe has already failed.
+# The first probe to connect wins; returns its name, or None if no port answered.
+async def race_transports(ip_address, transports=TRANSPORTS, delay=ATTEMPT_DELAY, timeout=PROBE_TIMEOUT):
+    order = {name: index for index, (name, port) in enumerate(transports)}
+    waiting = list(transports)
+    names = {}
+    pending = set()
+    try:
+        while waiting or pending:
+            if waiting:
+                name, port = waiting.pop(0)
+                task = asyncio.create_task(probe_port(ip_address, port, timeout))
+                names[task] = name
+                pending.add(task)
+
+            done, pending = await asyncio.wait(pending, timeout=delay if waiting else None,
+                                               return_when=asyncio.FIRST_COMPLETED)
+
+            # Among probes that finished together, the preferred transport wins
+            for task in sorted(done, key=lambda task: order[names[task]]):
+                if task.result():
+                    return names[task]
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+# Transport to use for a device: the cached choice if it is recent, otherwise a new race.
+# A device with its own port only has that port probed, as the preferred transport.
+async def select_transport(ip_address, port=None):
+    key = device_address(ip_address, port)
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is not None and time.time() - entry[1] < CACHE_TTL:
+        return entry[0]
+
+    transports = TRANSPORTS if port is None else [(TRANSPORTS[0][0], port)]
+    transport = await race_transports(ip_address, transports)
+    if transport is not None:
+        remember_transport(ip_address, transport, port)
+    return transport
+
+
+def remember_transport(ip_address, transport, port=None):
+    with _cache_lock:
+        _cache[device_address(ip_address, port)] = (transport, time.time())
+
+
+# Drop a cached choice that stopped working so the next connection races again
+def forget_transport(ip_address, port=None):
+    with _cache_lock:
+        _cache.pop(device_address(ip_address, port), None)
+
+
+# Synchronous wrapper for the interactive menus
+def choose_transport(ip_address, port=None):
+    return asyncio.run(select_transport(ip_address, port))
+
+
+def save_cache(path=CACHE_FILE):
+    with _cache_lock:
+        data = {ip: list(entry) for ip, entry in _cache.items()}
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return
+    with _cache_lock:
+        for ip, (transport, chosen_at) in data.items():
+            _cache[ip] = (transport, chosen_at)
+
+
+# Asyncio session that picks SSH or Telnet per device before bootstrapping,
+# usable wherever fleet.py expects an AsyncNetworkSession class
+class AutoTransportSession:
+    def __init__(self, ip_address, username, password, hostname, enable_password='', port=None):
+        self.ip_address = ip_address
+        self.port = port  # Port of the device's SSH or Telnet server, when it is not the default
+        self.username = username
+        self.password = password
+        self.hostname = hostname
+        self.enable_password = enable_password
+        self.session = None  # AsyncSSHSession or AsyncTelnetSession once chosen
+        self.error = ''
+
+    # Bootstrap over the selected transport. If that transport cannot be opened (a stale cache
+    # entry, SSH refused after the probe, a missing asyncssh), the following ones are tried in
+    # order of preference; a login that fails once connected is not retried on another transport.
+    async def bootstrap(self):
+        transport = await select_transport(self.ip_address, self.port)
+        if transport is None:
+            self.error = 'Neither SSH nor Telnet is reachable.'
+            print(f'{self.ip_address}: {self.error}')
+            return False
+
+        names = [name for name, _ in TRANSPORTS]
+        for name in names[names.index(transport):]:
+            if self.session is not None:
+                await self.session.close()
+            self.session = SESSION_CLASSES[name](self.ip_address, self.username, self.password,
+                                                 self.hostname, self.enable_password, port=self.port)
+            ok = await self.session.bootstrap()
+            if ok:
+                self.error = ''
+                if name != transport:
+                    remember_transport(self.ip_address, name, self.port)
+                return True
+            self.error = self.session.error
+            if self.session.reader is not None:
+                return False
+            # The transport itself could not be opened, so the cached choice is stale
+            forget_transport(self.ip_address, self.port)
+        return False
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
@@ -1,12 +1,18 @@
 import difflib  # To handle the comparisons
 import pexpect  # To handle SSH session
 import threading  # For multithreading
-from flask import Flask, render_template, request, jsonify  # Flask for web interface
+from flask import Flask, Response, render_template, request, jsonify  # Flask for web interface
 import sqlite3  # For database storage
+from metrics import CONTENT_TYPE, REGISTRY, DeviceMetrics, instrumented  # Latency histograms and error counters
 
 # Flask web interface setup
 app = Flask(__name__)
 
+@app.route('/metrics')
+def metrics():
+    """Serves the per-device command and operation metrics in Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
 # Database setup
 def setup_database():
     conn = sqlite3.connect('network_configurations.db')
@@ -40,70 +46,97 @@ class SSHTONetworkSession:
         self.hostname = hostname
         self.enable_password = enable_password
         self.session = None
+        self.metrics = DeviceMetrics(ip_address)
+
+    def _send(self, command):
+        """Sends a command line and starts timing it for the metrics."""
+        self.metrics.sent(command)
+        self.session.sendline(command)
+
+    def _expect(self, pattern, timeout=-1):
+        """Waits for the pattern and records the command's latency, output size or timeout."""
+        try:
+            result = self.session.expect(pattern, timeout=timeout)
+        except (pexpect.TIMEOUT, pexpect.EOF) as e:
+            self.metrics.expected(0, error=e)
+            raise
+        self.metrics.expected(len(self.session.before or ''), after=self.session.after)
+        return result
 
     def ssh_session(self):
-        """Establishes an SSH session and sets the hostname."""
+        """Establishes an SSH session, sets the hostname and opens the menu."""
+        if self.bootstrap():
+            self.compare_configs_menu()
+
+    @instrumented('bootstrap')
+    def bootstrap(self):
+        """Logs in, enters enable mode and sets the hostname. Returns True when the session is ready."""
+        self.metrics.sent('ssh')
         self.session = pexpect.spawn(f'ssh {self.username}@{self.ip_address}', encoding='utf-8', timeout=20)
-        result = self.session.expect(['Password:', pexpect.TIMEOUT, pexpect.EOF])
+        result = self._expect(['Password:', pexpect.TIMEOUT, pexpect.EOF])
         if result != 0:
             print('Session failed to establish.')
-            return
+            return False
 
+        # Timed as 'login'; the password itself never reaches a label
+        self.metrics.sent('login')
         self.session.sendline(self.password)
-        result = self.session.expect(['>', '#', pexpect.TIMEOUT, pexpect.EOF])
+        result = self._expect(['>', '#', pexpect.TIMEOUT, pexpect.EOF])
         if result != 0:
             print('Authentication failed.')
-            return
+            return False
 
         # Enter enable mode
-        self.session.sendline('enable')
-        result = self.session.expect(['Password:', pexpect.TIMEOUT, pexpect.EOF])
+        self._send('enable')
+        result = self._expect(['Password:', pexpect.TIMEOUT, pexpect.EOF])
         if result == 0:
             self.session.sendline(self.enable_password)
-            result = self.session.expect('#')
+            result = self._expect('#')
         if result != 0:
             print('Enable mode failed.')
-            return
+            return False
 
         # Enter configuration mode
-        self.session.sendline('configure terminal')
-        result = self.session.expect(r'\(config\)#')
+        self._send('configure terminal')
+        result = self._expect(r'\(config\)#')
         if result != 0:
             print('Config mode failed.')
-            return
+            return False
 
         # Set hostname
-        self.session.sendline(f'hostname {self.hostname}')
-        result = self.session.expect(rf'{self.hostname}\(config\)#')
+        self._send(f'hostname {self.hostname}')
+        result = self._expect(rf'{self.hostname}\(config\)#')
         if result == 0:
             print('Hostname set successfully.')
         else:
             print('Failed to set hostname.')
-            return
+            return False
 
         # Exit configuration mode
-        self.session.sendline('exit')
+        self._send('exit')
         print('Session ready for further commands.')
-        self.compare_configs_menu()
+        return True
 
+    @instrumented('creating_loopback')
     def creating_loopback(self, ip_address, subnet):
         """Creates a loopback interface with the given IP address and subnet."""
         try:
-            self.session.sendline('configure terminal')
-            self.session.expect(r'\(config\)#')
-            self.session.sendline('interface loopback 0')
-            self.session.expect(r'\(config-if\)#')
-            self.session.sendline(f'ip address {ip_address} {subnet}')
-            self.session.expect(r'\(config-if\)#')
-            self.session.sendline('end')
-            self.session.expect(r'#')
-            self.session.sendline('write memory')
-            self.session.expect(r'#')
+            self._send('configure terminal')
+            self._expect(r'\(config\)#')
+            self._send('interface loopback 0')
+            self._expect(r'\(config-if\)#')
+            self._send(f'ip address {ip_address} {subnet}')
+            self._expect(r'\(config-if\)#')
+            self._send('end')
+            self._expect(r'#')
+            self._send('write memory')
+            self._expect(r'#')
             print('Loopback interface created and configuration saved successfully.')
             save_configuration("Loopback", f"IP: {ip_address}, Subnet: {subnet}")
         except Exception as e:
             print(f"Error creating loopback interface: {e}")
 
+    @instrumented('creating_ospf')
     def creating_ospf(self):
         """Configures OSPF with user input for process ID, network, and area."""
         try:
@@ -112,21 +145,22 @@ class SSHTONetworkSession:
             wildcard = input("Enter the wildcard mask: ")
             area = input("Enter the area: ")
 
-            self.session.sendline('configure terminal')
-            self.session.expect(r'\(config\)#')
-            self.session.sendline(f'router ospf {process_id}')
-            self.session.expect(r'\(config-router\)#')
-            self.session.sendline(f'network {net_id} {wildcard} area {area}')
-            self.session.expect(r'\(config-router\)#')
-            self.session.sendline('end')
-            self.session.expect(r'#')
-            self.session.sendline('write memory')
-            self.session.expect(r'#')
+            self._send('configure terminal')
+            self._expect(r'\(config\)#')
+            self._send(f'router ospf {process_id}')
+            self._expect(r'\(config-router\)#')
+            self._send(f'network {net_id} {wildcard} area {area}')
+            self._expect(r'\(config-router\)#')
+            self._send('end')
+            self._expect(r'#')
+            self._send('write memory')
+            self._expect(r'#')
             print('OSPF configuration created and saved successfully.')
             save_configuration("OSPF", f"Process ID: {process_id}, Network: {net_id} {wildcard}, Area: {area}")
         except Exception as e:
             print(f"Error creating OSPF: {e}")
 
+    @instrumented('creating_eigrp')
     def creating_eigrp(self):
         """Configures EIGRP with user input for AS number, network, and wildcard mask."""
         try:
@@ -134,25 +168,26 @@ class SSHTONetworkSession:
             net_id = input("Enter the network address: ")
             wildcard = input("Enter the wildcard mask: ")
 
-            self.session.sendline('configure terminal')
-            self.session.expect(r'\(config\)#')
-            self.session.sendline(f'router eigrp {autonomous_system_number}')
-            self.session.expect(r'\(config-router\)#')
-            self.session.sendline(f'network {net_id} {wildcard}')
-            self.session.expect(r'\(config-router\)#')
-            self.session.sendline('end')
-            self.session.expect(r'#')
-            self.session.sendline('write memory')
-            self.session.expect(r'#')
+            self._send('configure terminal')
+            self._expect(r'\(config\)#')
+            self._send(f'router eigrp {autonomous_system_number}')
+            self._expect(r'\(config-router\)#')
+            self._send(f'network {net_id} {wildcard}')
+            self._expect(r'\(config-router\)#')
+            self._send('end')
+            self._expect(r'#')
+            self._send('write memory')
+            self._expect(r'#')
             print('EIGRP configuration created and saved successfully.')
             save_configuration("EIGRP", f"AS: {autonomous_system_number}, Network: {net_id} {wildcard}")
         except Exception as e:
             print(f"Error creating EIGRP: {e}")
+    @instrumented('show_ip_interface_brief')
     def show_ip_interface_brief(self):
         """Displays the brief summary of IP interfaces."""
         try:
-            self.session.sendline('show ip interface brief')
-            self.session.expect('#', timeout=10)
+            self._send('show ip interface brief')
+            self._expect('#', timeout=10)
             raw_output = self.session.before
             output_lines = raw_output.splitlines()
             filtered_lines = [line.strip() for line in output_lines if line.strip()]
@@ -165,6 +200,7 @@ class SSHTONetworkSession:
         except Exception as e:
             print(f"Error: {e}")
 
+    @instrumented('advertise_ospf')
     def advertise_ospf(self):
         """Advertises OSPF with user input for network and area."""
         try:
@@ -172,37 +208,38 @@ class SSHTONetworkSession:
             wildcard = input("Enter the wildcard mask (e.g., 0.0.0.255): ")
             area = input("Enter the OSPF area (e.g., 0): ")
 
-            self.session.sendline('configure terminal')
-            self.session.expect(r'\(config\)#')
-            self.session.sendline(f'router ospf 1')  # Assumes process ID is 1; modify as needed
-            self.session.expect(r'\(config-router\)#')
-            self.session.sendline(f'network {network} {wildcard} area {area}')
-            self.session.expect(r'\(config-router\)#')
-            self.session.sendline('end')
-            self.session.expect('#')
-            self.session.sendline('write memory')
-            self.session.expect('#')
+            self._send('configure terminal')
+            self._expect(r'\(config\)#')
+            self._send(f'router ospf 1')  # Assumes process ID is 1; modify as needed
+            self._expect(r'\(config-router\)#')
+            self._send(f'network {network} {wildcard} area {area}')
+            self._expect(r'\(config-router\)#')
+            self._send('end')
+            self._expect('#')
+            self._send('write memory')
+            self._expect('#')
             print('OSPF advertisement configured and saved successfully.')
             save_configuration("OSPF Advertisement", f"Network: {network}, Wildcard: {wildcard}, Area: {area}")
         except Exception as e:
             print(f"Error advertising OSPF: {e}")
 
+    @instrumented('advertise_eigrp')
     def advertise_eigrp(self):
         """Advertises EIGRP with user input for network and wildcard mask."""
         try:
             network = input("Enter the EIGRP network to advertise (e.g., 192.168.1.0): ")
             wildcard = input("Enter the wildcard mask (e.g., 0.0.0.255): ")
 
-            self.session.sendline('configure terminal')
-            self.session.expect(r'\(config\)#')
-            self.session.sendline(f'router eigrp 1')  # Assumes AS number is 1; modify as needed
-            self.session.expect(r'\(config-router\)#')
-            self.session.sendline(f'network {network} {wildcard}')
-            self.session.expect(r'\(config-router\)#')
-            self.session.sendline('end')
-            self.session.expect('#')
-            self.session.sendline('write memory')
-            self.session.expect('#')
+            self._send('configure terminal')
+            self._expect(r'\(config\)#')
+            self._send(f'router eigrp 1')  # Assumes AS number is 1; modify as needed
+            self._expect(r'\(config-router\)#')
+            self._send(f'network {network} {wildcard}')
+            self._expect(r'\(config-router\)#')
+            self._send('end')
+            self._expect('#')
+            self._send('write memory')
+            self._expect('#')
             print('EIGRP advertisement configured and saved successfully.')
             save_configuration("EIGRP Advertisement", f"Network: {network}, Wildcard: {wildcard}")
         except Exception as e: